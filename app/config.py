@@ -28,3 +28,12 @@ SO = platform.system()
 
 # Pines GPIO tomados desde config.json (dict con claves pin_a, pin_b, sensor_abierto, sensor_cerrado)
 PINS = CONFIG.get('gpio_pins', {})
+
+# Ranuras del rack: {id: pines} con las mismas claves que gpio_pins, una entrada por cerradura.
+# Si config.json no trae "ranuras", el actuador único de 'gpio_pins' es la ranura 1.
+RANURAS = {int(r["id"]): r for r in CONFIG.get('ranuras', [])} or {1: PINS}
+
+# Identificador de esta estación (bitácora de réplica y asignación de ranuras).
+# Vacío: la BD local usa el UUID que genera y guarda la primera vez (BaseDatos.estacion).
+# El nombre de host no sirve de respaldo: todas las Raspberry Pi de fábrica son 'raspberrypi'.
+ESTACION = CONFIG.get('replicacion', {}).get('estacion_id') or None
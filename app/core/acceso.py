@@ -6,19 +6,51 @@ Contiene la clase ControlAcceso, que encapsula:
 - Actualización del estado de bicicleta en BD (entrada/salida).
 - Registro de nuevos usuarios (alumno/profesor) con decisión de almacenar en BD o JSON.
 
+Con GPIO real el movimiento lo ejecuta un TrabajadorActuador (app/hardware/actuador.py):
+abrir_cerradura encola el comando y regresa enseguida; 'tiene_bici_guardada' se escribe en
+BD solo cuando los sensores confirman el movimiento (si el actuador falla, no se escribe).
+db.confirmar_acceso, desde ese callback (en simulación, en el acto), es el ÚNICO lugar que
+cambia el flag: actualizar_accion solo registra acción y fecha, y los usuarios nuevos se
+insertan sin bici. La decisión previa (db.decidir_acceso) reserva al usuario hasta entonces.
+
+Rack con varias cerraduras: al ENTRAR se asigna una ranura libre (AsignadorRanuras, O(1))
+y se mueve la cerradura de esa ranura; al SALIR se abre la ranura del usuario y se libera
+cuando el movimiento se confirma. La asignación se persiste en la tabla 'ranuras', que manda
+al salir: si la bici está en el rack de otra estación la salida se niega (con el servidor
+central la tabla es compartida). Solo una bici SIN ranura en ningún rack (guardada antes de
+configurar "ranuras") sale por el actuador de 'gpio_pins'. Si esos pines son los de una
+ranura (la cerradura vieja quedó dentro del rack), esa ranura no se asigna mientras queden
+bicis así.
+
 Flujo de alto nivel:
 - Si el usuario YA existe, solo se decide ENTRADA/SALIDA y se actualiza en BD.
 - Si NO existe, se hace scraping, se determina 'estado' y se decide:
-  - Alumno Inscrito -> insertar en BD con acción y estado de bici.
-  - Profesor Válida -> insertar en BD con acción y estado de bici.
+  - Alumno Inscrito -> insertar en BD (sin bici) y después decidir ENTRADA como uno registrado.
+  - Profesor Válida -> igual.
   - Caso contrario -> guardar en JSON de "no inscrito" o "no válido".
+
+Las reglas (estados válidos, horario de entradas, cupo por tipo, bloqueados) vienen de la
+política de acceso compilada (app/core/politica.py, politica.json), que se recarga en caliente.
+El cupo lo revisa db.decidir_acceso junto con la decisión, contra las bicis guardadas en BD (con
+el servidor central, las de todas las estaciones): un contador en memoria de esta estación no
+veía las entradas y salidas de las demás.
 """
 
-import time, datetime, getpass
+import datetime, getpass, threading
 from app.utils.crypto import encriptar
-from app.hardware.gpio_ctrl import leer_estado_actuador, energizar, desenergizar, GPIO_OK
-from app.utils.text import norm
-from app.config import CONFIG
+from app.hardware.gpio_ctrl import GPIO_OK
+from app.hardware.actuador import TrabajadorActuador, ABIERTO, CERRADO
+from app.core.ranuras import AsignadorRanuras
+from app.core.politica import GestorPolitica
+from app.data.db import MODELOS
+from app.config import CONFIG, PINS, RANURAS, ESTACION
+
+# Ocupante de la ranura que comparte pines con 'gpio_pins' mientras queden bicis sin ranura.
+LEGADO = ("legado", "")
+
+
+def _mismos_pines(a: dict, b: dict) -> bool:
+    return bool(b) and all(a.get(c) == b.get(c) for c in ("pin_a", "pin_b", "sensor_abierto", "sensor_cerrado"))
 
 
 class ControlAcceso:
@@ -26,113 +58,253 @@ class ControlAcceso:
     contador_ent = 0
     contador_sal = 0
 
-    def __init__(self, db, json_store):
+    def __init__(self, db, json_store, politica=None):
         self.db = db
         self.json = json_store
         self.intentos_no_inscritos = {}
-        # Lee desde config.json (antes estaba “3” fijo)
-        self.limite_intentos = CONFIG.get("limite_intentos", 3)
+        # Política de acceso; limite_intentos de config.json es el valor por defecto.
+        conf_politica = CONFIG.get("politica", {})
+        self.politica = politica or GestorPolitica(
+            conf_politica.get("archivo"),
+            getattr(json_store, "archivo_bloqueados", None),
+            recarga_seg=conf_politica.get("recarga_seg", 5.0),
+            limite_intentos=CONFIG.get("limite_intentos", 3),
+        )
+        self.actuador = None
+        if GPIO_OK:
+            conf = CONFIG.get("actuador", {})
+            self.actuador = TrabajadorActuador(
+                timeout=conf.get("timeout_seg", 8.0),
+                reintentos=conf.get("reintentos", 1),
+                pausa_reintento=conf.get("pausa_reintento_seg", 0.5),
+                max_cola=conf.get("max_cola", 4),
+            )
+        # Ranuras del rack: se reconstruye la ocupación guardada en BD.
+        # Sin "ranuras" en config.json: una sola cerradura sin tope de bicis, como antes.
+        self.estacion = ESTACION or db.estacion
+        self._lock_ranuras = threading.Lock()
+        self.ranuras = None
+        self.ranura_legado = None
+        if CONFIG.get("ranuras"):
+            ocupadas = {r: (t, i) for r, t, i in db.ranuras_ocupadas(self.estacion)}
+            # La cerradura de 'gpio_pins' es una ranura del rack y aún guarda bicis sin ranura: se reserva.
+            legado = next((r for r, pines in RANURAS.items() if _mismos_pines(pines, PINS)), None)
+            if legado is not None and legado not in ocupadas and db.bicis_sin_ranura():
+                ocupadas[legado] = LEGADO
+                self.ranura_legado = legado
+                print(f"Ranura {legado} reservada: comparte pines con 'gpio_pins' y hay bicis guardadas sin ranura.")
+            self.ranuras = AsignadorRanuras(list(RANURAS), ocupadas)
+
+    # ---------- Ranuras del rack ----------
+    def _asignar_ranura(self, clave) -> int | None:
+        if self.ranuras is None:
+            return next(iter(RANURAS))
+        with self._lock_ranuras:
+            ranura = self.ranuras.asignar(clave)
+            if ranura is not None:
+                self.db.asignar_ranura(self.estacion, ranura, *clave)
+            return ranura
+
+    def _liberar_ranura(self, clave, ranura: int):
+        """Libera la ranura de la fila en BD (y la del estado local, si coincide)."""
+        if self.ranuras is None:
+            return
+        with self._lock_ranuras:
+            self.ranuras.liberar(clave)
+            self.db.liberar_ranura(self.estacion, ranura)
+
+    def _liberar_legado(self):
+        """Devuelve al rack la ranura de 'gpio_pins' cuando ya no queda ninguna bici sin ranura."""
+        if self.ranura_legado is not None and not self.db.bicis_sin_ranura():
+            with self._lock_ranuras:
+                self.ranuras.liberar(LEGADO)
+            print(f"Ranura {self.ranura_legado} disponible: ya no hay bicis guardadas sin ranura.")
+            self.ranura_legado = None
 
-    # ---------- GPIO: helper de confirmación por sensores ----------
-    def _esperar_movimiento_objetivo(self, estado_objetivo: str, timeout: float = 8.0) -> bool:
+    # ---------- Política: estado y horario de entradas (el cupo lo revisa db.decidir_acceso) ----------
+    def _entrada_permitida(self, tipo: str, estado: str | None = None) -> bool:
+        politica = self.politica.actual()
+        if estado is not None and not politica.estado_valido(tipo, estado):
+            print(f"Estado '{estado}' no válido para {tipo}. Entrada denegada.")
+            return False
+        if not politica.en_horario(tipo, self.politica.reloj()):
+            print(f"Fuera del horario de entradas para {tipo}. Acceso denegado.")
+            return False
+        return True
+
+    # ---------- Movimiento (GPIO asíncrono o simulación) ----------
+    def _mover(self, objetivo: str, identificador_cif: str, tipo: str, nuevo_estado: bool,
+               ranura=None, al_confirmar=None, al_fallar=None) -> bool:
         """
-        Espera (hasta timeout) a que 'leer_estado_actuador()' coincida con el estado deseado.
-        Devuelve True si se confirmó el movimiento; False si hubo timeout o error.
+        Encola el movimiento de la ranura y regresa sin esperar al motor. Al terminar cierra la
+        decisión con confirmar_acceso: si se confirmó fija 'tiene_bici_guardada' = nuevo_estado;
+        si el actuador falla no escribe nada (el flag nunca cambió, y reescribirlo pisaría lo que
+        otra estación o la réplica hayan guardado). En simulación se confirma en el acto.
+        Devuelve False si el actuador no aceptó el comando (cola llena); la reserva se libera.
         """
-        inicio = time.time()
-        while time.time() - inicio < timeout:
-            if leer_estado_actuador() == estado_objetivo:
-                return True
-            time.sleep(0.05)
-        return False
+        def al_terminar(ok: bool):
+            self.db.confirmar_acceso(identificador_cif, tipo, nuevo_estado, ok)
+            if ok:
+                if al_confirmar:
+                    al_confirmar()
+            else:
+                print(f"Falla del actuador al quedar '{objetivo}' (ranura {ranura}). "
+                      f"Se conserva el estado anterior en BD.")
+                if al_fallar:
+                    al_fallar()
+
+        if not GPIO_OK:
+            print(f"Simulación: no se controla GPIO (ranura {ranura}).")
+            al_terminar(True)
+            return True
+        if not self.actuador.enviar(objetivo, al_terminar, descripcion=f"{tipo} {objetivo}", ranura=ranura):
+            self.db.confirmar_acceso(identificador_cif, tipo, nuevo_estado, False)
+            return False
+        return True
+
+    def detener(self):
+        """Espera a que terminen los movimientos en curso (llamar al salir)."""
+        if self.actuador:
+            self.actuador.detener(timeout=30)
 
     # ---------- Accionamiento de cerradura ----------
-    def abrir_cerradura(self, identificador: str, tipo: str) -> str:
+    def abrir_cerradura(self, identificador: str, tipo: str, estado: str | None = None) -> str:
         """
         Decide 'entrada' (guardar) o 'salida' (sacar) en base al flag 'tiene_bici_guardada' en BD.
-        - En simulación (Windows): solo alterna el flag en BD y retorna acción.
-        - En GPIO real (Linux/RPi): energiza pines, espera confirmación y actualiza BD.
+        - La decisión la toma db.decidir_acceso en un solo paso (en el servidor central, bajo su
+          candado): lee el flag, valida el PIN de una salida y reserva al usuario hasta que el
+          movimiento termina, así otro escaneo del mismo usuario recibe 'ocupado'.
+        - 'estado': el guardado en BD (lo mantiene al día la revalidación). Si la política no lo
+          acepta se niega la ENTRADA; la salida se permite siempre, para no dejar bicis atrapadas.
+        - En GPIO real (Linux/RPi): encola el movimiento y retorna; la BD se actualiza
+          al confirmarse por sensores. En simulación (Windows) se confirma en el acto y la
+          salida no pide PIN si la BD es local.
         """
         identificador_cif = encriptar(identificador)
-
-        # SIMULACIÓN (Windows u OS sin GPIO): alterna estado y retorna acción
-        if not GPIO_OK:
-            print("Simulación: no se controla GPIO.")
-            tiene_bici = self.db.obtener_estado_bici(identificador_cif, tipo)
-            self.db.actualizar_estado_bici(identificador_cif, not tiene_bici, tipo)
-            return "salida" if tiene_bici else "entrada"
-
-        # HARDWARE REAL
-        tiene_bici = self.db.obtener_estado_bici(identificador_cif, tipo)
-
-        if tiene_bici:
+        cupo = self.politica.actual().cupo.get(tipo)
+        decision = self.db.decidir_acceso(identificador_cif, tipo, cupo=cupo, exigir_pin=GPIO_OK)
+        if decision == "pin_requerido":
             # Usuario está sacando la bici -> requiere PIN
             print(f"Usuario {identificador}: solicitud para sacar bicicleta.")
-            pin_ingresado = getpass.getpass("Ingresa tu PIN: ")
-            if self.db.validar_pin(identificador, pin_ingresado, tipo):
-                print("Abriendo Actuador (SALIDA)...")
-                energizar(0, 1)  # Giro sentido "abrir"
-                ok = self._esperar_movimiento_objetivo("abierto", timeout=8.0)
-                desenergizar()
-                if not ok:
-                    print("Advertencia: no se confirmó 'abierto' por sensores (timeout).")
-                self.db.actualizar_estado_bici(identificador_cif, False, tipo)
-                return "salida"
-            else:
-                print("PIN incorrecto. Acceso denegado.")
+            decision = self.db.decidir_acceso(identificador_cif, tipo, getpass.getpass("Ingresa tu PIN: "), cupo)
+            if decision == "entrada":
+                # Otra estación registró la salida mientras se tecleaba el PIN: no se guarda nada.
+                self.db.confirmar_acceso(identificador_cif, tipo, True, False)
+                decision = "ocupado"
+        if decision == "salida":
+            return self._salida(identificador_cif, tipo)
+        if decision == "entrada":
+            return self._entrada(identificador, identificador_cif, tipo, estado)
+        print({"pin_incorrecto": "PIN incorrecto. Acceso denegado.",
+               "pin_bloqueado": "Demasiados PIN incorrectos. Intente más tarde.",
+               "ocupado": "Hay un movimiento en curso para este usuario. Intente de nuevo.",
+               "cupo_lleno": f"Cupo de {tipo} lleno ({cupo} bicis). Acceso denegado."}.get(
+                   decision, f"Decisión desconocida '{decision}'. Acceso denegado."))
+        return "denegado"
+
+    def _salida(self, identificador_cif: str, tipo: str) -> str:
+        clave = (tipo, identificador_cif)
+        ranura = next(iter(RANURAS))   # sin rack: la única cerradura
+        if self.ranuras is not None:
+            # La fila en BD dice dónde está la bici (el estado local solo conoce este rack).
+            fila = self.db.ranura_de_usuario(tipo, identificador_cif)
+            if fila and fila[0] != self.estacion:
+                self.db.confirmar_acceso(identificador_cif, tipo, False, False)
+                print(f"La bicicleta está en la estación '{fila[0]}' (ranura {fila[1]}). Retírela allí.")
                 return "denegado"
-        else:
-            # Usuario está guardando la bici -> no requiere PIN
-            print(f"Usuario {identificador}: guardando bicicleta (ENTRADA).")
-            energizar(1, 0)  # Giro sentido "cerrar"
-            ok = self._esperar_movimiento_objetivo("cerrado", timeout=8.0)
-            desenergizar()
-            if not ok:
-                print("Advertencia: no se confirmó 'cerrado' por sensores (timeout).")
-            self.db.actualizar_estado_bici(identificador_cif, True, tipo)
-            return "entrada"
+            # Sin fila: guardada antes de existir las ranuras -> actuador de 'gpio_pins' (ranura None).
+            ranura = fila[1] if fila else None
+        print(f"Abriendo Actuador (SALIDA) en ranura {ranura}...")
+
+        def liberar():
+            if ranura is None:
+                self._liberar_legado()
+            else:
+                self._liberar_ranura(clave, ranura)
+        if not self._mover(ABIERTO, identificador_cif, tipo, False, ranura, al_confirmar=liberar):
+            print("Actuador ocupado. Intente de nuevo.")
+            return "denegado"
+        return "salida"
+
+    def _entrada(self, identificador: str, identificador_cif: str, tipo: str, estado: str | None) -> str:
+        # Usuario está guardando la bici -> no requiere PIN
+        clave = (tipo, identificador_cif)
+        if not self._entrada_permitida(tipo, estado):
+            self.db.confirmar_acceso(identificador_cif, tipo, True, False)
+            return "denegado"
+        ranura = self._asignar_ranura(clave)
+        if ranura is None:
+            self.db.confirmar_acceso(identificador_cif, tipo, True, False)
+            print("Rack lleno: no hay ranuras libres.")
+            return "denegado"
+        print(f"Usuario {identificador}: guardando bicicleta (ENTRADA) en ranura {ranura}.")
+
+        def revertir():
+            self._liberar_ranura(clave, ranura)
+        if not self._mover(CERRADO, identificador_cif, tipo, True, ranura, al_fallar=revertir):
+            revertir()
+            print("Actuador ocupado. Intente de nuevo.")
+            return "denegado"
+        return "entrada"
 
     # ---------- Registro de NUEVOS usuarios ----------
-    def procesar_nuevo_usuario(self, datos: dict, tipo: str):
+    def procesar_nuevo_usuario(self, datos: dict, tipo: str) -> bool:
         """
         Guarda un usuario NO existente en BD según reglas:
-        - Alumno 'Inscrito' -> BD
-        - Profesor 'Válida' -> BD
-        - Si no cumplen, al JSON correspondiente.
+        - Estado válido para su tipo según la política (alumno 'Inscrito', profesor 'Válida') -> BD
+        - Si no cumple, al JSON correspondiente (registrar_no_valido).
 
-        Además:
-        - Determina si 'tiene_bici_guardada' = True (si acción fue 'entrada') o False (si 'salida').
-        - Actualiza contadores globales.
+        Se inserta ANTES de mover la cerradura y con 'tiene_bici_guardada' = False: el flag lo
+        fija después la confirmación del movimiento, igual que para un usuario ya registrado
+        (antes se insertaba con el flag de la acción y una falla del actuador no lo revertía).
+        Devuelve True si quedó registrado en BD.
         """
         from app.models.alumno import Alumno
         from app.models.profesor import Profesor
 
+        if not self.politica.actual().estado_valido(tipo, datos.get("estado", "")):
+            self.registrar_no_valido(datos, tipo)
+            return False
+
         datos["fecha"] = str(datetime.datetime.now())
-        accion = datos.get("accion", "").lower()
-        tiene_bici = True if accion == "entrada" else False
+        datos["accion"] = ""   # la registra actualizar_accion cuando se decide el acceso
 
         if tipo == "alumno":
             alumno = Alumno(**datos)
-            if alumno.estado == "Inscrito":
-                self.db.insertar_alumno(alumno, tiene_bici_guardada=tiene_bici)
-                if accion == "salida":
-                    ControlAcceso.contador_sal += 1
-                elif accion == "entrada":
-                    ControlAcceso.contador_ent += 1
-                print(f"Nuevo alumno {alumno.boleta} registrado con PIN {alumno.pin}.")
-            else:
-                self.json.guardar(alumno.to_dict(), "alumno")
-                print("Registro de alumno no inscrito guardado en JSON.")
+            self.db.insertar_alumno(alumno, tiene_bici_guardada=False)
+            print(f"Nuevo alumno {alumno.boleta} registrado con PIN {alumno.pin}.")
         elif tipo == "profesor":
             profesor = Profesor(**datos)
-            if "valida" in norm(profesor.estado):
-                self.db.insertar_profesor(profesor, tiene_bici_guardada=tiene_bici)
-                if accion == "salida":
-                    ControlAcceso.contador_sal += 1
-                elif accion == "entrada":
-                    ControlAcceso.contador_ent += 1
-                print(f"Nuevo profesor {profesor.nombre} registrado con PIN {profesor.pin}.")
-            else:
-                self.json.guardar(profesor.to_dict(), "profesor")
-                print(f"Registro de profesor no válido guardado en JSON. Estado: '{profesor.estado}'")
+            self.db.insertar_profesor(profesor, tiene_bici_guardada=False)
+            print(f"Nuevo profesor {profesor.nombre} registrado con PIN {profesor.pin}.")
+        else:
+            return False
+        return True
+
+    def registrar_no_valido(self, datos: dict, tipo: str):
+        """
+        Usuario con estado no válido según la política: se guarda en el JSON de su tipo (sin
+        mover la cerradura) y, tras 'limite_intentos' rechazos de la misma URL, la URL se pausa
+        'enfriamiento_seg' (bloqueado con "hasta"): no se consulta el portal hasta que vence.
+        No es permanente: si el usuario se inscribe después, vuelve a poder registrarse.
+        """
+        datos["fecha"] = str(datetime.datetime.now())
+        datos["accion"] = "denegado"
+        modelo = MODELOS[tipo](**datos)
+        self.json.guardar(modelo.to_dict(), tipo)
+        print(f"Registro de {tipo} no válido guardado en JSON. Estado: '{datos.get('estado', '')}'")
+
+        url = datos.get("url")
+        if not url:
+            return
+        self.intentos_no_inscritos[url] = self.intentos_no_inscritos.get(url, 0) + 1
+        politica = self.politica.actual()
+        limite = politica.limite_intentos
+        if limite and self.intentos_no_inscritos[url] >= limite and self.json.archivo_bloqueados:
+            hasta = self.politica.reloj() + datetime.timedelta(seconds=politica.enfriamiento_seg)
+            self.json.agregar_bloqueado("url", url, f"{limite} intentos con estado no válido",
+                                        hasta.isoformat(timespec="seconds"))
+            del self.intentos_no_inscritos[url]
+            self.politica.recargar()
+            print(f"URL en pausa hasta {hasta:%Y-%m-%d %H:%M} tras {limite} intentos no válidos.")
 
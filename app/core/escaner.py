@@ -1,102 +1,185 @@
 """
 app/core/escaner.py
 -------------------
-Flujo por escaneo (HID/console):
+Flujo por escaneo (la línea llega desde una fuente de app.hardware.lector: consola, FIFO, socket o evdev):
 1) Normaliza URL.
-2) Checa si la URL está BLOQUEADA -> aborta si lo está.
-3) Clasifica (alumno/profesor); si None, corta.
-4) Si está en BD -> abrir_cerradura + actualizar_accion.
-5) Si NO está en BD -> obtener HTML, extraer datos, abrir_cerradura, registrar nuevo.
+2) Clasifica (alumno/profesor); si None, corta.
+3) Checa si la URL está BLOQUEADA según la política de acceso -> aborta si lo está.
+4) Si está en BD -> checar identificador bloqueado, abrir_cerradura (con el estado guardado, que
+   mantiene al día app.web.revalidacion: uno no válido niega la entrada) + actualizar_accion.
+5) Si NO está en BD -> obtener HTML, extraer datos, checar identificador bloqueado y estado
+   válido (ANTES de mover la cerradura), registrar nuevo (sin bici) y seguir como en 4).
+
+procesar_linea/procesar_url devuelven la decisión tomada ('entrada', 'salida', 'denegado',
+'rebote', 'bloqueado', 'no_valido', ...). Si se pasa un GrabadorTraza (app.core.traza), cada línea cruda
+se guarda con su instante, su decisión y su latencia.
+
+Con un Mantenimiento (app.data.mantenimiento) la espera del lector tiene timeout: cuando vence
+sin escaneos se ejecuta un paso corto de mantenimiento de la BD y se vuelve a escuchar.
+
+La consulta al portal (paso 5) la hace 'scraper': un TrabajadorScraper (procesos aparte,
+app/web/trabajador.py) o, por defecto, un ScraperLocal en este proceso.
+
+Prefetch especulativo (prefetch=True): al arrancar se cargan las huellas (hash) de las URLs
+ya registradas. Si una URL no está entre ellas, la descarga del portal arranca ANTES de
+consultar la BD y corre en paralelo; si la BD dice que el usuario ya existe (p. ej. lo
+registró otra estación) la descarga se cancela o su respuesta se descarta. Una huella
+repetida solo hace que no se adelante la descarga; nunca cambia la decisión.
 """
 
 import time
-from app.web.scraper import normalizar_url, obtener_html, extraer_datos_alumno, extraer_datos_profesor
+from collections import Counter
+from app.utils.qr import normalizar_url
+from app.web.trabajador import ScraperLocal
 from app.utils.classify import clasificar_url
+from app.hardware.lector import crear_fuente
+from app.data.remota import ErrorServidor
+from app.data.db import MODELOS
 from app.config import CONFIG
 
 class EscanerQR:
-    def __init__(self, acceso, db):
+    def __init__(self, acceso, db, traza=None, mantenimiento=None, scraper=None, prefetch=False):
         self.acceso = acceso
         self.db = db
         self.vistos = {}
         self.modo_operacion = CONFIG.get("modo_operacion", "hid")
+        self.traza = traza            # GrabadorTraza opcional
+        self.mantenimiento = mantenimiento
+        self.reloj = time.monotonic   # anti-rebote; la reproducción usa el tiempo de la traza
+        self.scraper = scraper or ScraperLocal(CONFIG['user_agent'])
+        self.conocidas = self._cargar_conocidas() if prefetch else None   # huellas de URLs en BD
+        self.prefetch = Counter()     # 'usadas' / 'descartadas'
+
+    def _cargar_conocidas(self) -> set | None:
+        inicio = time.monotonic()
+        try:
+            conocidas = {hash(url) for tipo in ("alumno", "profesor") for _, url in self.db.iterar_urls(tipo)}
+        except ErrorServidor as e:
+            print(f"{e}. Prefetch desactivado.")
+            return None
+        print(f"Prefetch: {len(conocidas)} URLs conocidas cargadas en {time.monotonic() - inicio:.2f} s.")
+        return conocidas
 
-    def procesar_url(self, url: str, tipo: str):
-        ahora = time.time()
+    def procesar_url(self, url: str, tipo: str) -> str:
+        ahora = self.reloj()
         if url in self.vistos and (ahora - self.vistos[url]) < CONFIG['tiempo_anti_rebote_seg']:
             print("Escaneo repetido ignorado.")
-            return
+            return "rebote"
         self.vistos[url] = ahora
 
-        # --- 0) Bloqueados por URL ---
-        # Si config.json tiene archivo de bloqueados y la URL está listada, negamos.
+        # --- 0) Bloqueados por URL (politica.json + archivo de bloqueados, consulta O(1)) ---
+        politica = self.acceso.politica.actual()
+        if politica.bloqueado("url", url, self.acceso.politica.reloj()):
+            print("Acceso denegado: URL bloqueada.")
+            return "bloqueado"
+
+        # --- 1) ¿Existe ya en BD? (URL desconocida: la descarga arranca en paralelo) ---
+        especulativa = None
+        if self.conocidas is not None and hash(url) not in self.conocidas:
+            especulativa = self.scraper.enviar(url, tipo)
         try:
-            if hasattr(self.acceso, "json") and self.acceso.json.url_bloqueada(url):
-                print("Acceso denegado: URL bloqueada.")
-                return
+            existe = self.db.existe_url(url, tipo)
         except Exception:
-            # Si no hay archivo de bloqueados o no está inicializado, seguimos normal.
-            pass
+            if especulativa:
+                especulativa.cancel()
+            raise
 
-        # --- 1) ¿Existe ya en BD? ---
-        if self.db.existe_url(url, tipo):
+        if existe:
+            if especulativa:
+                especulativa.cancel()   # si ya salió al portal, la respuesta se descarta
+                self.conocidas.add(hash(url))
+                self.prefetch["descartadas"] += 1
             print("Usuario ya registrado. Verificando acceso desde la base de datos...")
-            identificador = self.db.obtener_identificador_por_url(url, tipo)
+            usuario = self.db.obtener_usuario(url, tipo)
+            identificador = getattr(usuario, usuario.IDENTIFICADOR) if usuario else None
             if not identificador:
                 print("Error: URL existe pero no se pudo recuperar el identificador.")
-                return
-
-            accion = self.acceso.abrir_cerradura(identificador, tipo)
-            if accion != "denegado":
-                self.db.actualizar_accion(url, accion, tipo)
-                print(f"Acceso '{accion}' registrado para usuario {identificador}.")
-                if accion == "salida":
-                    self.acceso.contador_sal += 1
-                elif accion == "entrada":
-                    self.acceso.contador_ent += 1
-                print(f"Entradas: {self.acceso.contador_ent} | Salidas: {self.acceso.contador_sal}")
+                return "sin_identificador"
+            if politica.bloqueado(usuario.IDENTIFICADOR, identificador):
+                print(f"Acceso denegado: {usuario.IDENTIFICADOR} bloqueado.")
+                return "bloqueado"
+
+            return self._acceder(url, identificador, tipo, usuario.estado)
         else:
             # --- 2) Usuario NUEVO -> Scraping ---
             print("Usuario nuevo. Realizando consulta web...")
-            html = obtener_html(url, user_agent=CONFIG['user_agent'])
-            if not html:
-                return
+            if especulativa:
+                self.prefetch["usadas"] += 1
+                datos = especulativa.result()
+            else:
+                datos = self.scraper.consultar(url, tipo)
+            if not datos:
+                return "sin_html"
 
-            datos = extraer_datos_alumno(html) if tipo == 'alumno' else extraer_datos_profesor(html)
-            identificador = datos.get("boleta") if tipo == 'alumno' else datos.get("numero_empleado")
+            tipo_id = MODELOS[tipo].IDENTIFICADOR
+            identificador = datos.get(tipo_id)
             if not identificador:
                 print("No se pudo extraer un identificador válido (boleta/no. empleado).")
-                return
+                return "sin_identificador"
 
-            # Bloqueo por identificador (opcional), si existe archivo de bloqueados
-            try:
-                tipo_id = "boleta" if tipo == "alumno" else "numero_empleado"
-                if hasattr(self.acceso, "json") and self.acceso.json.id_bloqueado(tipo_id, identificador):
-                    print(f"Acceso denegado: {tipo_id} bloqueado.")
-                    return
-            except Exception:
-                pass
+            if politica.bloqueado(tipo_id, identificador):
+                print(f"Acceso denegado: {tipo_id} bloqueado.")
+                return "bloqueado"
 
             datos["url"] = url
-            accion = self.acceso.abrir_cerradura(identificador, tipo)
-            if accion != "denegado":
-                datos["accion"] = accion
-                self.acceso.procesar_nuevo_usuario(datos, tipo)
-                print(f"Entradas: {self.acceso.contador_ent} | Salidas: {self.acceso.contador_sal}")
-
-    def iniciar(self):
-        print(f"Sistema listo en modo '{self.modo_operacion}'... (Ctrl+C para salir).")
+            # Estado no válido: se registra en JSON sin tocar la cerradura.
+            if not self.acceso.procesar_nuevo_usuario(datos, tipo):
+                return "no_valido"
+            if self.conocidas is not None:
+                self.conocidas.add(hash(url))
+            return self._acceder(url, identificador, tipo)
+
+    def _acceder(self, url: str, identificador: str, tipo: str, estado: str | None = None) -> str:
+        """Usuario ya en BD: decide y mueve la cerradura, y registra la acción (no el flag de bici)."""
+        accion = self.acceso.abrir_cerradura(identificador, tipo, estado)
+        if accion != "denegado":
+            self.db.actualizar_accion(url, accion, tipo)
+            print(f"Acceso '{accion}' registrado para usuario {identificador}.")
+            if accion == "salida":
+                self.acceso.contador_sal += 1
+            elif accion == "entrada":
+                self.acceso.contador_ent += 1
+            print(f"Entradas: {self.acceso.contador_ent} | Salidas: {self.acceso.contador_sal}")
+        return accion
+
+    def procesar_linea(self, qr_data: str) -> str:
+        """Flujo completo para una línea cruda del lector. Devuelve la decisión tomada."""
+        url = normalizar_url(qr_data)
+        tipo = clasificar_url(url)  # 'alumno' | 'profesor' | None
+        if not tipo:
+            print(f"URL no clasificada: {url}")
+            return "no_clasificada"
+        try:
+            return self.procesar_url(url, tipo)
+        except ErrorServidor as e:
+            # Estación en modo cliente sin servidor: se pierde este escaneo, no el bucle.
+            self.vistos.pop(url, None)  # que el reintento no cuente como rebote
+            print(f"{e}. Escaneo no procesado, intente de nuevo.")
+            return "error_servidor"
+
+    def iniciar(self, fuente=None):
+        """
+        Bucle principal. 'fuente' es una FuenteEntrada; si no se pasa, se construye
+        desde config.json -> "entrada" (por defecto la consola, como antes).
+        """
+        fuente = fuente or crear_fuente(CONFIG.get("entrada"))
+        print(f"Sistema listo en modo '{self.modo_operacion}' (entrada: {fuente.descripcion})... (Ctrl+C para salir).")
         try:
             while True:
-                # En modo 'hid' seguimos leyendo por consola (simulación de lector HID).
-                qr_data = input().strip()
+                qr_data = fuente.leer_linea(self.mantenimiento.espera() if self.mantenimiento else None)
+                if qr_data is None and self.mantenimiento:
+                    self.mantenimiento.en_reposo()
                 if not qr_data:
                     continue
-                url = normalizar_url(qr_data)
-                tipo = clasificar_url(url)  # 'alumno' | 'profesor' | None
-                if tipo:
-                    self.procesar_url(url, tipo)
-                else:
-                    print(f"URL no clasificada: {url}")
-        except KeyboardInterrupt:
+                if self.mantenimiento:
+                    self.mantenimiento.actividad()
+                t0 = time.monotonic()
+                decision = self.procesar_linea(qr_data)
+                if self.traza:
+                    self.traza.registrar(t0, qr_data, decision, time.monotonic() - t0)
+        except (KeyboardInterrupt, EOFError):
             print("\nSaliendo...")
+        finally:
+            fuente.cerrar()
+            if self.traza:
+                self.traza.cerrar()
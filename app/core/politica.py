@@ -0,0 +1,220 @@
+"""
+app/core/politica.py
+--------------------
+Política de acceso declarativa (politica.json) compilada a tablas de decisión.
+
+Reglas (todas opcionales; sin archivo se usa POLITICA_BASE, que reproduce el comportamiento anterior):
+  "estados":   por tipo, qué 'estado' del portal permite registrar al usuario y, ya registrado,
+               guardar su bici (se compara con el estado en BD, que actualiza la revalidación).
+               {"alumno": {"igual": ["inscrito"]}, "profesor": {"igual": ["valida"], "contiene": []}}
+               (comparación sin tildes ni mayúsculas, ver app.utils.text.norm)
+  "horario":   por tipo, ventanas en las que se aceptan ENTRADAS (las salidas siempre se permiten,
+               para no dejar bicis atrapadas). Lista vacía = todo el día.
+               {"alumno": [{"dias": ["lun", "mar", "mie", "jue", "vie"], "desde": "07:00", "hasta": "21:30"}]}
+               Si 'hasta' < 'desde' la ventana cruza la medianoche.
+  "cupo":      por tipo, máximo de bicis guardadas a la vez. {"profesor": 10}
+               Lo aplica BaseDatos.decidir_acceso bajo su candado (la cuenta sale de la BD).
+  "bloqueados": [{"tipo": "url" | "boleta" | "numero_empleado", "valor": "..."}]
+               se suman a los del archivo de bloqueados de GestorJSON. Con "hasta" (fecha ISO)
+               el bloqueo vence a esa hora.
+  "max_bicis_por_usuario": el modelo guarda UNA bici por usuario (flag + una ranura); solo se acepta 1.
+  "limite_intentos": escaneos rechazados (estado no válido) antes de pausar la URL.
+  "enfriamiento_seg": cuánto dura esa pausa (por defecto 24 h). Después se vuelve a consultar el
+               portal: un alumno que se inscribe más tarde no queda fuera para siempre.
+
+Compilación: estados -> frozensets, horario -> tabla de 7 x 1440 minutos (un byte por minuto),
+bloqueados -> frozenset de (tipo, valor) y, los que vencen, dict (tipo, valor) -> hasta.
+Cada consulta es O(1).
+
+GestorPolitica recarga en caliente: revisa (como mucho cada 'recarga_seg') la fecha de
+modificación de politica.json y del archivo de bloqueados; si la nueva versión no compila,
+conserva la anterior.
+
+Validar un archivo:   python -m app.core.politica nueva.json
+Probarlo sin aplicarlo (contra una traza de escaneos):
+  python -m herramientas.reproducir_traza hora_pico.jsonl --politica nueva.json --velocidad 0
+"""
+
+import argparse, datetime, json, os, time
+from app.utils.text import norm
+
+DIAS = ("lun", "mar", "mie", "jue", "vie", "sab", "dom")   # índice = datetime.weekday()
+MINUTOS_DIA = 24 * 60
+TIPOS = ("alumno", "profesor")
+
+POLITICA_BASE = {
+    "estados": {"alumno": {"igual": ["inscrito"]}, "profesor": {"igual": ["valida"]}},
+    "horario": {},
+    "cupo": {},
+    "bloqueados": [],
+    "max_bicis_por_usuario": 1,
+    "enfriamiento_seg": 24 * 3600,
+}
+
+
+def _minuto(hhmm: str) -> int:
+    h, m = (int(x) for x in hhmm.split(":"))
+    if not (0 <= h <= 24 and 0 <= m < 60) or h * 60 + m > MINUTOS_DIA:
+        raise ValueError(f"hora inválida '{hhmm}'")
+    return h * 60 + m
+
+
+def _compilar_horario(ventanas: list) -> bytes | None:
+    """Tabla de 7 x 1440 bytes (1 = se aceptan entradas en ese minuto). None = sin restricción."""
+    if not ventanas:
+        return None
+    tabla = bytearray(7 * MINUTOS_DIA)
+    for v in ventanas:
+        dias = v.get("dias") or DIAS
+        desconocidos = set(dias) - set(DIAS)
+        if desconocidos:
+            raise ValueError(f"días desconocidos {sorted(desconocidos)} (use {', '.join(DIAS)})")
+        desde, hasta = _minuto(v["desde"]), _minuto(v["hasta"])
+        for dia in dias:
+            base = DIAS.index(dia) * MINUTOS_DIA
+            if desde < hasta:
+                tabla[base + desde:base + hasta] = b"\x01" * (hasta - desde)
+            else:  # cruza la medianoche: hasta el fin del día y el inicio del siguiente
+                tabla[base + desde:base + MINUTOS_DIA] = b"\x01" * (MINUTOS_DIA - desde)
+                siguiente = (DIAS.index(dia) + 1) % 7 * MINUTOS_DIA
+                tabla[siguiente:siguiente + hasta] = b"\x01" * hasta
+    return bytes(tabla)
+
+
+class Politica:
+    """Política compilada. Inmutable: la recarga construye una nueva."""
+
+    def __init__(self, reglas: dict, bloqueados_extra: list | None = None, limite_intentos: int = 3):
+        desconocidas = set(reglas) - set(POLITICA_BASE) - {"limite_intentos"}
+        if desconocidas:
+            raise ValueError(f"reglas desconocidas: {sorted(desconocidas)}")
+        reglas = {**POLITICA_BASE, **reglas}
+
+        self.estados_igual, self.estados_contiene = {}, {}
+        for tipo in TIPOS:
+            r = reglas["estados"].get(tipo, POLITICA_BASE["estados"][tipo])   # tipo omitido = como antes
+            self.estados_igual[tipo] = frozenset(norm(e) for e in r.get("igual", []))
+            self.estados_contiene[tipo] = tuple(norm(e) for e in r.get("contiene", []))
+
+        self.horario = {tipo: _compilar_horario(reglas["horario"].get(tipo, [])) for tipo in TIPOS}
+        self.cupo = {tipo: int(reglas["cupo"][tipo]) for tipo in TIPOS if tipo in reglas["cupo"]}
+
+        self.bloqueados, self.pausados = set(), {}
+        for b in list(reglas["bloqueados"]) + list(bloqueados_extra or []):
+            clave = (b.get("tipo"), str(b.get("valor")))
+            if b.get("hasta"):
+                hasta = datetime.datetime.fromisoformat(b["hasta"])
+                self.pausados[clave] = max(hasta, self.pausados.get(clave, hasta))
+            else:
+                self.bloqueados.add(clave)
+        self.bloqueados = frozenset(self.bloqueados)
+        self.enfriamiento_seg = float(reglas["enfriamiento_seg"])
+
+        if reglas["max_bicis_por_usuario"] != 1:
+            raise ValueError("max_bicis_por_usuario: el sistema guarda una sola bici por usuario (use 1)")
+        self.limite_intentos = int(reglas.get("limite_intentos", limite_intentos))
+
+    # ---------- consultas O(1) ----------
+    def bloqueado(self, tipo_id: str, valor: str, ahora: datetime.datetime | None = None) -> bool:
+        """tipo_id: 'url' | 'boleta' | 'numero_empleado'. 'ahora' decide si una pausa ya venció."""
+        if (tipo_id, valor) in self.bloqueados:
+            return True
+        hasta = self.pausados.get((tipo_id, valor))
+        return hasta is not None and (ahora or datetime.datetime.now()) < hasta
+
+    def estado_valido(self, tipo: str, estado: str) -> bool:
+        n = norm(estado or "")
+        return n in self.estados_igual[tipo] or any(e in n for e in self.estados_contiene[tipo])
+
+    def en_horario(self, tipo: str, ahora: datetime.datetime) -> bool:
+        tabla = self.horario[tipo]
+        return tabla is None or tabla[ahora.weekday() * MINUTOS_DIA + ahora.hour * 60 + ahora.minute] == 1
+
+    def resumen(self) -> str:
+        partes = []
+        for tipo in TIPOS:
+            estados = sorted(self.estados_igual[tipo]) + [f"*{e}*" for e in self.estados_contiene[tipo]]
+            horas = "todo el día" if self.horario[tipo] is None else \
+                f"{sum(self.horario[tipo]) / 60:.1f} h/semana"
+            cupo = self.cupo.get(tipo, "sin tope")
+            partes.append(f"{tipo}: estados {estados}, entradas {horas}, cupo {cupo}")
+        partes.append(f"{len(self.bloqueados)} bloqueados, {len(self.pausados)} en pausa, "
+                      f"límite de intentos {self.limite_intentos} (pausa de {self.enfriamiento_seg / 3600:g} h)")
+        return " | ".join(partes)
+
+
+def compilar(archivo: str | None, archivo_bloqueados: str | None = None, limite_intentos: int = 3) -> Politica:
+    """Lee y compila. Lanza ValueError/OSError si el archivo no es válido."""
+    reglas = {}
+    if archivo and os.path.exists(archivo):
+        with open(archivo, encoding="utf-8") as f:
+            reglas = json.load(f)
+    extra = []
+    if archivo_bloqueados and os.path.exists(archivo_bloqueados):
+        with open(archivo_bloqueados, encoding="utf-8") as f:
+            extra = json.load(f)
+        extra = extra if isinstance(extra, list) else []
+    try:
+        return Politica(reglas, extra, limite_intentos)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"regla mal formada ({e!r})") from e
+
+
+class GestorPolitica:
+    def __init__(self, archivo: str | None, archivo_bloqueados: str | None = None,
+                 recarga_seg: float = 5.0, limite_intentos: int = 3):
+        self.archivo = archivo
+        self.archivo_bloqueados = archivo_bloqueados
+        self.recarga_seg = recarga_seg
+        self.limite_intentos = limite_intentos
+        self.reloj = datetime.datetime.now   # hora de pared para el horario (la reproducción la sustituye)
+        self._firma = self._firma_archivos()
+        self._politica = compilar(archivo, archivo_bloqueados, limite_intentos)
+        self._proxima_revision = time.monotonic() + recarga_seg
+
+    def _firma_archivos(self) -> tuple:
+        firma = []
+        for ruta in (self.archivo, self.archivo_bloqueados):
+            try:
+                st = os.stat(ruta) if ruta else None
+                firma.append((st.st_mtime_ns, st.st_size) if st else None)
+            except OSError:
+                firma.append(None)
+        return tuple(firma)
+
+    def recargar(self) -> bool:
+        """Compila de nuevo. Devuelve False (y conserva la política actual) si falla."""
+        self._firma = self._firma_archivos()
+        try:
+            self._politica = compilar(self.archivo, self.archivo_bloqueados, self.limite_intentos)
+        except (OSError, ValueError) as e:
+            print(f"Política no recargada, se conserva la anterior: {e}")
+            return False
+        print(f"Política recargada: {self._politica.resumen()}")
+        return True
+
+    def actual(self) -> Politica:
+        """Política vigente; como mucho cada 'recarga_seg' revisa si cambiaron los archivos."""
+        ahora = time.monotonic()
+        if ahora >= self._proxima_revision:
+            self._proxima_revision = ahora + self.recarga_seg
+            if self._firma_archivos() != self._firma:
+                self.recargar()
+        return self._politica
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida y resume un archivo de política de acceso.")
+    parser.add_argument("archivo")
+    parser.add_argument("--bloqueados", help="archivo de bloqueados de GestorJSON a incluir")
+    args = parser.parse_args()
+    try:
+        politica = compilar(args.archivo, args.bloqueados)
+    except (OSError, ValueError) as e:
+        print(f"Política inválida: {e}")
+        raise SystemExit(1)
+    print(politica.resumen())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+app/core/ranuras.py
+-------------------
+Asignación de ranuras (cerraduras) de un rack a usuarios.
+
+- Cada usuario guarda a lo sumo UNA bici, así que tiene a lo sumo una ranura.
+- Las libres se guardan en una cola (deque): asignar y liberar son O(1) y, al tomar
+  siempre la que lleva más tiempo libre, el desgaste se reparte entre cerraduras.
+- Los índices usuario->ranura y ranura->usuario son dicts: consultas O(1).
+- Esta clase solo vive en memoria; ControlAcceso persiste cada cambio en la BD
+  (tabla 'ranuras') y al arrancar se reconstruye desde ahí.
+"""
+
+from collections import deque
+
+
+class AsignadorRanuras:
+    def __init__(self, ids, ocupadas: dict | None = None):
+        """
+        ids     : ids de todas las ranuras del rack (config.json -> "ranuras").
+        ocupadas: {ranura: clave_usuario} ya asignadas (leídas de la BD).
+        """
+        ocupadas = {r: c for r, c in (ocupadas or {}).items() if r in set(ids)}
+        self._ocupante = dict(ocupadas)                           # ranura -> clave
+        self._por_usuario = {c: r for r, c in ocupadas.items()}   # clave -> ranura
+        self._libres = deque(r for r in ids if r not in ocupadas)
+
+    def asignar(self, clave) -> int | None:
+        """Ranura para 'clave' (la que ya tenga, o una libre). None si el rack está lleno."""
+        ranura = self._por_usuario.get(clave)
+        if ranura is not None:
+            return ranura
+        if not self._libres:
+            return None
+        ranura = self._libres.popleft()
+        self._ocupante[ranura] = clave
+        self._por_usuario[clave] = ranura
+        return ranura
+
+    def liberar(self, clave) -> int | None:
+        """Devuelve a la cola la ranura de 'clave' (si tenía) y la retorna."""
+        ranura = self._por_usuario.pop(clave, None)
+        if ranura is not None:
+            del self._ocupante[ranura]
+            self._libres.append(ranura)
+        return ranura
+
+    def ranura_de(self, clave) -> int | None:
+        return self._por_usuario.get(clave)
+
+    def ocupante(self, ranura):
+        return self._ocupante.get(ranura)
+
+    def libres(self) -> int:
+        return len(self._libres)
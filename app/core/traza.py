@@ -0,0 +1,58 @@
+"""
+app/core/traza.py
+-----------------
+Grabación de trazas de escaneo para reproducir horas pico (herramientas/reproducir_traza.py).
+
+Formato (JSON por línea, sin espacios; si el archivo termina en .gz se comprime):
+  {"version": 1, "estacion": "...", "inicio": <epoch>}        <- cabecera
+  [t, "qr crudo", "decision", latencia]                       <- un evento por escaneo
+- t        : segundos (reloj monotónico) desde el inicio de la grabación.
+- qr crudo : la línea tal como la entregó el lector, ANTES de normalizar.
+- decision : lo que devolvió EscanerQR.procesar_linea ('entrada', 'salida', 'denegado', 'rebote', ...).
+- latencia : segundos que tardó en procesarse el escaneo.
+
+OJO: el QR lleva el token que identifica al usuario en el portal; tratar las trazas como datos personales.
+"""
+
+import gzip, json, time
+
+
+def _abrir(archivo: str, modo: str):
+    if archivo.endswith(".gz"):
+        return gzip.open(archivo, modo + "t", encoding="utf-8")
+    return open(archivo, modo, encoding="utf-8", buffering=1 if modo == "w" else -1)
+
+
+class GrabadorTraza:
+    def __init__(self, archivo: str, estacion: str = "", cada: int = 20):
+        """cada: con .gz se vacía el buffer cada 'cada' eventos (texto plano va línea por línea)."""
+        self.archivo = archivo
+        self.cada = cada
+        self.inicio = time.monotonic()
+        self.eventos = 0
+        self._f = _abrir(archivo, "w")
+        self._f.write(json.dumps({"version": 1, "estacion": estacion, "inicio": time.time()}) + "\n")
+
+    def escribir(self, t: float, raw: str, decision: str, latencia: float):
+        self._f.write(json.dumps([round(t, 4), raw, decision, round(latencia, 5)],
+                                 ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.eventos += 1
+        if self.eventos % self.cada == 0:
+            self._f.flush()
+
+    def registrar(self, instante: float, raw: str, decision: str, latencia: float):
+        """instante: time.monotonic() al recibir la línea."""
+        self.escribir(instante - self.inicio, raw, decision, latencia)
+
+    def cerrar(self):
+        if not self._f.closed:
+            self._f.close()
+            print(f"Traza guardada en {self.archivo} ({self.eventos} escaneos).")
+
+
+def leer_traza(archivo: str) -> tuple[dict, list]:
+    """Devuelve (cabecera, [[t, raw, decision, latencia], ...])."""
+    with _abrir(archivo, "r") as f:
+        cabecera = json.loads(f.readline() or "{}")
+        eventos = [json.loads(linea) for linea in f if linea.strip()]
+    return cabecera, eventos
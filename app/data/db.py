@@ -6,23 +6,155 @@ Capa de acceso a SQLite:
 - Inserta nuevos registros (primer acceso).
 - Actualiza acciones y estados (entrada/salida).
 - Valida PIN y maneja el flag 'tiene_bici_guardada' por usuario.
+- Decide ENTRADA/SALIDA en un solo paso atómico (decidir_acceso / confirmar_acceso).
+- Guarda qué ranura del rack ocupa cada usuario (tabla 'ranuras').
+- Modo WAL y auto_vacuum incremental; el mantenimiento periódico está en app/data/mantenimiento.py.
 
 Diseño:
 - Las columnas sensibles (boleta, curp, numero_empleado, clave_presupuestal) se guardan encriptadas.
+- Con identificadores_binarios=True el cifrado se guarda empacado en un BLOB (un byte por carácter,
+  app.utils.crypto.empacar) en vez del texto de dos símbolos por carácter: la mitad de bytes en la
+  tabla y en los índices. Los llamadores siguen viendo y pasando el texto cifrado de siempre.
+  Las búsquedas aceptan ambos formatos (col IN (texto, blob)), así que las filas existentes se
+  convierten en línea, por lotes (migrar_identificadores, desde app/data/mantenimiento.py), y el
+  cambio se puede revertir poniendo la opción en False. La bitácora siempre guarda texto.
 - La 'url' es UNIQUE por registro, lo que permite evitar duplicados al escanear.
+
+Bitácora de cambios (para replicar entre estaciones, ver app/data/replicacion.py):
+- Cada escritura deja en 'cambios' una FOTO COMPLETA de la fila del usuario, con un reloj
+  de Lamport y el id de la estación que la originó. Cada fila guarda la versión (reloj, origen)
+  que la escribió por última vez.
+- La foto NO lleva el PIN ni los cifrados que no son el identificador (curp, clave presupuestal):
+  la bitácora viaja a otras estaciones y el cifrado es reversible. Una fila nueva recibida por
+  réplica toma el PIN por defecto de su identificador; una existente conserva el suyo.
+- El id de la estación es el configurado o, si no hay, un UUID que se genera una vez y se
+  guarda en la tabla 'meta' (el nombre de host no sirve: todas las Raspberry Pi de fábrica se
+  llaman 'raspberrypi' y dos estaciones con el mismo id se ignoran mutuamente los cambios).
+- El reloj también vive en 'meta' y se avanza dentro de la transacción que escribe: la estación
+  y la revalidación (otro proceso sobre el mismo archivo) nunca generan el mismo (reloj, origen).
+- Al recibir cambios de otra estación gana el de mayor (reloj, origen): la resolución es
+  determinista por usuario y todas las réplicas convergen al mismo estado.
+- Como cada cambio es una foto completa, basta conservar el ÚLTIMO por usuario
+  (compactar_cambios): ponerse al día cuesta a lo sumo un cambio por usuario.
+
+Decisión de acceso (lo que usa ControlAcceso, localmente o a través del servidor central):
+- decidir_acceso lee el flag, valida el PIN si es una salida y RESERVA al usuario, todo bajo un
+  candado: mientras su cerradura se mueve, otro escaneo del mismo usuario (en esta u otra
+  estación del servidor) recibe 'ocupado' en vez de decidir lo mismo con el flag viejo.
+- confirmar_acceso libera la reserva y, solo si el movimiento se confirmó, escribe el flag.
+  Una reserva sin confirmar (estación caída a mitad del movimiento) vence sola.
+- Tras INTENTOS_PIN incorrectos seguidos, la salida de ese usuario se bloquea BLOQUEO_PIN_SEG.
+- El cupo por tipo (política de acceso) también se revisa aquí, bajo el mismo candado: bicis
+  guardadas en BD más entradas reservadas sin confirmar. Con el servidor central todas las
+  estaciones cuentan lo mismo; con réplica, lo que la bitácora ya trajo de las demás.
+Las reservas y los intentos viven en memoria del proceso que decide (la estación o el servidor).
 """
 
-import sqlite3, datetime
-from app.utils.crypto import encriptar, desencriptar
+import sqlite3, datetime, json, threading, time, uuid
+from functools import lru_cache
+from app.utils.crypto import encriptar, desencriptar, empacar, desempacar
+from app.models.alumno import Alumno
+from app.models.profesor import Profesor
+
+# Mapeo tipo -> modelo. Las columnas, el SQL de INSERT/UPDATE y la construcción de
+# objetos desde filas se generan a partir de Modelo.CAMPOS (una sola fuente de verdad).
+MODELOS = {"alumno": Alumno, "profesor": Profesor}
+
+# Columnas de datos de cada tabla (sin id ni versión).
+COLUMNAS = {m.TABLA: m.CAMPOS + ("tiene_bici_guardada",) for m in MODELOS.values()}
+
+# Las que viajan en cada cambio replicado: sin PIN ni cifrados secundarios.
+REPLICADAS = {m.TABLA: tuple(c for c in COLUMNAS[m.TABLA]
+                             if c != "pin" and (c not in m.CIFRADOS or c == m.IDENTIFICADOR))
+              for m in MODELOS.values()}
+MODELO_DE_TABLA = {m.TABLA: m for m in MODELOS.values()}
+
+# Columnas con valores cifrados, por tabla (formato texto o BLOB según identificadores_binarios).
+CIFRADAS = {**{m.TABLA: m.CIFRADOS for m in MODELOS.values()}, "ranuras": ("identificador",)}
+
+
+def _texto(valor):
+    """Un valor cifrado como lo ven los llamadores (texto), esté guardado como TEXT o como BLOB."""
+    return desempacar(valor) if isinstance(valor, bytes) else valor
+
+
+def _claves(cifrado: str) -> tuple:
+    """Parámetros para 'columna IN (?, ?)': el texto cifrado y su forma empacada."""
+    try:
+        return cifrado, empacar(cifrado)
+    except (ValueError, TypeError):
+        return cifrado, cifrado
+
+
+def _recortar(tabla: str, datos: str) -> str:
+    """Foto JSON de la bitácora sin las columnas que no se replican (PIN, cifrados secundarios)."""
+    foto = json.loads(datos)
+    if tabla not in REPLICADAS or set(foto) <= set(REPLICADAS[tabla]):
+        return datos
+    return json.dumps({col: valor for col, valor in foto.items() if col in REPLICADAS[tabla]})
+
+
+def _pin_por_defecto(tabla: str, identificador_cif: str | None) -> str:
+    """PIN de una fila recibida por réplica: el que el modelo genera a partir del identificador."""
+    modelo = MODELO_DE_TABLA[tabla]
+    kwargs = dict.fromkeys(modelo.CAMPOS)
+    kwargs[modelo.IDENTIFICADOR] = desencriptar(identificador_cif) if identificador_cif else None
+    return modelo(**kwargs).pin
+
+
+def _sql_insert(modelo) -> str:
+    columnas = COLUMNAS[modelo.TABLA]
+    return (f"INSERT OR IGNORE INTO {modelo.TABLA} ({', '.join(columnas)}) "
+            f"VALUES ({', '.join('?' * len(columnas))})")
+
+_SQL_INSERT = {m: _sql_insert(m) for m in MODELOS.values()}
+
+
+@lru_cache(maxsize=None)
+def _sql_update(tabla: str, campos: tuple) -> str:
+    """UPDATE por url para un conjunto de columnas (cacheado: se arma una vez por combinación)."""
+    return f"UPDATE {tabla} SET {', '.join(f'{c} = ?' for c in campos)} WHERE url = ?"
+
+
+def fabrica_modelo(modelo):
+    """
+    row_factory de sqlite3 que construye Alumno/Profesor directo de la fila,
+    descifrando las columnas sensibles. Las columnas que no son CAMPOS se ignoran.
+    """
+    def fabrica(cursor, fila):
+        kwargs = {}
+        for descripcion, valor in zip(cursor.description, fila):
+            col = descripcion[0]
+            if col in modelo.CIFRADOS:
+                kwargs[col] = desencriptar(_texto(valor)) if valor else valor
+            elif col in modelo.CAMPOS:
+                kwargs[col] = valor
+        return modelo(**kwargs)
+    return fabrica
 
 class BaseDatos:
-    def __init__(self, archivo: str):
+    RESERVA_SEG = 120.0      # vigencia de una decisión sin confirmar (más que cola + reintentos del actuador)
+    INTENTOS_PIN = 5         # PIN incorrectos seguidos antes de bloquear la salida del usuario
+    BLOQUEO_PIN_SEG = 300.0
+
+    def __init__(self, archivo: str, estacion: str | None = None, identificadores_binarios: bool = False):
         self.archivo = archivo
+        self.binario = identificadores_binarios
+        self._migracion = {}   # tabla -> último rowid revisado por migrar_identificadores
+        self._compactacion = 0  # último seq revisado por compactar_cambios_lote
+        self._lock_decision = threading.Lock()
+        self._reservas = {}    # (tipo, identificador_cif) -> (vence (monotonic), 'entrada' | 'salida')
+        self._fallos_pin = {}  # (tipo, identificador_cif) -> (fallos seguidos, bloqueado hasta)
         self._crear_tabla()
+        self.estacion = estacion or self._estacion_guardada()
 
     def _crear_tabla(self):
         """Crea (si no existen) las tablas 'alumnos' y 'profesores'."""
         with sqlite3.connect(self.archivo) as conn:
+            # WAL: lecturas sin bloquear escrituras (servidor, réplica y mantenimiento en paralelo).
+            # auto_vacuum solo surte efecto en una BD nueva (ver app/data/mantenimiento.py).
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
             conn.execute("""
             CREATE TABLE IF NOT EXISTS alumnos (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -53,34 +185,225 @@ class BaseDatos:
                 pin TEXT,
                 tiene_bici_guardada INTEGER DEFAULT 0
             )""")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS cambios (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,   -- orden local de la bitácora
+                origen TEXT NOT NULL,                    -- estación que originó el cambio
+                reloj INTEGER NOT NULL,                  -- reloj de Lamport del origen
+                tabla TEXT NOT NULL,
+                url TEXT NOT NULL,
+                datos TEXT NOT NULL                      -- JSON con la fila (REPLICADAS)
+            )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cambios_usuario ON cambios (tabla, url)")
+            # Búsquedas por identificador cifrado (estado de la bici, PIN, salida).
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_alumnos_boleta ON alumnos (boleta)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_profesores_numero_empleado ON profesores (numero_empleado)")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS ranuras (
+                estacion TEXT NOT NULL,                  -- rack al que pertenece la ranura
+                ranura INTEGER NOT NULL,
+                tipo TEXT NOT NULL,                      -- 'alumno' | 'profesor'
+                identificador TEXT NOT NULL,             -- ENCRIPTADO
+                fecha TEXT,
+                PRIMARY KEY (estacion, ranura)
+            )""")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_pares (
+                par TEXT PRIMARY KEY,                    -- estación de la que recibimos
+                ultimo_seq INTEGER NOT NULL DEFAULT 0    -- último 'seq' de SU bitácora ya aplicado
+            )""")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                clave TEXT PRIMARY KEY,                  -- 'estacion_id' | 'reloj'
+                valor
+            )""")
+            # Versión por fila (migración suave para BD creadas antes de la réplica)
+            for tabla in COLUMNAS:
+                existentes = {r[1] for r in conn.execute(f"PRAGMA table_info({tabla})")}
+                if "reloj" not in existentes:
+                    conn.execute(f"ALTER TABLE {tabla} ADD COLUMN reloj INTEGER DEFAULT 0")
+                if "origen" not in existentes:
+                    conn.execute(f"ALTER TABLE {tabla} ADD COLUMN origen TEXT DEFAULT ''")
+            # Reloj persistente; en BD anteriores arranca desde la mayor versión ya escrita.
+            conn.execute("INSERT INTO meta (clave, valor) SELECT 'reloj', MAX("
+                         + ", ".join(f"(SELECT COALESCE(MAX(reloj), 0) FROM {t})"
+                                     for t in ("alumnos", "profesores", "cambios"))
+                         + ") WHERE NOT EXISTS (SELECT 1 FROM meta WHERE clave = 'reloj')")
+
+    # ---------- BITÁCORA DE CAMBIOS (réplica) ----------
+    def _estacion_guardada(self) -> str:
+        """Id de estación de esta BD: se genera (UUID) la primera vez y queda en 'meta'."""
+        with sqlite3.connect(self.archivo) as conn:
+            conn.execute("INSERT OR IGNORE INTO meta (clave, valor) VALUES ('estacion_id', ?)", (uuid.uuid4().hex,))
+            return conn.execute("SELECT valor FROM meta WHERE clave = 'estacion_id'").fetchone()[0]
+
+    def _tic(self, conn, visto: int = 0) -> int:
+        """
+        Avanza el reloj de Lamport (max(actual, visto) + 1) y devuelve el nuevo valor.
+        Se llama dentro de la transacción de escritura: el UPDATE toma el candado de escritura
+        de SQLite, así que ningún otro proceso sobre el mismo archivo obtiene el mismo valor.
+        """
+        conn.execute("UPDATE meta SET valor = MAX(valor, ?) + 1 WHERE clave = 'reloj'", (visto,))
+        return conn.execute("SELECT valor FROM meta WHERE clave = 'reloj'").fetchone()[0]
+
+    def _registrar_cambio(self, conn, tabla: str, url: str):
+        """Versiona la fila del usuario y guarda su foto en la bitácora (misma transacción)."""
+        reloj = self._tic(conn)
+        conn.execute(f"UPDATE {tabla} SET reloj = ?, origen = ? WHERE url = ?", (reloj, self.estacion, url))
+        fila = conn.execute(f"SELECT {', '.join(REPLICADAS[tabla])} FROM {tabla} WHERE url = ?", (url,)).fetchone()
+        foto = {col: _texto(valor) for col, valor in zip(REPLICADAS[tabla], fila)}   # JSON: siempre texto
+        conn.execute("INSERT INTO cambios (origen, reloj, tabla, url, datos) VALUES (?, ?, ?, ?, ?)",
+                     (self.estacion, reloj, tabla, url, json.dumps(foto)))
+
+    def cambios_desde(self, seq: int, limite: int = 500) -> list:
+        """
+        Cambios de la bitácora con seq > 'seq', en orden, como dicts serializables.
+        Las fotos escritas antes de excluir PIN y cifrados secundarios se recortan al leerlas.
+        """
+        with sqlite3.connect(self.archivo) as conn:
+            filas = conn.execute("SELECT seq, origen, reloj, tabla, url, datos FROM cambios "
+                                 "WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limite)).fetchall()
+        return [{"seq": f[0], "origen": f[1], "reloj": f[2], "tabla": f[3], "url": f[4], "datos": _recortar(f[3], f[5])}
+                for f in filas]
+
+    def marca_par(self, par: str) -> int:
+        """Último seq de la bitácora de 'par' que ya aplicamos (0 si nunca)."""
+        with sqlite3.connect(self.archivo) as conn:
+            res = conn.execute("SELECT ultimo_seq FROM sync_pares WHERE par = ?", (par,)).fetchone()
+            return res[0] if res else 0
+
+    def aplicar_cambios(self, cambios: list, par: str) -> int:
+        """
+        Aplica un lote recibido de 'par' en UNA transacción y avanza su marca.
+        Regla por usuario: solo se aplica si (reloj, origen) del cambio es mayor que la
+        versión actual de la fila. Los cambios aplicados se re-registran en nuestra bitácora
+        (con su origen y reloj originales) para que lleguen a terceros a través de nosotros.
+        Devuelve cuántos cambios se aplicaron.
+        """
+        if not cambios:
+            return 0
+        aplicados = 0
+        with sqlite3.connect(self.archivo) as conn:
+            for c in cambios:
+                tabla = c["tabla"]
+                if tabla not in COLUMNAS or c["origen"] == self.estacion:
+                    continue
+                self._tic(conn, c["reloj"])
+                actual = conn.execute(f"SELECT reloj, origen FROM {tabla} WHERE url = ?", (c["url"],)).fetchone()
+                if actual and (actual[0] or 0, actual[1] or "") >= (c["reloj"], c["origen"]):
+                    continue
+                datos = json.loads(c["datos"])
+                columnas = REPLICADAS[tabla] + ("reloj", "origen")
+                valores = [self._guardar(datos.get(col)) if col in CIFRADAS[tabla] else datos.get(col)
+                           for col in REPLICADAS[tabla]] + [c["reloj"], c["origen"]]
+                if actual:
+                    conn.execute(_sql_update(tabla, columnas), valores + [c["url"]])
+                else:
+                    columnas += ("pin",)
+                    valores.append(_pin_por_defecto(tabla, datos.get(MODELO_DE_TABLA[tabla].IDENTIFICADOR)))
+                    conn.execute(f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                                 valores)
+                conn.execute("INSERT INTO cambios (origen, reloj, tabla, url, datos) VALUES (?, ?, ?, ?, ?)",
+                             (c["origen"], c["reloj"], tabla, c["url"], _recortar(tabla, c["datos"])))
+                aplicados += 1
+            conn.execute("INSERT INTO sync_pares (par, ultimo_seq) VALUES (?, ?) "
+                         "ON CONFLICT(par) DO UPDATE SET ultimo_seq = MAX(ultimo_seq, excluded.ultimo_seq)",
+                         (par, cambios[-1]["seq"]))
+        return aplicados
+
+    def compactar_cambios(self) -> int:
+        """Deja solo el último cambio por usuario (cada uno es una foto completa). Devuelve borrados."""
+        with sqlite3.connect(self.archivo) as conn:
+            cur = conn.execute("DELETE FROM cambios WHERE seq NOT IN "
+                               "(SELECT MAX(seq) FROM cambios GROUP BY tabla, url)")
+            return cur.rowcount
+
+    def compactar_cambios_lote(self, lote: int = 500) -> tuple[int, int]:
+        """
+        compactar_cambios en pasos cortos (mantenimiento del hub, bajo el candado de escritura):
+        revisa hasta 'lote' cambios por seq, desde donde quedó el paso anterior, y borra los que
+        ya tienen uno posterior del mismo usuario. Devuelve (revisados, borrados); 0 revisados =
+        terminó la pasada.
+        """
+        with sqlite3.connect(self.archivo) as conn:
+            seqs = [s for (s,) in conn.execute("SELECT seq FROM cambios WHERE seq > ? ORDER BY seq LIMIT ?",
+                                               (self._compactacion, lote))]
+            if not seqs:
+                self._compactacion = 0   # la siguiente pasada revisa desde el inicio
+                return 0, 0
+            cur = conn.execute("DELETE FROM cambios WHERE seq BETWEEN ? AND ? AND EXISTS "
+                               "(SELECT 1 FROM cambios c WHERE c.tabla = cambios.tabla AND c.url = cambios.url "
+                               "AND c.seq > cambios.seq)", (seqs[0], seqs[-1]))
+            self._compactacion = seqs[-1]
+            return len(seqs), cur.rowcount
+
+    # ---------- FORMATO DE IDENTIFICADORES ----------
+    def _guardar(self, cifrado):
+        """Texto cifrado -> valor a guardar (BLOB empacado con identificadores_binarios)."""
+        if not self.binario or not cifrado:
+            return cifrado
+        try:
+            return empacar(cifrado)
+        except (ValueError, TypeError):
+            return cifrado   # no es un cifrado válido: se conserva tal cual
+
+    def migrar_identificadores(self, lote: int = 200) -> int:
+        """
+        Convierte al formato configurado (BLOB o TEXT) hasta 'lote' filas en UNA transacción
+        corta. Devuelve cuántas filas revisó; 0 = ya no queda nada por convertir.
+        No toca la bitácora ni la versión de las filas: el contenido no cambia.
+        """
+        pendiente_si = "text" if self.binario else "blob"
+        with sqlite3.connect(self.archivo) as conn:
+            for tabla, columnas in CIFRADAS.items():
+                desde = self._migracion.get(tabla, 0)
+                filas = conn.execute(
+                    f"SELECT rowid, {', '.join(columnas)} FROM {tabla} WHERE rowid > ? AND "
+                    f"({' OR '.join(f'typeof({c}) = {pendiente_si!r}' for c in columnas)}) ORDER BY rowid LIMIT ?",
+                    (desde, lote)).fetchall()
+                if not filas:
+                    continue
+                conn.executemany(
+                    f"UPDATE {tabla} SET {', '.join(f'{c} = ?' for c in columnas)} WHERE rowid = ?",
+                    [[self._guardar(_texto(v)) for v in fila[1:]] + [fila[0]] for fila in filas])
+                self._migracion[tabla] = filas[-1][0]
+                return len(filas)
+        self._migracion.clear()   # la siguiente pasada revisa desde el inicio
+        return 0
 
     # ---------- INSERTS (primer registro de un usuario) ----------
+    def _insertar(self, usuario, tiene_bici_guardada: bool):
+        """INSERT OR IGNORE generado desde Modelo.CAMPOS; cifra los Modelo.CIFRADOS."""
+        modelo = type(usuario)
+        valores = [self._guardar(encriptar(getattr(usuario, c))) if c in modelo.CIFRADOS else getattr(usuario, c)
+                   for c in modelo.CAMPOS]
+        valores.append(1 if tiene_bici_guardada else 0)
+        with sqlite3.connect(self.archivo) as conn:
+            cur = conn.execute(_SQL_INSERT[modelo], valores)
+            if cur.rowcount:
+                self._registrar_cambio(conn, modelo.TABLA, usuario.url)
+
     def insertar_alumno(self, alumno, tiene_bici_guardada: bool):
         """Inserta alumno si no existe (OR IGNORE por URL). Guarda cifrados los campos sensibles."""
-        with sqlite3.connect(self.archivo) as conn:
-            conn.execute("""
-            INSERT OR IGNORE INTO alumnos
-            (boleta, curp, nombre, carrera, escuela, estado, turno, fecha, url, accion, pin, tiene_bici_guardada)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (encriptar(alumno.boleta), encriptar(alumno.curp), alumno.nombre, alumno.carrera,
-                  alumno.escuela, alumno.estado, alumno.turno, alumno.fecha,
-                  alumno.url, alumno.accion, alumno.pin, 1 if tiene_bici_guardada else 0))
+        self._insertar(alumno, tiene_bici_guardada)
 
     def insertar_profesor(self, profesor, tiene_bici_guardada: bool):
         """Inserta profesor si no existe (OR IGNORE por URL)."""
+        self._insertar(profesor, tiene_bici_guardada)
+
+    # ---------- LECTURA DE REGISTROS COMPLETOS ----------
+    def obtener_usuario(self, url: str, tipo: str):
+        """Devuelve el Alumno/Profesor guardado para la URL (campos en claro) o None."""
+        modelo = MODELOS[tipo]
         with sqlite3.connect(self.archivo) as conn:
-            conn.execute("""
-            INSERT OR IGNORE INTO profesores
-            (numero_empleado, nombre, clave_presupuestal, area_adscripcion, estado, fecha, url, accion, pin, tiene_bici_guardada)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (encriptar(profesor.numero_empleado), profesor.nombre, encriptar(profesor.clave_presupuestal),
-                  profesor.area_adscripcion, profesor.estado, profesor.fecha,
-                  profesor.url, profesor.accion, profesor.pin, 1 if tiene_bici_guardada else 0))
+            conn.row_factory = fabrica_modelo(modelo)
+            return conn.execute(f"SELECT {', '.join(modelo.CAMPOS)} FROM {modelo.TABLA} WHERE url = ?",
+                                (url,)).fetchone()
 
     # ---------- CONSULTAS DE EXISTENCIA/IDENTIFICADOR ----------
     def existe_url(self, url: str, tipo: str) -> bool:
         """¿Existe ya esta URL en 'alumnos' o 'profesores'? (para saltar el scrapeo si ya está en BD)"""
-        tabla = "alumnos" if tipo == "alumno" else "profesores"
+        tabla = MODELOS[tipo].TABLA
         with sqlite3.connect(self.archivo) as conn:
             c = conn.cursor()
             c.execute(f"SELECT id FROM {tabla} WHERE url = ?", (url,))
@@ -93,40 +416,110 @@ class BaseDatos:
         - profesor-> 'numero_empleado'
         Retorna None si no encuentra.
         """
-        tabla = "alumnos" if tipo == "alumno" else "profesores"
-        columna_id = "boleta" if tipo == "alumno" else "numero_empleado"
+        modelo = MODELOS[tipo]
+        tabla, columna_id = modelo.TABLA, modelo.IDENTIFICADOR
         with sqlite3.connect(self.archivo) as conn:
             c = conn.cursor()
             c.execute(f"SELECT {columna_id} FROM {tabla} WHERE url = ?", (url,))
             res = c.fetchone()
-            return desencriptar(res[0]) if res else None
+            return desencriptar(_texto(res[0])) if res else None
 
     # ---------- ACTUALIZACIONES DE ACCIÓN/ESTADO ----------
     def actualizar_accion(self, url: str, accion: str, tipo: str):
         """
         Registra la 'accion' ('entrada'/'salida') y la 'fecha' del evento.
-        Además sincroniza 'tiene_bici_guardada' con la acción (entrada->1, salida->0).
+        NO toca 'tiene_bici_guardada': lo fija solo confirmar_acceso cuando el movimiento
+        de la cerradura se confirma (en GPIO real eso ocurre después, desde el actuador).
         """
-        tabla = "alumnos" if tipo == "alumno" else "profesores"
-        nuevo_estado_bici = 1 if accion == "entrada" else 0 if accion == "salida" else None
+        tabla = MODELOS[tipo].TABLA
         with sqlite3.connect(self.archivo) as conn:
-            if nuevo_estado_bici is None:
-                conn.execute(f"UPDATE {tabla} SET accion = ?, fecha = ? WHERE url = ?",
-                             (accion, str(datetime.datetime.now()), url))
-            else:
-                conn.execute(f"UPDATE {tabla} SET accion = ?, fecha = ?, tiene_bici_guardada = ? WHERE url = ?",
-                             (accion, str(datetime.datetime.now()), nuevo_estado_bici, url))
+            cur = conn.execute(_sql_update(tabla, ("accion", "fecha")),
+                               (accion, str(datetime.datetime.now()), url))
+            if cur.rowcount:
+                self._registrar_cambio(conn, tabla, url)
 
     def actualizar_estado_bici(self, identificador_cif: str, nuevo_estado: bool, tipo: str):
         """
         Actualiza el flag 'tiene_bici_guardada' para el usuario (por identificador cifrado).
-        Se usa desde ControlAcceso tras mover la cerradura.
+        Se usa desde confirmar_acceso tras mover la cerradura (no se expone en el servidor).
+        """
+        modelo = MODELOS[tipo]
+        tabla, columna_id = modelo.TABLA, modelo.IDENTIFICADOR
+        with sqlite3.connect(self.archivo) as conn:
+            claves = _claves(identificador_cif)
+            conn.execute(f"UPDATE {tabla} SET tiene_bici_guardada = ? WHERE {columna_id} IN (?, ?)",
+                         (1 if nuevo_estado else 0, *claves))
+            for (url,) in conn.execute(f"SELECT url FROM {tabla} WHERE {columna_id} IN (?, ?)", claves).fetchall():
+                self._registrar_cambio(conn, tabla, url)
+
+    # ---------- RANURAS DEL RACK (locales a cada estación; no se replican) ----------
+    def ranuras_ocupadas(self, estacion: str) -> list:
+        """[[ranura, tipo, identificador_cif], ...] asignadas en el rack 'estacion'."""
+        with sqlite3.connect(self.archivo) as conn:
+            return [[ranura, tipo, _texto(identificador)] for ranura, tipo, identificador in conn.execute(
+                "SELECT ranura, tipo, identificador FROM ranuras WHERE estacion = ?", (estacion,))]
+
+    def asignar_ranura(self, estacion: str, ranura: int, tipo: str, identificador_cif: str):
+        with sqlite3.connect(self.archivo) as conn:
+            conn.execute("INSERT OR REPLACE INTO ranuras (estacion, ranura, tipo, identificador, fecha) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         (estacion, ranura, tipo, self._guardar(identificador_cif), str(datetime.datetime.now())))
+
+    def liberar_ranura(self, estacion: str, ranura: int):
+        with sqlite3.connect(self.archivo) as conn:
+            conn.execute("DELETE FROM ranuras WHERE estacion = ? AND ranura = ?", (estacion, ranura))
+
+    def ranura_de_usuario(self, tipo: str, identificador_cif: str) -> list | None:
+        """[estacion, ranura] donde está la bici del usuario (en cualquier rack), o None si no tiene."""
+        with sqlite3.connect(self.archivo) as conn:
+            fila = conn.execute("SELECT estacion, ranura FROM ranuras WHERE tipo = ? AND identificador IN (?, ?)",
+                                (tipo, *_claves(identificador_cif))).fetchone()
+            return list(fila) if fila else None
+
+    def bicis_sin_ranura(self) -> int:
+        """Bicis guardadas que no ocupan ranura en ningún rack (guardadas antes de existir las ranuras)."""
+        with sqlite3.connect(self.archivo) as conn:
+            con_ranura = {(tipo, _texto(i)) for tipo, i in conn.execute("SELECT tipo, identificador FROM ranuras")}
+            return sum((tipo, _texto(i)) not in con_ranura
+                       for tipo, modelo in MODELOS.items()
+                       for (i,) in conn.execute(f"SELECT {modelo.IDENTIFICADOR} FROM {modelo.TABLA} "
+                                                f"WHERE tiene_bici_guardada = 1"))
+
+    # ---------- OPERACIONES MASIVAS (revalidación) ----------
+    def pagina_urls(self, tipo: str, desde_id: int = 0, lote: int = 500) -> list:
+        """Una página de (id, url) con id > desde_id, en orden de id (keyset)."""
+        tabla = MODELOS[tipo].TABLA
+        with sqlite3.connect(self.archivo) as conn:
+            return conn.execute(f"SELECT id, url FROM {tabla} WHERE id > ? ORDER BY id LIMIT ?",
+                                (desde_id, lote)).fetchall()
+
+    def iterar_urls(self, tipo: str, desde_id: int = 0, lote: int = 500):
+        """
+        Recorre (id, url) de la tabla en orden de id, por páginas (keyset), sin cargarla
+        completa en memoria. 'desde_id' permite reanudar desde un checkpoint.
         """
-        tabla = "alumnos" if tipo == "alumno" else "profesores"
-        columna_id = "boleta" if tipo == "alumno" else "numero_empleado"
+        while True:
+            filas = self.pagina_urls(tipo, desde_id, lote)
+            if not filas:
+                return
+            yield from filas
+            desde_id = filas[-1][0]
+
+    def actualizar_estados(self, cambios: list, tipo: str) -> int:
+        """
+        Aplica [(url, estado), ...] en UNA transacción. Solo toca (y registra en la bitácora)
+        las filas cuyo estado realmente cambió. Devuelve cuántas cambiaron.
+        """
+        tabla = MODELOS[tipo].TABLA
+        modificadas = 0
         with sqlite3.connect(self.archivo) as conn:
-            conn.execute(f"UPDATE {tabla} SET tiene_bici_guardada = ? WHERE {columna_id} = ?",
-                         (1 if nuevo_estado else 0, identificador_cif))
+            for url, estado in cambios:
+                cur = conn.execute(f"UPDATE {tabla} SET estado = ? WHERE url = ? AND estado IS NOT ?",
+                                   (estado, url, estado))
+                if cur.rowcount:
+                    self._registrar_cambio(conn, tabla, url)
+                    modificadas += 1
+        return modificadas
 
     # ---------- VALIDACIONES ----------
     def validar_pin(self, identificador: str, pin_ingresado: str, tipo: str) -> bool:
@@ -135,11 +528,14 @@ class BaseDatos:
         Importante: comparamos contra el valor guardado en BD (no cifrado).
         El identificador que llega es plano, pero se cifra para buscar.
         """
-        tabla = "alumnos" if tipo == "alumno" else "profesores"
-        columna_id = "boleta" if tipo == "alumno" else "numero_empleado"
+        return self._pin_correcto(encriptar(identificador), pin_ingresado, tipo)
+
+    def _pin_correcto(self, identificador_cif: str, pin_ingresado: str, tipo: str) -> bool:
+        modelo = MODELOS[tipo]
+        tabla, columna_id = modelo.TABLA, modelo.IDENTIFICADOR
         with sqlite3.connect(self.archivo) as conn:
             c = conn.cursor()
-            c.execute(f"SELECT pin FROM {tabla} WHERE {columna_id} = ?", (encriptar(identificador),))
+            c.execute(f"SELECT pin FROM {tabla} WHERE {columna_id} IN (?, ?)", _claves(identificador_cif))
             res = c.fetchone()
             return res and res[0] == pin_ingresado
 
@@ -148,10 +544,67 @@ class BaseDatos:
         Lee el flag 'tiene_bici_guardada' (True/False) por identificador cifrado.
         Se usa para decidir si corresponde ENTRADA o SALIDA.
         """
-        tabla = "alumnos" if tipo == "alumno" else "profesores"
-        columna_id = "boleta" if tipo == "alumno" else "numero_empleado"
+        modelo = MODELOS[tipo]
+        tabla, columna_id = modelo.TABLA, modelo.IDENTIFICADOR
         with sqlite3.connect(self.archivo) as conn:
             c = conn.cursor()
-            c.execute(f"SELECT tiene_bici_guardada FROM {tabla} WHERE {columna_id} = ?", (identificador_cif,))
+            c.execute(f"SELECT tiene_bici_guardada FROM {tabla} WHERE {columna_id} IN (?, ?)",
+                      _claves(identificador_cif))
             res = c.fetchone()
             return res[0] == 1 if res else False
+
+    # ---------- DECISIÓN DE ACCESO (lectura + PIN + reserva en un solo paso) ----------
+    def decidir_acceso(self, identificador_cif: str, tipo: str, pin: str | None = None,
+                       cupo: int | None = None, exigir_pin: bool = True) -> str:
+        """
+        'entrada' | 'salida'  -> decidido; el usuario queda reservado hasta confirmar_acceso.
+        'pin_requerido'       -> tiene bici guardada: repetir la llamada con el PIN.
+        'pin_incorrecto' | 'pin_bloqueado' | 'ocupado' (su cerradura ya se está moviendo).
+        'cupo_lleno'          -> entrada con 'cupo' (máximo de bicis del tipo) ya alcanzado.
+        exigir_pin=False es solo para la simulación local (el servidor no lo acepta).
+        """
+        clave = (tipo, identificador_cif)
+        with self._lock_decision:
+            ahora = time.monotonic()
+            if self._reservas.get(clave, (0, None))[0] > ahora:
+                return "ocupado"
+            if not self.obtener_estado_bici(identificador_cif, tipo):
+                if cupo is not None and self._ocupadas(tipo, ahora) >= cupo:
+                    return "cupo_lleno"
+                decision = "entrada"
+            elif not exigir_pin:
+                decision = "salida"
+            else:
+                fallos, bloqueado_hasta = self._fallos_pin.get(clave, (0, 0))
+                if bloqueado_hasta > ahora:
+                    return "pin_bloqueado"
+                if pin is None:
+                    return "pin_requerido"
+                if not self._pin_correcto(identificador_cif, pin, tipo):
+                    fallos += 1
+                    self._fallos_pin[clave] = (0, ahora + self.BLOQUEO_PIN_SEG) if fallos >= self.INTENTOS_PIN \
+                        else (fallos, 0)
+                    return "pin_incorrecto"
+                self._fallos_pin.pop(clave, None)
+                decision = "salida"
+            self._reservas[clave] = (ahora + self.RESERVA_SEG, decision)
+            return decision
+
+    def _ocupadas(self, tipo: str, ahora: float) -> int:
+        """Bicis del tipo guardadas más entradas decididas sin confirmar (con _lock_decision tomado)."""
+        pendientes = sum(1 for (t, _), (vence, decision) in self._reservas.items()
+                         if t == tipo and decision == "entrada" and vence > ahora)
+        return self.contar_bicis_guardadas(tipo) + pendientes
+
+    def confirmar_acceso(self, identificador_cif: str, tipo: str, nuevo_estado: bool, ok: bool):
+        """Cierra la decisión: con ok escribe 'tiene_bici_guardada' = nuevo_estado; siempre libera la reserva."""
+        with self._lock_decision:
+            if ok:
+                self.actualizar_estado_bici(identificador_cif, nuevo_estado, tipo)
+            self._reservas.pop((tipo, identificador_cif), None)
+
+    def contar_bicis_guardadas(self, tipo: str) -> int:
+        """Cuántos usuarios del tipo tienen bici guardada (cupos de la política de acceso)."""
+        tabla = MODELOS[tipo].TABLA
+        with sqlite3.connect(self.archivo) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {tabla} WHERE tiene_bici_guardada = 1").fetchone()[0]
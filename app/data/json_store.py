@@ -11,6 +11,9 @@ Puedes almacenar objetos tipo:
   { "tipo": "url", "valor": "<la_url>" }
   { "tipo": "boleta", "valor": "20201234" }
   { "tipo": "numero_empleado", "valor": "12345" }
+Con "hasta" (fecha ISO) el bloqueo es una pausa que vence sola; así se guardan las URLs
+rechazadas 'limite_intentos' veces:
+  { "tipo": "url", "valor": "<la_url>", "hasta": "2025-03-01T08:00:00" }
 """
 
 import json
@@ -54,11 +57,14 @@ class GestorJSON:
         self._append(archivo, datos_dict)
 
     # BLOQUEADOS
-    def agregar_bloqueado(self, tipo: str, valor: str, motivo: str = ""):
-        """Agrega un objeto bloqueado. Requiere tener archivo_bloqueados configurado."""
+    def agregar_bloqueado(self, tipo: str, valor: str, motivo: str = "", hasta: str | None = None):
+        """Agrega un objeto bloqueado ('hasta': fecha ISO en que vence). Requiere archivo_bloqueados."""
         if not self.archivo_bloqueados:
             return
-        self._append(self.archivo_bloqueados, {"tipo": tipo, "valor": valor, "motivo": motivo})
+        item = {"tipo": tipo, "valor": valor, "motivo": motivo}
+        if hasta:
+            item["hasta"] = hasta
+        self._append(self.archivo_bloqueados, item)
 
     def lista_bloqueados(self) -> list:
         """Devuelve la lista de bloqueados (puede estar vacía)."""
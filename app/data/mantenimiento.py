@@ -0,0 +1,240 @@
+"""
+app/data/mantenimiento.py
+-------------------------
+Mantenimiento periódico de la BD SQLite dentro del proceso de larga duración.
+
+Cada 'intervalo_seg' se corre un ciclo de pasos CORTOS:
+  1) PRAGMA optimize (con analysis_limit: ANALYZE acotado) -> planes de consulta al día.
+  2) Compactación de la bitácora de réplica (un cambio por usuario). En el hub y también en
+     las estaciones: toda escritura registra su foto aunque la réplica esté apagada.
+     Un lote por paso (BaseDatos.compactar_cambios_lote): un solo DELETE sobre toda la tabla
+     retenía el candado de escritura del hub y frenaba las decisiones de acceso.
+  2b) Conversión de identificadores cifrados al formato configurado (TEXT o BLOB,
+     BaseDatos.migrar_identificadores), un lote por paso, hasta que no quede ninguno.
+  3) PRAGMA incremental_vacuum de 'paginas_por_paso' páginas por paso, hasta vaciar la
+     lista de páginas libres (las que dejan los UPDATE/DELETE).
+  4) PRAGMA wal_checkpoint(PASSIVE): no espera a lectores ni escritores.
+  5) PRAGMA quick_check tabla por tabla.
+
+Reglas para no retrasar un escaneo:
+- En la estación solo se trabaja en REPOSO: EscanerQR espera la siguiente línea con timeout
+  (espera()) y, si vence sin escaneos, llama a en_reposo(), que ejecuta pasos durante a lo
+  sumo 'presupuesto_ms' y regresa a escuchar el lector. Un escaneo espera, como mucho, un paso.
+- Si la BD está ocupada (otra conexión escribiendo) el paso cede el turno y se reintenta
+  después, en vez de esperar el lock.
+- En el servidor central no hay bucle de escaneo: corre en un hilo y cada paso toma el
+  mismo lock de escritura que las llamadas RPC (ServidorAcceso._lock_escritura).
+
+El vacuum incremental requiere auto_vacuum=INCREMENTAL, que BaseDatos activa al crear una
+BD nueva. Una BD anterior necesita un VACUUM completo una sola vez, fuera de horario:
+  python -m app.data.mantenimiento --convertir
+"""
+
+import argparse, contextlib, sqlite3, threading, time
+from collections import Counter
+
+
+class Mantenimiento:
+    def __init__(self, archivo: str, intervalo_seg: float = 6 * 3600, reposo_seg: float = 2.0,
+                 presupuesto_ms: float = 50, paginas_por_paso: int = 128, pausa_seg: float = 0.05,
+                 espera_lock_seg: float = 0.05, lock=None, compactar=None, migrar=None):
+        """
+        lock     : lock a tomar en cada paso (el de escritura del servidor central).
+        compactar: callable opcional que compacta un lote de la bitácora y devuelve
+                   (revisados, borrados), 0 revisados al terminar (BaseDatos.compactar_cambios_lote).
+        migrar   : callable opcional que convierte un lote de identificadores y devuelve
+                   cuántas filas revisó, 0 al terminar (BaseDatos.migrar_identificadores).
+        """
+        self.archivo = archivo
+        self.intervalo_seg = intervalo_seg
+        self.reposo_seg = reposo_seg
+        self.presupuesto = presupuesto_ms / 1000
+        self.paginas_por_paso = paginas_por_paso
+        self.pausa_seg = pausa_seg
+        self.espera_lock_seg = espera_lock_seg
+        self.lock = lock
+        self.compactar = compactar
+        self.migrar = migrar
+        self.pasos = Counter()
+        self._ciclo = None
+        self._inicio_ciclo = 0.0
+        self._trabajo = 0.0
+        self._ultima_actividad = time.monotonic()
+        self._proximo = time.monotonic()   # el primer ciclo corre en el primer reposo
+        self._avisado = False
+        self._detener = threading.Event()
+        self._hilo = None
+
+    # ---------- pasos ----------
+    @staticmethod
+    def _sql(conn, sql: str, script: bool = False):
+        """
+        Ejecuta un PRAGMA; si la BD está ocupada cede el turno y lo reintenta en el siguiente paso.
+        script=True usa executescript: incremental_vacuum libera UNA página por cada paso de
+        sqlite3_step y execute() solo da uno.
+        """
+        while True:
+            try:
+                if script:
+                    conn.executescript(sql)
+                    return []
+                return conn.execute(sql).fetchall()
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+            yield "ocupada"
+
+    def _pasos(self):
+        """Un ciclo completo como generador: cada next() ejecuta UN paso corto."""
+        conn = sqlite3.connect(self.archivo, timeout=self.espera_lock_seg, isolation_level=None)
+        try:
+            yield from self._sql(conn, "PRAGMA analysis_limit = 400")
+            yield from self._sql(conn, "PRAGMA optimize")
+            yield "optimize"
+
+            while self.compactar:
+                revisados, borrados = self.compactar()
+                if not revisados:
+                    break
+                self.pasos["cambios_compactados"] += borrados
+                yield "compactar"
+
+            while self.migrar:
+                revisadas = self.migrar()
+                if not revisadas:
+                    break
+                self.pasos["identificadores_revisados"] += revisadas
+                yield "migrar_identificadores"
+
+            if (yield from self._sql(conn, "PRAGMA auto_vacuum"))[0][0] == 2:
+                while (yield from self._sql(conn, "PRAGMA freelist_count"))[0][0]:
+                    antes = (yield from self._sql(conn, "PRAGMA page_count"))[0][0]
+                    yield from self._sql(conn, f"PRAGMA incremental_vacuum({self.paginas_por_paso})", script=True)
+                    liberadas = antes - (yield from self._sql(conn, "PRAGMA page_count"))[0][0]
+                    self.pasos["paginas_liberadas"] += liberadas
+                    yield "incremental_vacuum"
+                    if not liberadas:
+                        break
+            elif not self._avisado:
+                self._avisado = True
+                print("Mantenimiento BD: auto_vacuum no es INCREMENTAL; "
+                      "ejecute 'python -m app.data.mantenimiento --convertir' fuera de horario.")
+
+            yield from self._sql(conn, "PRAGMA wal_checkpoint(PASSIVE)")
+            yield "wal_checkpoint"
+
+            tablas = [t for (t,) in (yield from self._sql(
+                conn, "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"))]
+            for tabla in tablas:
+                resultado = yield from self._sql(conn, f"PRAGMA quick_check({tabla})")
+                if resultado != [("ok",)]:
+                    self.pasos["tablas_con_error"] += 1
+                    print(f"Mantenimiento BD: quick_check de '{tabla}' reporta: {resultado[:5]}")
+                yield "quick_check"
+        finally:
+            conn.close()
+
+    # ---------- planificación ----------
+    def actividad(self):
+        """Avisar que hubo un escaneo: reinicia la cuenta de reposo."""
+        self._ultima_actividad = time.monotonic()
+
+    def pendiente(self) -> bool:
+        return self._ciclo is not None or time.monotonic() >= self._proximo
+
+    def espera(self) -> float:
+        """Segundos que conviene esperar (al lector) antes de llamar a en_reposo()."""
+        ahora = time.monotonic()
+        falta_reposo = self.reposo_seg - (ahora - self._ultima_actividad)
+        if self._ciclo is None:
+            return max(falta_reposo, self._proximo - ahora, self.pausa_seg)
+        return max(falta_reposo, self.pausa_seg)
+
+    def en_reposo(self) -> bool:
+        """Ejecuta pasos durante a lo sumo 'presupuesto_ms'. Devuelve True si trabajó."""
+        ahora = time.monotonic()
+        if ahora - self._ultima_actividad < self.reposo_seg or not self.pendiente():
+            return False
+        if self._ciclo is None:
+            self._ciclo = self._pasos()
+            self._inicio_ciclo, self._trabajo = ahora, 0.0
+            self.pasos.clear()
+        limite = ahora + self.presupuesto
+        while time.monotonic() < limite:
+            t0 = time.monotonic()
+            try:
+                with self.lock or contextlib.nullcontext():
+                    paso = next(self._ciclo)
+            except StopIteration:
+                self._terminar_ciclo()
+                break
+            except sqlite3.Error as e:
+                print(f"Mantenimiento BD: ciclo interrumpido ({e}); se reintentará.")
+                self._ciclo = None
+                self._proximo = time.monotonic() + 60
+                break
+            finally:
+                self._trabajo += time.monotonic() - t0
+            self.pasos[paso] += 1
+            if paso == "ocupada":
+                break
+        return True
+
+    def _terminar_ciclo(self):
+        self._ciclo = None
+        self._proximo = time.monotonic() + self.intervalo_seg
+        p = self.pasos
+        print(f"Mantenimiento BD: ciclo completo en {time.monotonic() - self._inicio_ciclo:.1f} s "
+              f"({self._trabajo * 1000:.0f} ms de trabajo) | páginas liberadas: {p['paginas_liberadas']} | "
+              f"integridad: {'OK' if not p['tablas_con_error'] else 'CON ERRORES'}"
+              + (f" | identificadores convertidos: {p['identificadores_revisados']}"
+                 if p['identificadores_revisados'] else ""))
+
+    # ---------- ejecución en hilo (servidor central) ----------
+    def iniciar_en_hilo(self):
+        def bucle():
+            while not self._detener.wait(self.espera()):
+                self.en_reposo()
+        self._hilo = threading.Thread(target=bucle, name="mantenimiento", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+
+def convertir(archivo: str):
+    """Activa auto_vacuum=INCREMENTAL en una BD existente (VACUUM completo: bloquea la BD)."""
+    with contextlib.closing(sqlite3.connect(archivo, isolation_level=None)) as conn:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        inicio = time.perf_counter()
+        conn.execute("VACUUM")
+        print(f"{archivo}: auto_vacuum = {conn.execute('PRAGMA auto_vacuum').fetchone()[0]} "
+              f"(VACUUM en {time.perf_counter() - inicio:.1f} s).")
+
+
+def main():
+    from app.config import CONFIG
+
+    parser = argparse.ArgumentParser(description="Mantenimiento de la BD SQLite.")
+    parser.add_argument("--convertir", action="store_true",
+                        help="activar auto_vacuum=INCREMENTAL en una BD existente (con el sistema detenido)")
+    args = parser.parse_args()
+
+    if args.convertir:
+        convertir(CONFIG["database_file"])
+        return
+    # Sin opciones: un ciclo completo de inmediato, sin esperar reposo ni presupuesto.
+    from app.data.db import BaseDatos
+    db = BaseDatos(CONFIG["database_file"], identificadores_binarios=CONFIG.get("identificadores_binarios", False))
+    m = Mantenimiento(db.archivo, reposo_seg=0, presupuesto_ms=float("inf"), migrar=db.migrar_identificadores)
+    m.en_reposo()
+    while m._ciclo is not None:   # solo si algún paso encontró la BD ocupada
+        time.sleep(m.pausa_seg)
+        m.en_reposo()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+app/data/remota.py
+------------------
+Cliente delgado del servidor central (app/data/servidor.py).
+
+BaseDatosRemota tiene la misma interfaz que BaseDatos, así ControlAcceso y EscanerQR
+no cambian: solo se les inyecta esta clase en lugar de la base local.
+
+- Una conexión HTTP persistente por hilo (keep-alive) y timeout corto configurable.
+- Caché local breve de URL -> usuario (Alumno/Profesor): el identificador no cambia una vez
+  registrado, así que un usuario conocido cuesta una sola consulta al servidor por ventana
+  de caché. El estado de la bici NO se cachea (lo cambian otras estaciones).
+- El PIN nunca viaja de vuelta: los usuarios que devuelve el servidor llegan con pin=None.
+  La estación solo manda el PIN tecleado a decidir_acceso, que lo valida en el servidor.
+- Cada petición lleva el token compartido (config.json -> servidor_central.token).
+- Si el servidor no responde se lanza ErrorServidor; el bucle del escáner lo reporta
+  y sigue con el siguiente escaneo en lugar de decidir con datos incompletos.
+
+ParReplica es el par remoto del Replicador (app/data/replicacion.py): habla con el canal
+/replica/ del hub con su propio token (config.json -> replicacion.token).
+"""
+
+import json, time, threading, http.client
+from urllib.parse import urlparse
+from app.data.db import MODELOS
+
+
+class ErrorServidor(RuntimeError):
+    """El servidor central no respondió o devolvió un error."""
+
+
+class BaseDatosRemota:
+    RUTA = "/api/"
+
+    def __init__(self, url_servidor: str, timeout: float = 2.0, cache_seg: float = 30.0, token: str | None = None):
+        p = urlparse(url_servidor)
+        self.host = p.hostname or "127.0.0.1"
+        self.puerto = p.port or 80
+        self.timeout = timeout
+        self._cabeceras = {"Content-Type": "application/json"}
+        if token:
+            self._cabeceras["Authorization"] = f"Bearer {token}"
+        self.cache_seg = cache_seg
+        self._local = threading.local()
+        self._cache_id = {}  # (url, tipo) -> (usuario, expira)
+        self._estacion = None
+
+    # ---------- util interna ----------
+    def _conexion(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.puerto, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _llamar(self, metodo: str, *args):
+        cuerpo = json.dumps({"args": list(args)}).encode("utf-8")
+        for intento in (1, 2):  # un reintento: la conexión keep-alive pudo cerrarse del otro lado
+            conn = self._conexion()
+            try:
+                conn.request("POST", f"{self.RUTA}{metodo}", body=cuerpo, headers=self._cabeceras)
+                resp = conn.getresponse()
+                datos = json.loads(resp.read() or b"{}")
+                break
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                conn.close()
+                self._local.conn = None
+                if intento == 2:
+                    raise ErrorServidor(f"Servidor central no disponible ({metodo}): {e}") from e
+        if not datos.get("ok"):
+            raise ErrorServidor(f"Error del servidor central en {metodo}: {datos.get('error')}")
+        return datos.get("resultado")
+
+    def _cache_get(self, url: str, tipo: str):
+        item = self._cache_id.get((url, tipo))
+        if item and item[1] > time.monotonic():
+            return item[0]
+        return None
+
+    def _cache_put(self, url: str, tipo: str, usuario):
+        if usuario:
+            self._cache_id[(url, tipo)] = (usuario, time.monotonic() + self.cache_seg)
+
+    # ---------- INSERTS ----------
+    def insertar_alumno(self, alumno, tiene_bici_guardada: bool):
+        self._llamar("insertar_alumno", alumno.to_dict(), tiene_bici_guardada)
+        self._cache_put(alumno.url, "alumno", alumno)
+
+    def insertar_profesor(self, profesor, tiene_bici_guardada: bool):
+        self._llamar("insertar_profesor", profesor.to_dict(), tiene_bici_guardada)
+        self._cache_put(profesor.url, "profesor", profesor)
+
+    # ---------- LECTURA DE REGISTROS COMPLETOS ----------
+    def obtener_usuario(self, url: str, tipo: str):
+        usuario = self._cache_get(url, tipo)
+        if usuario is None:
+            datos = self._llamar("obtener_usuario", url, tipo)
+            if datos is None:
+                return None
+            usuario = MODELOS[tipo](**datos)
+            usuario.pin = None   # el servidor no lo envía; el constructor habría puesto el PIN por defecto
+            self._cache_put(url, tipo, usuario)
+        return usuario
+
+    # ---------- CONSULTAS DE EXISTENCIA/IDENTIFICADOR ----------
+    def existe_url(self, url: str, tipo: str) -> bool:
+        if self._cache_get(url, tipo):
+            return True
+        return bool(self._llamar("existe_url", url, tipo))
+
+    def obtener_identificador_por_url(self, url: str, tipo: str) -> str | None:
+        usuario = self.obtener_usuario(url, tipo)
+        return getattr(usuario, usuario.IDENTIFICADOR) if usuario else None
+
+    # ---------- ACTUALIZACIONES ----------
+    def actualizar_accion(self, url: str, accion: str, tipo: str):
+        self._llamar("actualizar_accion", url, accion, tipo)
+
+    # ---------- DECISIÓN DE ACCESO (atómica en el servidor) ----------
+    def decidir_acceso(self, identificador_cif: str, tipo: str, pin: str | None = None,
+                       cupo: int | None = None, exigir_pin: bool = True) -> str:
+        # exigir_pin no viaja: el servidor siempre pide el PIN para una salida.
+        return self._llamar("decidir_acceso", identificador_cif, tipo, pin, cupo)
+
+    def confirmar_acceso(self, identificador_cif: str, tipo: str, nuevo_estado: bool, ok: bool):
+        self._llamar("confirmar_acceso", identificador_cif, tipo, nuevo_estado, ok)
+
+    def contar_bicis_guardadas(self, tipo: str) -> int:
+        return int(self._llamar("contar_bicis_guardadas", tipo))
+
+    # ---------- RECORRIDO DE URLS (huellas de URLs conocidas para el prefetch de EscanerQR) ----------
+    def pagina_urls(self, tipo: str, desde_id: int = 0, lote: int = 500) -> list:
+        return self._llamar("pagina_urls", tipo, desde_id, lote)
+
+    def iterar_urls(self, tipo: str, desde_id: int = 0, lote: int = 500):
+        while True:
+            filas = self.pagina_urls(tipo, desde_id, lote)
+            if not filas:
+                return
+            yield from filas
+            desde_id = filas[-1][0]
+
+    # ---------- RANURAS (la tabla distingue estaciones, así el servidor guarda todos los racks) ----------
+    def ranuras_ocupadas(self, estacion: str) -> list:
+        return self._llamar("ranuras_ocupadas", estacion)
+
+    def asignar_ranura(self, estacion: str, ranura: int, tipo: str, identificador_cif: str):
+        self._llamar("asignar_ranura", estacion, ranura, tipo, identificador_cif)
+
+    def liberar_ranura(self, estacion: str, ranura: int):
+        self._llamar("liberar_ranura", estacion, ranura)
+
+    def ranura_de_usuario(self, tipo: str, identificador_cif: str) -> list | None:
+        return self._llamar("ranura_de_usuario", tipo, identificador_cif)
+
+    def bicis_sin_ranura(self) -> int:
+        return int(self._llamar("bicis_sin_ranura"))
+
+    # ---------- ID DE ESTACIÓN (del servidor) ----------
+    @property
+    def estacion(self) -> str:
+        if self._estacion is None:
+            self._estacion = self._llamar("estacion")
+        return self._estacion
+
+
+class ParReplica(BaseDatosRemota):
+    """Hub de réplica remoto: solo los métodos que usa el Replicador, por el canal /replica/."""
+    RUTA = "/replica/"
+
+    def cambios_desde(self, seq: int, limite: int = 500) -> list:
+        return self._llamar("cambios_desde", seq, limite)
+
+    def marca_par(self, par: str) -> int:
+        return self._llamar("marca_par", par)
+
+    def aplicar_cambios(self, cambios: list, par: str) -> int:
+        return self._llamar("aplicar_cambios", cambios, par)
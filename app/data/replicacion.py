@@ -0,0 +1,92 @@
+"""
+app/data/replicacion.py
+-----------------------
+Sincronización incremental de la bitácora 'cambios' entre estaciones (ver app/data/db.py).
+
+- Cada estación trabaja SIEMPRE contra su BaseDatos local: si se cae el enlace, sigue operando.
+- Un Replicador empuja y jala cambios con cada par (otra BaseDatos local o un hub remoto
+  vía ParReplica, por el canal /replica/ con "replicacion.token") por número de secuencia:
+  solo viaja lo que el otro no ha visto.
+- La puesta al día está acotada: lotes de 'lote' cambios y como máximo 'max_lotes' por ronda;
+  lo que quede pendiente se completa en la siguiente ronda sin bloquear la estación.
+  Tras cada ronda se compacta la bitácora (un cambio por usuario).
+
+Topologías: estrella (todas contra un hub: "pares": ["http://hub:8765"]) o pares directos.
+
+Un par con el MISMO id de estación que la nuestra (p. ej. una tarjeta SD clonada, o el mismo
+"estacion_id" en dos config.json) no se sincroniza: sus cambios parecerían propios y se
+descartarían sin aviso, y las marcas de sync_pares se pisarían. Se reporta y se omite.
+"""
+
+import threading
+from app.data.remota import ErrorServidor
+
+
+class EstacionDuplicada(ValueError):
+    """El par usa nuestro mismo id de estación."""
+
+
+class Replicador:
+    def __init__(self, db, pares: list, lote: int = 500, max_lotes: int = 20):
+        self.db = db
+        self.pares = pares
+        self.lote = lote
+        self.max_lotes = max_lotes
+        self._detener = threading.Event()
+        self._hilo = None
+        self._duplicados = set()   # pares ya reportados con id repetido (se avisa una vez)
+
+    def _transferir(self, origen, destino, nombre_origen: str) -> tuple[int, bool]:
+        """Copia cambios de 'origen' a 'destino'. Devuelve (aplicados, ¿quedó al día?)."""
+        marca = destino.marca_par(nombre_origen)
+        aplicados = 0
+        for _ in range(self.max_lotes):
+            cambios = origen.cambios_desde(marca, self.lote)
+            if not cambios:
+                return aplicados, True
+            aplicados += destino.aplicar_cambios(cambios, nombre_origen)
+            marca = cambios[-1]["seq"]
+            if len(cambios) < self.lote:
+                return aplicados, True
+        return aplicados, False
+
+    def sincronizar(self, par) -> dict:
+        """Una ronda con un par: primero empujamos lo nuestro, luego jalamos lo suyo."""
+        nombre_par = par.estacion
+        if nombre_par == self.db.estacion:
+            raise EstacionDuplicada(f"el par usa nuestro mismo id de estación '{nombre_par}'; "
+                                    f"configure un 'replicacion.estacion_id' distinto en cada estación")
+        enviados, al_dia_envio = self._transferir(self.db, par, self.db.estacion)
+        recibidos, al_dia_recibo = self._transferir(par, self.db, nombre_par)
+        return {"par": nombre_par, "enviados": enviados, "recibidos": recibidos,
+                "al_dia": al_dia_envio and al_dia_recibo}
+
+    def ronda(self) -> list:
+        """Sincroniza con todos los pares; un par caído no detiene a los demás."""
+        resultados = []
+        for par in self.pares:
+            try:
+                resultados.append(self.sincronizar(par))
+            except (ErrorServidor, OSError) as e:
+                print(f"Réplica: par no disponible, se reintentará ({e}).")
+            except EstacionDuplicada as e:
+                if id(par) not in self._duplicados:
+                    self._duplicados.add(id(par))
+                    print(f"Réplica omitida: {e}.")
+        self.db.compactar_cambios()
+        return resultados
+
+    # ---------- ejecución periódica en segundo plano ----------
+    def iniciar(self, intervalo_seg: float = 10.0):
+        def bucle():
+            while not self._detener.wait(intervalo_seg):
+                for r in self.ronda():
+                    if r["enviados"] or r["recibidos"]:
+                        print(f"Réplica con {r['par']}: {r['enviados']} enviados, {r['recibidos']} recibidos.")
+        self._hilo = threading.Thread(target=bucle, name="replicador", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
@@ -0,0 +1,223 @@
+"""
+app/data/respaldo.py
+--------------------
+Respaldos en caliente de la BD SQLite, sin detener la estación ni copiar un archivo a medio escribir.
+
+Cada 'intervalo_seg' un hilo:
+  1) Copia la BD con la API de respaldo en línea de SQLite (Connection.backup) en pasos de
+     'paginas_por_paso' páginas con 'pausa_seg' entre pasos, dentro de una transacción de
+     lectura: con WAL (BaseDatos lo activa) la copia es una instantánea consistente y los
+     escaneos siguen leyendo y escribiendo en medio. Si aun así SQLite reinicia la copia más
+     de 'max_reinicios' veces, se deja para 'reintento_seg' después.
+  2) Comprime la copia a respaldos/<bd>-AAAAmmdd-HHMMSS.db.gz (se escribe como .parcial y se
+     renombra al final: nunca queda un respaldo truncado con nombre válido).
+  3) Verifica el .gz: lo descomprime (CRC de gzip) y corre PRAGMA integrity_check.
+  4) Rota: conserva los 'conservar' más recientes.
+
+Uso (también con el sistema corriendo, salvo --restaurar):
+  python -m app.data.respaldo                   -> respaldo inmediato
+  python -m app.data.respaldo --listar
+  python -m app.data.respaldo --verificar [archivo]
+  python -m app.data.respaldo --restaurar ultimo|archivo   (con el sistema DETENIDO)
+La restauración verifica el respaldo y conserva la BD actual como <bd>.antes_de_restaurar.
+"""
+
+import argparse, contextlib, datetime, glob, gzip, os, shutil, sqlite3, tempfile, threading, time
+
+
+class RespaldoAbortado(Exception):
+    pass
+
+
+def verificar(archivo_gz: str) -> str | None:
+    """Descomprime a un temporal y corre integrity_check. Devuelve None si está bien, o el error."""
+    fd, tmp = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(archivo_gz) or ".")
+    os.close(fd)
+    try:
+        with gzip.open(archivo_gz, "rb") as origen, open(tmp, "wb") as destino:
+            shutil.copyfileobj(origen, destino, 1 << 20)
+        with contextlib.closing(sqlite3.connect(tmp)) as conn:
+            resultado = conn.execute("PRAGMA integrity_check").fetchall()
+        return None if resultado == [("ok",)] else str(resultado[:5])
+    except (OSError, EOFError, sqlite3.DatabaseError) as e:
+        return str(e)
+    finally:
+        os.remove(tmp)
+
+
+class Respaldo:
+    def __init__(self, archivo: str, directorio: str = "respaldos", intervalo_seg: float = 24 * 3600,
+                 conservar: int = 7, paginas_por_paso: int = 64, pausa_seg: float = 0.05,
+                 max_reinicios: int = 5, reintento_seg: float = 600):
+        self.archivo = archivo
+        self.directorio = directorio
+        self.intervalo_seg = intervalo_seg
+        self.conservar = conservar
+        self.paginas_por_paso = paginas_por_paso
+        self.pausa_seg = pausa_seg
+        self.max_reinicios = max_reinicios
+        self.reintento_seg = reintento_seg
+        self.prefijo = os.path.splitext(os.path.basename(archivo))[0]
+        self._detener = threading.Event()
+        self._hilo = None
+
+    # ---------- archivos ----------
+    def existentes(self) -> list:
+        """Respaldos completos, del más antiguo al más reciente (el nombre lleva la fecha)."""
+        return sorted(glob.glob(os.path.join(self.directorio, f"{self.prefijo}-*.db.gz")))
+
+    def _rotar(self):
+        if self.conservar <= 0:   # 0 = conservar todos
+            return
+        for viejo in self.existentes()[:-self.conservar]:
+            os.remove(viejo)
+            print(f"Respaldo: eliminado {viejo} (se conservan {self.conservar}).")
+
+    def proximo(self) -> float:
+        """Segundos hasta el siguiente respaldo (según el más reciente en disco)."""
+        existentes = self.existentes()
+        if not existentes:
+            return 0.0
+        return max(os.path.getmtime(existentes[-1]) + self.intervalo_seg - time.time(), 0.0)
+
+    # ---------- respaldo ----------
+    def _copiar(self, destino: str) -> tuple[int, int]:
+        """Copia en línea por pasos. Devuelve (páginas, reinicios)."""
+        estado = {"restante": None, "total": 0, "reinicios": 0}
+
+        def progreso(status, restante, total):
+            if self._detener.is_set():
+                raise RespaldoAbortado("deteniendo")
+            if estado["restante"] is not None and restante > estado["restante"]:
+                estado["reinicios"] += 1   # otra conexión escribió: SQLite empezó de nuevo
+                if estado["reinicios"] > self.max_reinicios:
+                    raise RespaldoAbortado(f"la BD cambió {estado['reinicios']} veces durante la copia")
+            estado["restante"], estado["total"] = restante, total
+            if restante:
+                time.sleep(self.pausa_seg)   # backup(sleep=...) solo espera si la BD está ocupada
+
+        with contextlib.closing(sqlite3.connect(self.archivo, isolation_level=None)) as origen, \
+                contextlib.closing(sqlite3.connect(destino)) as copia:
+            # Transacción de lectura abierta durante toda la copia: con WAL fija una instantánea,
+            # los escritores siguen sin esperar y la copia no se reinicia con cada escaneo.
+            origen.execute("BEGIN")
+            origen.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            try:
+                origen.backup(copia, pages=self.paginas_por_paso, progress=progreso, sleep=self.pausa_seg)
+            finally:
+                origen.execute("COMMIT")
+        return estado["total"], estado["reinicios"]
+
+    def respaldar(self) -> str:
+        """Un respaldo completo (copiar, comprimir, verificar, rotar). Devuelve la ruta del .gz."""
+        os.makedirs(self.directorio, exist_ok=True)
+        nombre = f"{self.prefijo}-{datetime.datetime.now():%Y%m%d-%H%M%S}.db.gz"
+        final = os.path.join(self.directorio, nombre)
+        copia = final[:-3] + ".parcial"
+        parcial = final + ".parcial"
+        inicio = time.monotonic()
+        try:
+            paginas, reinicios = self._copiar(copia)
+            with open(copia, "rb") as origen, gzip.open(parcial, "wb", compresslevel=6) as destino:
+                shutil.copyfileobj(origen, destino, 1 << 20)
+            error = verificar(parcial)
+            if error:
+                raise RespaldoAbortado(f"verificación fallida: {error}")
+            os.replace(parcial, final)
+        finally:
+            for tmp in (copia, parcial):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        print(f"Respaldo: {final} ({paginas} páginas, {os.path.getsize(final) // 1024} KB, "
+              f"{reinicios} reinicios, {time.monotonic() - inicio:.1f} s) verificado.")
+        self._rotar()
+        return final
+
+    # ---------- ejecución en hilo ----------
+    def iniciar_en_hilo(self):
+        def bucle():
+            espera = self.proximo()
+            while not self._detener.wait(espera):
+                try:
+                    self.respaldar()
+                    espera = self.intervalo_seg
+                except (RespaldoAbortado, OSError, sqlite3.Error) as e:
+                    if self._detener.is_set():
+                        break
+                    print(f"Respaldo fallido ({e}); se reintentará en {self.reintento_seg:.0f} s.")
+                    espera = self.reintento_seg
+        self._hilo = threading.Thread(target=bucle, name="respaldo", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=10)
+
+
+def restaurar(archivo_gz: str, archivo_db: str):
+    """Reemplaza la BD por el respaldo (verificado). Ejecutar con el sistema detenido."""
+    error = verificar(archivo_gz)
+    if error:
+        raise ValueError(f"{archivo_gz} no pasa la verificación: {error}")
+    tmp = archivo_db + ".restaurando"
+    with gzip.open(archivo_gz, "rb") as origen, open(tmp, "wb") as destino:
+        shutil.copyfileobj(origen, destino, 1 << 20)
+    if os.path.exists(archivo_db):
+        os.replace(archivo_db, archivo_db + ".antes_de_restaurar")
+    # El WAL y el índice compartido pertenecen a la BD anterior: aplicados a la restaurada la corrompen.
+    for sufijo in ("-wal", "-shm"):
+        if os.path.exists(archivo_db + sufijo):
+            os.replace(archivo_db + sufijo, archivo_db + ".antes_de_restaurar" + sufijo)
+    os.replace(tmp, archivo_db)
+    print(f"BD restaurada desde {archivo_gz}; la anterior quedó en {archivo_db}.antes_de_restaurar.")
+
+
+def crear_respaldo(archivo: str, conf: dict) -> Respaldo:
+    return Respaldo(archivo, directorio=conf.get("directorio", "respaldos"),
+                    intervalo_seg=conf.get("intervalo_seg", 86400), conservar=conf.get("conservar", 7),
+                    paginas_por_paso=conf.get("paginas_por_paso", 64), pausa_seg=conf.get("pausa_seg", 0.05))
+
+
+def main():
+    from app.config import CONFIG
+
+    parser = argparse.ArgumentParser(description="Respaldos en caliente de la BD SQLite.")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--listar", action="store_true", help="listar respaldos disponibles")
+    grupo.add_argument("--verificar", nargs="?", const="todos", metavar="ARCHIVO",
+                       help="verificar un respaldo (por defecto todos)")
+    grupo.add_argument("--restaurar", metavar="ARCHIVO", help="'ultimo' o la ruta de un respaldo (sistema detenido)")
+    args = parser.parse_args()
+
+    respaldo = crear_respaldo(CONFIG["database_file"], CONFIG.get("respaldo", {}))
+    existentes = respaldo.existentes()
+    if args.listar:
+        for archivo in existentes:
+            print(f"{archivo}  {os.path.getsize(archivo) // 1024} KB")
+        print(f"{len(existentes)} respaldo(s) en '{respaldo.directorio}'.")
+    elif args.verificar:
+        archivos = existentes if args.verificar == "todos" else [args.verificar]
+        errores = 0
+        for archivo in archivos:
+            error = verificar(archivo)
+            errores += error is not None
+            print(f"{archivo}: {'OK' if error is None else error}")
+        if errores:
+            raise SystemExit(1)
+    elif args.restaurar:
+        if args.restaurar == "ultimo":
+            if not existentes:
+                raise SystemExit(f"No hay respaldos en '{respaldo.directorio}'.")
+            args.restaurar = existentes[-1]
+        try:
+            restaurar(args.restaurar, CONFIG["database_file"])
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"Restauración cancelada: {e}")
+    else:
+        respaldo.respaldar()
+
+
+if __name__ == "__main__":
+    main()
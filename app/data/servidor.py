@@ -0,0 +1,187 @@
+"""
+app/data/servidor.py
+--------------------
+Servicio central de decisiones: varias estaciones comparten UNA base de datos.
+
+- Expone por HTTP/JSON (solo stdlib) los mismos métodos que BaseDatos, así las
+  estaciones deciden entrada/salida/registro con el estado compartido y un usuario
+  registrado en una estación ya no se vuelve a scrapear en la siguiente.
+- Todas las escrituras pasan por un único candado: SQLite recibe un solo escritor
+  a la vez y no hay carreras entre estaciones sobre el mismo usuario.
+
+Protocolo:
+  POST /api/<metodo>   cuerpo: {"args": [...]}   -> {"ok": true, "resultado": ...}
+  GET  /api/salud                                -> {"ok": true}
+  POST /replica/<metodo>                         -> canal de réplica (ver abajo)
+Los objetos Alumno/Profesor viajan como dict (to_dict) y se reconstruyen del otro lado;
+los que salen del servidor (obtener_usuario) van sin PIN ni los cifrados que no son el
+identificador (curp, clave presupuestal).
+
+Hub de réplica: cambios_desde / aplicar_cambios / marca_par NO están en /api/. Leer la
+bitácora entrega identificadores de todos los usuarios y aplicar_cambios escribe filas
+completas sin pasar por decidir_acceso (candado, PIN, límite de intentos). Van por su propio
+canal, /replica/<metodo>, con su propio token (config.json -> replicacion.token); sin ese
+token configurado el canal está cerrado. Las fotos de la bitácora no llevan PIN ni cifrados
+secundarios (ver app/data/db.py).
+
+Seguridad:
+- Cada POST lleva "Authorization: Bearer <token>" (config.json -> servidor_central.token,
+  el mismo en servidor y estaciones); sin token válido responde 401.
+- Escucha en 127.0.0.1 por defecto. Para escuchar en la red hay que configurar un token:
+  sin él el servidor se niega a arrancar.
+- El flag de bici y el PIN no se exponen sueltos (nada de obtener_estado_bici/validar_pin/
+  actualizar_estado_bici): la estación pide decidir_acceso, que lee, valida el PIN (con
+  límite de intentos) y reserva al usuario bajo el candado de escritura, y luego
+  confirmar_acceso. Antes leer -> mover -> escribir eran llamadas separadas y dos
+  estaciones podían decidir lo mismo sobre el mismo usuario.
+
+Uso:  python main.py --servidor
+"""
+
+import hmac, ipaddress, json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.data.db import MODELOS
+
+# Métodos de BaseDatos que las estaciones pueden invocar remotamente (/api/).
+LECTURAS = {"existe_url", "obtener_usuario", "estacion", "ranuras_ocupadas", "ranura_de_usuario",
+            "bicis_sin_ranura", "contar_bicis_guardadas", "pagina_urls"}
+ESCRITURAS = {"insertar_alumno", "insertar_profesor", "actualizar_accion", "decidir_acceso", "confirmar_acceso",
+              "asignar_ranura", "liberar_ranura"}
+# Canal de réplica (/replica/, token propio).
+REPLICA_LECTURAS = {"estacion", "cambios_desde", "marca_par"}
+REPLICA_ESCRITURAS = {"aplicar_cambios"}
+CANALES = {"/api/": (LECTURAS, ESCRITURAS), "/replica/": (REPLICA_LECTURAS, REPLICA_ESCRITURAS)}
+# Argumentos posicionales aceptados por método (decidir_acceso: sin 'exigir_pin', que es local).
+MAX_ARGS = {"decidir_acceso": 4}
+
+
+def _es_local(host: str) -> bool:
+    try:
+        return host == "localhost" or ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _reconstruir_args(metodo: str, args: list) -> list:
+    """insertar_* recibe el modelo como dict; lo volvemos a convertir en objeto."""
+    if metodo in ("insertar_alumno", "insertar_profesor"):
+        modelo = MODELOS[metodo.removeprefix("insertar_")]
+        return [modelo(**args[0])] + list(args[1:])
+    return args
+
+
+def _serializar(resultado):
+    """Alumno/Profesor -> dict sin el PIN (se valida aquí, nunca sale del servidor) ni los cifrados que no usa la estación."""
+    if type(resultado) in MODELOS.values():
+        datos = resultado.to_dict()
+        datos.pop("pin", None)
+        for campo in resultado.CIFRADOS:
+            if campo != resultado.IDENTIFICADOR:
+                datos[campo] = None
+        return datos
+    return resultado
+
+
+class ServidorAcceso:
+    def __init__(self, db, host: str = "127.0.0.1", puerto: int = 8765, token: str | None = None,
+                 token_replica: str | None = None):
+        if not token and not _es_local(host):
+            raise ValueError(f"El servidor central no escucha en '{host}' sin token: configure "
+                             f"'servidor_central.token' (o use host 127.0.0.1).")
+        self.db = db
+        self.token = token or None
+        self.token_replica = token_replica or None   # None: canal de réplica cerrado
+        self._lock_escritura = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, puerto), self._crear_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def direccion(self) -> str:
+        host, puerto = self.httpd.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    @property
+    def lock_escritura(self) -> threading.Lock:
+        """Lock que serializa las escrituras; el mantenimiento de la BD lo toma en cada paso."""
+        return self._lock_escritura
+
+    def ejecutar(self, metodo: str, args: list):
+        """Despacha una llamada; las escrituras se serializan con el candado."""
+        funcion = getattr(self.db, metodo)
+        if not callable(funcion):  # atributos simples (p. ej. 'estacion')
+            return funcion
+        args = _reconstruir_args(metodo, args)[:MAX_ARGS.get(metodo)]
+        if metodo in ESCRITURAS or metodo in REPLICA_ESCRITURAS:
+            with self._lock_escritura:
+                return _serializar(funcion(*args))
+        return _serializar(funcion(*args))
+
+    def _crear_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive: los clientes reusan la conexión
+            disable_nagle_algorithm = True  # cabeceras y cuerpo van en escrituras separadas
+
+            def _responder(self, codigo: int, cuerpo: dict, cerrar: bool = False):
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                if cerrar:
+                    self.send_header("Connection", "close")
+                    self.close_connection = True
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _autorizado(self, token: str | None) -> bool:
+                if token is None:
+                    return True
+                recibido = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                return hmac.compare_digest(recibido.encode("utf-8"), token.encode("utf-8"))
+
+            def do_GET(self):
+                if self.path == "/api/salud":
+                    self._responder(200, {"ok": True})
+                else:
+                    self._responder(404, {"ok": False, "error": "ruta desconocida"})
+
+            def do_POST(self):
+                canal = "/replica/" if self.path.startswith("/replica/") else "/api/"
+                if canal == "/replica/" and servidor.token_replica is None:
+                    self._responder(404, {"ok": False, "error": "canal de réplica cerrado"}, cerrar=True)
+                    return
+                if not self._autorizado(servidor.token_replica if canal == "/replica/" else servidor.token):
+                    # El cuerpo no se lee: se cierra la conexión para no dejarlo en el socket.
+                    self._responder(401, {"ok": False, "error": "token inválido"}, cerrar=True)
+                    return
+                metodo = self.path.removeprefix(canal)
+                lecturas, escrituras = CANALES[canal]
+                if metodo not in lecturas and metodo not in escrituras:
+                    self._responder(404, {"ok": False, "error": f"método no permitido: {metodo}"}, cerrar=True)
+                    return
+                try:
+                    largo = int(self.headers.get("Content-Length", 0))
+                    cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+                    resultado = servidor.ejecutar(metodo, cuerpo.get("args", []))
+                    self._responder(200, {"ok": True, "resultado": resultado})
+                except Exception as e:
+                    self._responder(500, {"ok": False, "error": str(e)})
+
+            def log_message(self, *args):
+                pass  # sin log por petición: el servidor atiende ráfagas de escaneos
+
+        return Handler
+
+    def iniciar(self):
+        print(f"Servidor central escuchando en {self.direccion} ... (Ctrl+C para salir).")
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nSaliendo...")
+        finally:
+            self.httpd.server_close()
+
+    def detener(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
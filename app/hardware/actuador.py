@@ -0,0 +1,134 @@
+"""
+app/hardware/actuador.py
+------------------------
+Trabajador dedicado para mover la cerradura sin bloquear el flujo de escaneo.
+
+- ControlAcceso encola un comando ('abierto' / 'cerrado') y regresa de inmediato;
+  este hilo energiza, espera los sensores de fin de carrera y desenergiza.
+- Máquina de estados explícita de la cerradura:
+      inactivo -> abriendo -> abierto -> cerrando -> cerrado -> abriendo ...
+      abriendo/cerrando -> falla   (timeout tras agotar reintentos)
+      falla -> abriendo/cerrando   (un comando nuevo lo vuelve a intentar)
+- Política de timeout y reintentos configurable (config.json -> "actuador").
+- En un rack cada ranura tiene su propia máquina de estados. Un solo hilo mueve una
+  cerradura a la vez (evita picos de corriente con varios motores arrancando juntos).
+- Al terminar cada comando se invoca su callback con ok=True/False; ahí es donde
+  ControlAcceso actualiza la BD, es decir, solo cuando el movimiento se confirmó.
+"""
+
+import queue, threading, time
+from collections import defaultdict
+from app.hardware.gpio_ctrl import leer_estado_actuador, energizar, desenergizar
+
+INACTIVO, ABRIENDO, ABIERTO, CERRANDO, CERRADO, FALLA = (
+    "inactivo", "abriendo", "abierto", "cerrando", "cerrado", "falla")
+
+TRANSICIONES = {
+    INACTIVO: {ABRIENDO, CERRANDO},
+    ABRIENDO: {ABIERTO, FALLA, ABRIENDO},   # ABRIENDO -> ABRIENDO = reintento
+    CERRANDO: {CERRADO, FALLA, CERRANDO},
+    ABIERTO: {CERRANDO, ABRIENDO},
+    CERRADO: {ABRIENDO, CERRANDO},
+    FALLA: {ABRIENDO, CERRANDO, INACTIVO},
+}
+
+# objetivo -> (estado en movimiento, valores de pin_a/pin_b)
+MOVIMIENTOS = {
+    ABIERTO: (ABRIENDO, (0, 1)),   # giro sentido "abrir" (salida)
+    CERRADO: (CERRANDO, (1, 0)),   # giro sentido "cerrar" (entrada)
+}
+
+
+class Comando:
+    __slots__ = ("objetivo", "al_terminar", "descripcion", "ranura")
+
+    def __init__(self, objetivo: str, al_terminar=None, descripcion: str = "", ranura=None):
+        self.objetivo = objetivo
+        self.al_terminar = al_terminar
+        self.descripcion = descripcion
+        self.ranura = ranura
+
+
+class TrabajadorActuador:
+    def __init__(self, timeout: float = 8.0, reintentos: int = 1, pausa_reintento: float = 0.5, max_cola: int = 4):
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.pausa_reintento = pausa_reintento
+        self.estados = defaultdict(lambda: INACTIVO)  # ranura -> estado
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._lock = threading.Lock()
+        self._hilo = threading.Thread(target=self._bucle, name="actuador", daemon=True)
+        self._hilo.start()
+
+    # ---------- máquina de estados ----------
+    def _transicion(self, ranura, nuevo: str):
+        with self._lock:
+            actual = self.estados[ranura]
+            if nuevo not in TRANSICIONES[actual]:
+                print(f"Actuador (ranura {ranura}): transición inválida {actual} -> {nuevo}.")
+            self.estados[ranura] = nuevo
+
+    def estado(self, ranura=None) -> str:
+        return self.estados[ranura]
+
+    def _esperar_movimiento_objetivo(self, estado_objetivo: str, ranura=None) -> bool:
+        """
+        Espera (hasta timeout) a que 'leer_estado_actuador()' coincida con el estado deseado.
+        Devuelve True si se confirmó el movimiento; False si hubo timeout.
+        """
+        inicio = time.monotonic()
+        while time.monotonic() - inicio < self.timeout:
+            if leer_estado_actuador(ranura) == estado_objetivo:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def _ejecutar(self, cmd: Comando) -> bool:
+        en_movimiento, pines = MOVIMIENTOS[cmd.objetivo]
+        for intento in range(1 + self.reintentos):
+            self._transicion(cmd.ranura, en_movimiento)
+            energizar(*pines, ranura=cmd.ranura)
+            try:
+                ok = self._esperar_movimiento_objetivo(cmd.objetivo, cmd.ranura)
+            finally:
+                desenergizar(cmd.ranura)
+            if ok:
+                self._transicion(cmd.ranura, cmd.objetivo)
+                return True
+            print(f"Advertencia: no se confirmó '{cmd.objetivo}' por sensores "
+                  f"(intento {intento + 1}/{1 + self.reintentos}).")
+            time.sleep(self.pausa_reintento)
+        self._transicion(cmd.ranura, FALLA)
+        return False
+
+    def _bucle(self):
+        while (cmd := self._cola.get()) is not None:
+            try:
+                ok = self._ejecutar(cmd)
+            except Exception as e:
+                print(f"Actuador: error al mover ranura {cmd.ranura} ({e}).")
+                desenergizar(cmd.ranura)
+                self._transicion(cmd.ranura, FALLA)
+                ok = False
+            if cmd.al_terminar:
+                try:
+                    cmd.al_terminar(ok)
+                except Exception as e:
+                    print(f"Actuador: error en callback de {cmd.descripcion or cmd.objetivo}: {e}")
+
+    # ---------- API pública ----------
+    def enviar(self, objetivo: str, al_terminar=None, descripcion: str = "", ranura=None) -> bool:
+        """Encola un movimiento. Devuelve False si la cola está llena (actuador saturado)."""
+        try:
+            self._cola.put_nowait(Comando(objetivo, al_terminar, descripcion, ranura))
+            return True
+        except queue.Full:
+            return False
+
+    def pendientes(self) -> int:
+        return self._cola.qsize()
+
+    def detener(self, timeout: float | None = None):
+        """Termina los comandos ya encolados y detiene el hilo."""
+        self._cola.put(None)
+        self._hilo.join(timeout)
@@ -7,10 +7,14 @@ Objetivos:
 - Si corremos en Linux y existe RPi.GPIO con pines configurados, activamos control real.
 - Si NO, caemos en "simulación": las funciones existen, pero no accionan hardware.
 - Exponemos funciones simples: leer_estado_actuador(), energizar(), desenergizar(), cleanup().
+- Rack con varias cerraduras: cada función acepta 'ranura' (id de config.json -> "ranuras").
+  Sin ranura se usa el actuador de 'gpio_pins', como antes. Sus pines se configuran también
+  cuando hay "ranuras": las bicis guardadas antes de existir las ranuras no tienen una
+  asignada y su salida abre ese actuador.
 """
 
 import warnings
-from app.config import SO, PINS
+from app.config import SO, PINS, RANURAS
 
 warnings.filterwarnings("ignore")
 
@@ -25,20 +29,28 @@ if SO == "Linux":
         _GPIO.setmode(_GPIO.BCM)
         _GPIO.setwarnings(False)
 
-        # Pines de salida (motor/actuador)
-        _GPIO.setup(PINS['pin_a'], _GPIO.OUT)
-        _GPIO.setup(PINS['pin_b'], _GPIO.OUT)
+        actuadores = list(RANURAS.values())
+        if PINS and PINS not in actuadores:
+            actuadores.append(PINS)   # actuador sin ranura (bicis guardadas antes del rack)
+        for pines in actuadores:
+            # Pines de salida (motor/actuador)
+            _GPIO.setup(pines['pin_a'], _GPIO.OUT)
+            _GPIO.setup(pines['pin_b'], _GPIO.OUT)
 
-        # Pines de entrada (sensores de fin de carrera)
-        _GPIO.setup(PINS['sensor_abierto'], _GPIO.IN, pull_up_down=_GPIO.PUD_DOWN)
-        _GPIO.setup(PINS['sensor_cerrado'], _GPIO.IN, pull_up_down=_GPIO.PUD_DOWN)
+            # Pines de entrada (sensores de fin de carrera)
+            _GPIO.setup(pines['sensor_abierto'], _GPIO.IN, pull_up_down=_GPIO.PUD_DOWN)
+            _GPIO.setup(pines['sensor_cerrado'], _GPIO.IN, pull_up_down=_GPIO.PUD_DOWN)
 
         GPIO = _GPIO
         GPIO_OK = True
     except Exception:
         print("GPIO no disponible o pines no configurados. Modo simulación activado.")
 
-def leer_estado_actuador():
+def _pines(ranura) -> dict:
+    """Pines de la ranura pedida; sin ranura (o desconocida) -> actuador de 'gpio_pins'."""
+    return RANURAS.get(ranura, PINS) if ranura is not None else PINS
+
+def leer_estado_actuador(ranura=None):
     """
     Lee sensores fin de carrera. Devuelve:
     - 'abierto'  : sensor_abierto activo y sensor_cerrado inactivo
@@ -48,27 +60,30 @@ def leer_estado_actuador():
     """
     if not GPIO_OK:
         return "simulado"
-    abierto = GPIO.input(PINS['sensor_abierto'])
-    cerrado = GPIO.input(PINS['sensor_cerrado'])
+    pines = _pines(ranura)
+    abierto = GPIO.input(pines['sensor_abierto'])
+    cerrado = GPIO.input(pines['sensor_cerrado'])
     if abierto and not cerrado: return "abierto"
     if cerrado and not abierto: return "cerrado"
     return "error"
 
-def energizar(pin_a_val: int, pin_b_val: int):
+def energizar(pin_a_val: int, pin_b_val: int, ranura=None):
     """
     Activa los pines de salida para provocar giro del actuador.
     - Para cerrar (entrada), normalmente (1,0)
     - Para abrir (salida),  normalmente (0,1)
     """
     if GPIO_OK:
-        GPIO.output(PINS['pin_a'], pin_a_val)
-        GPIO.output(PINS['pin_b'], pin_b_val)
+        pines = _pines(ranura)
+        GPIO.output(pines['pin_a'], pin_a_val)
+        GPIO.output(pines['pin_b'], pin_b_val)
 
-def desenergizar():
+def desenergizar(ranura=None):
     """Apaga ambos pines (detiene el actuador)."""
     if GPIO_OK:
-        GPIO.output(PINS['pin_a'], 0)
-        GPIO.output(PINS['pin_b'], 0)
+        pines = _pines(ranura)
+        GPIO.output(pines['pin_a'], 0)
+        GPIO.output(pines['pin_b'], 0)
 
 def cleanup():
     """Libera los recursos del GPIO (llamar al final del programa)."""
@@ -0,0 +1,437 @@
+"""
+app/hardware/lector.py
+----------------------
+Fuentes de entrada para el lector QR (de dónde llegan las cadenas escaneadas).
+
+Backends disponibles (se eligen en config.json -> "entrada": {"tipo": ...}):
+- 'stdin'  : consola (comportamiento original; requiere que la terminal tenga el foco).
+- 'fifo'   : tubería con nombre (mkfifo). Cualquier proceso puede escribir líneas en ella.
+- 'socket' : servidor UNIX ("unix:/ruta.sock") o TCP ("tcp:127.0.0.1:7000"); una línea por escaneo.
+- 'evdev'  : dispositivo crudo /dev/input/eventX. Decodifica keycodes sin pasar por una TTY.
+
+Diseño:
+- Todas las fuentes son NO bloqueantes: esperan con 'selectors' y entregan líneas completas
+  con leer_linea(timeout). Si vence el timeout devuelven None.
+- El ensamblado de líneas se hace sobre un bytearray: las líneas completas se decodifican
+  desde una memoryview del buffer (sin copiarlo) y solo se recorta lo ya entregado.
+  Se acepta '\\n' o '\\r' como fin de escaneo (los lectores HID suelen mandar Enter).
+- Si el dispositivo desaparece (desconexión USB, FIFO borrada o reemplazada, socket caído)
+  la fuente se marca como desconectada y reintenta cada 'reintento_seg' sin tumbar el programa.
+  La FIFO no recibe EOF (mantiene su propio extremo de escritura), así que cada 'reintento_seg'
+  compara el inodo de la ruta con el del descriptor abierto (_vigilar).
+"""
+
+import os, re, sys, abc, time, stat, errno, socket, struct, selectors, threading
+from collections import deque
+
+_FIN_LINEA = re.compile(rb"[\r\n]")
+
+
+class FuenteEntrada(abc.ABC):
+    """Base común: selector, ensamblado de líneas y ciclo de reconexión."""
+
+    descripcion = "base"
+    vigilar_seg = None  # cada cuánto llamar a _vigilar() estando conectada (None = nunca)
+
+    def __init__(self, reintento_seg: float = 1.0):
+        self.reintento_seg = reintento_seg
+        self.conectada = False
+        self._sel = selectors.DefaultSelector()
+        self._buffer = bytearray()
+        self._lineas = deque()
+        self._ultimo_intento = 0.0
+        self._ultima_vigilancia = 0.0
+        self._avisado = False  # evita repetir el mismo aviso en cada reintento
+        self.agotada = False  # True si el recurso terminó y no admite reconexión (EOF de consola)
+
+    # ---------- a implementar por cada backend ----------
+    @abc.abstractmethod
+    def _conectar(self):
+        """Abre el recurso y registra sus descriptores en self._sel."""
+
+    @abc.abstractmethod
+    def _desconectar(self):
+        """Libera los descriptores del recurso (sin lanzar)."""
+
+    @abc.abstractmethod
+    def _atender(self, clave):
+        """Lee del descriptor listo y llama a _alimentar(...)."""
+
+    def _vigilar(self):
+        """Revisión periódica del recurso conectado; lanza OSError si hay que reconectar."""
+
+    # ---------- util interna ----------
+    def _alimentar(self, datos: bytes, buffer: bytearray | None = None):
+        """Agrega bytes al buffer y separa las líneas completas (ignora líneas vacías)."""
+        buf = self._buffer if buffer is None else buffer
+        buf += datos
+        if b"\n" not in datos and b"\r" not in datos:
+            return
+        fin = max(buf.rfind(b"\n"), buf.rfind(b"\r")) + 1
+        inicio = 0
+        with memoryview(buf) as vista:
+            for m in _FIN_LINEA.finditer(buf, 0, fin):
+                linea = str(vista[inicio:m.start()], "utf-8", "replace").strip()
+                if linea:
+                    self._lineas.append(linea)
+                inicio = m.end()
+        del buf[:fin]  # lo que quede tras el último fin de línea es incompleto
+
+    def _intentar_conectar(self):
+        ahora = time.monotonic()
+        if ahora - self._ultimo_intento < self.reintento_seg:
+            return
+        self._ultimo_intento = ahora
+        try:
+            self._conectar()
+            self.conectada = True
+            self._avisado = False
+            print(f"Entrada conectada: {self.descripcion}")
+        except OSError as e:
+            self._desconectar()
+            if not self._avisado:
+                print(f"Entrada no disponible ({self.descripcion}): {e}. Reintentando...")
+                self._avisado = True
+
+    def _marcar_desconectada(self, motivo):
+        print(f"Entrada desconectada ({self.descripcion}): {motivo}")
+        self._desconectar()
+        self.conectada = False
+        self._buffer.clear()
+
+    # ---------- API pública ----------
+    def leer_linea(self, timeout: float | None = None) -> str | None:
+        """
+        Devuelve la siguiente línea escaneada, o None si vence el timeout.
+        timeout=None espera indefinidamente. Lanza EOFError si la fuente se agotó.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while not self._lineas:
+            if self.agotada:
+                raise EOFError
+            restante = None if limite is None else limite - time.monotonic()
+            if restante is not None and restante <= 0:
+                return None
+            if not self.conectada:
+                self._intentar_conectar()
+                if not self.conectada:
+                    time.sleep(self.reintento_seg if restante is None else min(self.reintento_seg, restante))
+                    continue
+            espera = restante
+            if self.vigilar_seg is not None:
+                espera = self.vigilar_seg if espera is None else min(espera, self.vigilar_seg)
+            for clave, _ in self._sel.select(espera):
+                try:
+                    self._atender(clave)
+                except OSError as e:
+                    self._marcar_desconectada(e)
+                    break
+            if self.conectada and self.vigilar_seg is not None:
+                ahora = time.monotonic()
+                if ahora - self._ultima_vigilancia >= self.vigilar_seg:
+                    self._ultima_vigilancia = ahora
+                    try:
+                        self._vigilar()
+                    except OSError as e:
+                        self._marcar_desconectada(e)
+        return self._lineas.popleft()
+
+    def cerrar(self):
+        self._desconectar()
+        self.conectada = False
+        self._sel.close()
+
+
+# ---------------------------------------------------------------------------
+# STDIN
+# ---------------------------------------------------------------------------
+class FuenteStdin(FuenteEntrada):
+    """
+    Consola. En POSIX se espera con selectors sobre el descriptor 0.
+    En Windows (select no acepta consolas) un hilo lee la consola y reenvía por un
+    socketpair, de modo que el selector sigue siendo el único punto de espera.
+    Un EOF en consola termina el programa (EOFError), igual que input().
+    """
+
+    descripcion = "stdin"
+
+    def __init__(self, reintento_seg: float = 1.0):
+        super().__init__(reintento_seg)
+        self._rx = self._tx = None
+
+    def _conectar(self):
+        if os.name != "nt":
+            self._sel.register(sys.stdin.fileno(), selectors.EVENT_READ)
+            return
+        self._rx, self._tx = socket.socketpair()
+        self._rx.setblocking(False)
+        self._sel.register(self._rx, selectors.EVENT_READ)
+        threading.Thread(target=self._leer_en_hilo, daemon=True).start()
+
+    def _leer_en_hilo(self):
+        for linea in sys.stdin:
+            self._tx.sendall(linea.encode("utf-8", "replace"))
+        self._tx.close()
+
+    def _desconectar(self):
+        for obj in (self._rx, sys.stdin.fileno()):
+            try:
+                self._sel.unregister(obj)
+            except (KeyError, ValueError):
+                pass
+
+    def _atender(self, clave):
+        datos = self._rx.recv(4096) if self._rx is not None else os.read(clave.fd, 4096)
+        if not datos:
+            self.agotada = True
+            self._desconectar()
+            self._alimentar(b"\n")  # entrega lo pendiente antes de terminar
+            return
+        self._alimentar(datos)
+
+
+# ---------------------------------------------------------------------------
+# FIFO (tubería con nombre)
+# ---------------------------------------------------------------------------
+class FuenteFIFO(FuenteEntrada):
+    """
+    Lee líneas de una FIFO. Se crea si no existe.
+    Mantenemos abierto también un extremo de escritura propio: así, cuando el productor
+    cierra, la lectura no entra en un bucle de EOF y el siguiente productor se conecta solo.
+    Por lo mismo, si borran la FIFO (o la reemplazan por otra) no llega ningún EOF:
+    _vigilar compara el inodo de la ruta con el del descriptor y fuerza la reconexión.
+    """
+
+    def __init__(self, ruta: str, reintento_seg: float = 1.0):
+        super().__init__(reintento_seg)
+        self.ruta = ruta
+        self.descripcion = f"fifo:{ruta}"
+        self.vigilar_seg = reintento_seg
+        self._fd = None
+        self._fd_escritura = None
+
+    def _conectar(self):
+        if not os.path.exists(self.ruta):
+            os.mkfifo(self.ruta, 0o660)
+        elif not stat.S_ISFIFO(os.stat(self.ruta).st_mode):
+            raise OSError(errno.EINVAL, "la ruta existe y no es una FIFO", self.ruta)
+        self._fd = os.open(self.ruta, os.O_RDONLY | os.O_NONBLOCK)
+        self._fd_escritura = os.open(self.ruta, os.O_WRONLY | os.O_NONBLOCK)
+        self._sel.register(self._fd, selectors.EVENT_READ)
+
+    def _desconectar(self):
+        if self._fd is not None:
+            try:
+                self._sel.unregister(self._fd)
+            except (KeyError, ValueError):
+                pass
+        for fd in (self._fd, self._fd_escritura):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._fd = self._fd_escritura = None
+
+    def _atender(self, clave):
+        try:
+            datos = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        if datos:
+            self._alimentar(datos)
+
+    def _vigilar(self):
+        ruta, abierta = os.stat(self.ruta), os.fstat(self._fd)  # FileNotFoundError si la borraron
+        if (ruta.st_dev, ruta.st_ino) != (abierta.st_dev, abierta.st_ino):
+            raise OSError(errno.ESTALE, "la FIFO fue reemplazada", self.ruta)
+
+
+# ---------------------------------------------------------------------------
+# SOCKET (UNIX o TCP)
+# ---------------------------------------------------------------------------
+class FuenteSocket(FuenteEntrada):
+    """
+    Servidor que acepta varios productores a la vez; cada conexión tiene su propio buffer
+    para que los escaneos de dos clientes no se mezclen. Formatos de dirección:
+      "unix:/tmp/lector.sock"   |   "tcp:127.0.0.1:7000"
+    """
+
+    def __init__(self, direccion: str, reintento_seg: float = 1.0):
+        super().__init__(reintento_seg)
+        self.direccion = direccion
+        self.descripcion = f"socket:{direccion}"
+        self._servidor = None
+        self._clientes = {}  # socket -> bytearray
+
+    def _conectar(self):
+        esquema, _, resto = self.direccion.partition(":")
+        if esquema == "unix":
+            if os.path.exists(resto):
+                os.unlink(resto)
+            srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            srv.bind(resto)
+        elif esquema == "tcp":
+            host, _, puerto = resto.rpartition(":")
+            srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            srv.bind((host or "127.0.0.1", int(puerto)))
+        else:
+            raise OSError(errno.EINVAL, f"dirección no soportada: {self.direccion!r}")
+        srv.listen()
+        srv.setblocking(False)
+        self._servidor = srv
+        self._sel.register(srv, selectors.EVENT_READ)
+
+    def _cerrar_cliente(self, cli):
+        try:
+            self._sel.unregister(cli)
+        except (KeyError, ValueError):
+            pass
+        cli.close()
+        self._clientes.pop(cli, None)
+
+    def _desconectar(self):
+        for cli in list(self._clientes):
+            self._cerrar_cliente(cli)
+        if self._servidor is not None:
+            try:
+                self._sel.unregister(self._servidor)
+            except (KeyError, ValueError):
+                pass
+            self._servidor.close()
+            self._servidor = None
+
+    def _atender(self, clave):
+        if clave.fileobj is self._servidor:
+            try:
+                cli, _ = self._servidor.accept()
+            except BlockingIOError:
+                return
+            cli.setblocking(False)
+            self._clientes[cli] = bytearray()
+            self._sel.register(cli, selectors.EVENT_READ)
+            return
+        cli = clave.fileobj
+        try:
+            datos = cli.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            datos = b""
+        if not datos:
+            # El productor se fue: entregamos lo pendiente y esperamos que se reconecte.
+            self._alimentar(b"\n", self._clientes[cli])
+            self._cerrar_cliente(cli)
+            return
+        self._alimentar(datos, self._clientes[cli])
+
+
+# ---------------------------------------------------------------------------
+# EVDEV (dispositivo de entrada crudo de Linux)
+# ---------------------------------------------------------------------------
+# struct input_event { struct timeval time; __u16 type; __u16 code; __s32 value; }
+_EVENTO = struct.Struct("llHHi")
+_EV_KEY = 1
+_EVIOCGRAB = 0x40044590
+_SHIFT = {42, 54}           # KEY_LEFTSHIFT, KEY_RIGHTSHIFT
+_ENTER = {28, 96}           # KEY_ENTER, KEY_KPENTER
+
+# keycode -> (normal, con shift), distribución US (la que envían los lectores por defecto)
+_TECLAS = {}
+for _codigos, _normal, _shift in (
+    (range(2, 14), "1234567890-=", "!@#$%^&*()_+"),
+    (range(16, 28), "qwertyuiop[]", "QWERTYUIOP{}"),
+    (range(30, 42), "asdfghjkl;'`", 'ASDFGHJKL:"~'),
+    (range(43, 54), "\\zxcvbnm,./", "|ZXCVBNM<>?"),
+):
+    for _cod, _n, _s in zip(_codigos, _normal, _shift):
+        _TECLAS[_cod] = (_n, _s)
+_TECLAS[57] = (" ", " ")  # KEY_SPACE
+
+
+class FuenteEvdev(FuenteEntrada):
+    """
+    Lee /dev/input/eventX directamente y traduce keycodes a caracteres.
+    Con grab=True toma el dispositivo en exclusiva (las teclas no llegan a la consola).
+    Si el lector se desconecta (ENODEV) se reabre cuando vuelva a aparecer.
+    """
+
+    def __init__(self, ruta: str, grab: bool = True, reintento_seg: float = 1.0):
+        super().__init__(reintento_seg)
+        self.ruta = ruta
+        self.grab = grab
+        self.descripcion = f"evdev:{ruta}"
+        self._fd = None
+        self._shift = set()  # teclas shift presionadas (izquierda y derecha por separado)
+
+    def _conectar(self):
+        self._fd = os.open(self.ruta, os.O_RDONLY | os.O_NONBLOCK)
+        if self.grab:
+            import fcntl
+            fcntl.ioctl(self._fd, _EVIOCGRAB, 1)
+        self._shift.clear()
+        self._sel.register(self._fd, selectors.EVENT_READ)
+
+    def _desconectar(self):
+        if self._fd is None:
+            return
+        try:
+            self._sel.unregister(self._fd)
+        except (KeyError, ValueError):
+            pass
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+        self._fd = None
+
+    def _atender(self, clave):
+        try:
+            datos = os.read(self._fd, _EVENTO.size * 64)
+        except BlockingIOError:
+            return
+        if not datos:
+            raise OSError(errno.ENODEV, "dispositivo sin datos")
+        salida = bytearray()
+        for _, _, tipo, codigo, valor in _EVENTO.iter_unpack(datos[: len(datos) - len(datos) % _EVENTO.size]):
+            if tipo != _EV_KEY:
+                continue
+            if codigo in _SHIFT:
+                if valor:
+                    self._shift.add(codigo)
+                else:
+                    self._shift.discard(codigo)
+            elif valor == 0:
+                continue  # soltar tecla
+            elif codigo in _ENTER:
+                salida += b"\n"
+            elif codigo in _TECLAS:
+                salida += _TECLAS[codigo][bool(self._shift)].encode("utf-8")
+        if salida:
+            self._alimentar(salida)
+
+
+# ---------------------------------------------------------------------------
+# Fábrica
+# ---------------------------------------------------------------------------
+def crear_fuente(conf: dict | None = None) -> FuenteEntrada:
+    """
+    Construye la fuente a partir del bloque "entrada" de config.json. Ejemplos:
+      {"tipo": "stdin"}
+      {"tipo": "fifo",   "ruta": "/run/acceso/lector.fifo"}
+      {"tipo": "socket", "direccion": "unix:/run/acceso/lector.sock"}
+      {"tipo": "evdev",  "ruta": "/dev/input/by-id/usb-lector-event-kbd", "grab": true}
+    """
+    conf = conf or {}
+    tipo = conf.get("tipo", "stdin")
+    reintento = conf.get("reintento_seg", 1.0)
+    if tipo == "stdin":
+        return FuenteStdin(reintento)
+    if tipo == "fifo":
+        return FuenteFIFO(conf["ruta"], reintento)
+    if tipo == "socket":
+        return FuenteSocket(conf["direccion"], reintento)
+    if tipo == "evdev":
+        return FuenteEvdev(conf["ruta"], conf.get("grab", True), reintento)
+    raise ValueError(f"Tipo de entrada no soportado: {tipo!r}")
@@ -3,9 +3,19 @@ app/models/alumno.py
 --------------------
 Contiene el modelo de Alumno. No guarda encriptado aquí; eso se hace en DB.
 También genera un PIN por defecto a partir de la boleta (últimos 4 dígitos).
+
+El modelo usa __slots__ (sin __dict__ por instancia) y declara sus campos en CAMPOS:
+la capa de BD genera INSERT/UPDATE y construye objetos desde filas a partir de esa lista.
 """
 
 class Alumno:
+    # Orden = orden de columnas en la tabla 'alumnos' (sin id/estado de bici/versión).
+    CAMPOS = ("boleta", "curp", "nombre", "carrera", "escuela", "estado", "turno", "fecha", "url", "accion", "pin")
+    CIFRADOS = ("boleta", "curp")   # se guardan encriptados en BD
+    IDENTIFICADOR = "boleta"
+    TABLA = "alumnos"
+    __slots__ = CAMPOS
+
     def __init__(self, boleta, curp, nombre, carrera, escuela, estado, turno, fecha, url, accion, pin=None):
         self.boleta = boleta
         self.curp = curp
@@ -28,5 +38,4 @@ class Alumno:
 
     def to_dict(self) -> dict:
         """Serializa a dict para logs o JSON (ojo: no cifra aquí)."""
-        return self.__dict__
-
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
@@ -2,9 +2,17 @@
 app/models/profesor.py
 ----------------------
 Modelo de Profesor. Similar a Alumno, su PIN base deriva del número de empleado.
+Igual que Alumno: __slots__ y lista de CAMPOS que usa la capa de BD.
 """
 
 class Profesor:
+    # Orden = orden de columnas en la tabla 'profesores' (sin id/estado de bici/versión).
+    CAMPOS = ("numero_empleado", "nombre", "clave_presupuestal", "area_adscripcion", "estado", "fecha", "url", "accion", "pin")
+    CIFRADOS = ("numero_empleado", "clave_presupuestal")
+    IDENTIFICADOR = "numero_empleado"
+    TABLA = "profesores"
+    __slots__ = CAMPOS
+
     def __init__(self, numero_empleado, nombre, clave_presupuestal, area_adscripcion, estado, fecha, url, accion, pin=None):
         self.numero_empleado = numero_empleado
         self.nombre = nombre
@@ -22,5 +30,4 @@ class Profesor:
 
     def to_dict(self) -> dict:
         """Serializa a dict para logs o JSON (no cifra aquí)."""
-        return self.__dict__
-
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
@@ -9,9 +9,15 @@ del proyecto las invoque desde una ruta consistente (app.utils.crypto).
 # IMPORTANTE:
 # - Este import asume que Cifrado.py y Descifrado.py están junto a main.py (raíz).
 # - Si mueves esos archivos, actualiza estas rutas.
-from Cifrado import encriptar as _enc
+from Cifrado import encriptar as _enc, SUBSTITUCION, FILAS, COLUMNAS
 from Descifrado import desencriptar as _dec
 
+# Formato compacto (BD con "identificadores_binarios"): cada par de símbolos del texto cifrado
+# es una coordenada (fila, columna) de la tabla 6x6 -> un byte = fila * COLUMNAS + columna.
+# Es la misma información que el texto cifrado, en la mitad de bytes; no cambia la seguridad.
+_PARES = [SUBSTITUCION[str(f)] + SUBSTITUCION[str(c)] for f in range(FILAS) for c in range(COLUMNAS)]
+_BYTE_DE_PAR = {par: i for i, par in enumerate(_PARES)}
+
 def encriptar(txt: str) -> str:
     """
     Envoltorio del encriptado. Delega a tu Cifrado.encriptar(...).
@@ -26,3 +32,16 @@ def desencriptar(token: str) -> str:
     """
     return _dec(token)
 
+def empacar(cifrado: str) -> bytes:
+    """Texto cifrado -> bytes (un byte por carácter original). ValueError si no es un cifrado válido."""
+    if len(cifrado) % 2:
+        raise ValueError("Longitud inválida: deben ser pares de coordenadas.")
+    try:
+        return bytes(_BYTE_DE_PAR[cifrado[i:i + 2]] for i in range(0, len(cifrado), 2))
+    except KeyError as e:
+        raise ValueError(f"Par inválido en cadena cifrada: {e.args[0]!r}") from None
+
+def desempacar(blob: bytes) -> str:
+    """bytes -> el mismo texto cifrado que devuelve encriptar()."""
+    return "".join(_PARES[b] for b in blob)
+
@@ -0,0 +1,10 @@
+"""
+app/utils/estadistica.py
+------------------------
+Resúmenes de latencia para las herramientas de carga y reproducción (herramientas/).
+"""
+
+
+def percentil(valores: list, p: float) -> float:
+    """Percentil p (0..1) de una lista YA ORDENADA, por el método del rango más cercano; 0.0 si está vacía."""
+    return valores[min(len(valores) - 1, int(p * len(valores)))] if valores else 0.0
@@ -0,0 +1,20 @@
+"""
+app/utils/qr.py
+---------------
+Normalización de la cadena leída del QR (sin dependencias: la usa el proceso de la
+estación, que no importa requests/bs4; ver app/web/trabajador.py).
+"""
+
+def normalizar_url(qr_data: str) -> str:
+    """
+    Corrige errores comunes en la cadena del QR:
+    - 'httpsñ--' o 'httpsÑ--' -> 'https://'
+    - '.mx-vcred-'             -> '.mx/vcred/'
+    - '_h¿'                    -> '?h='
+    """
+    if not qr_data:
+        return qr_data
+    return (qr_data.replace("httpsñ--", "https://")
+                  .replace("httpsÑ--", "https://")
+                  .replace(".mx-vcred-", ".mx/vcred/")
+                  .replace("_h¿", "?h="))
@@ -1 +1 @@
-# Capa web: scraping de páginas (alumno/profesor) y normalización de URL del QR.
+# Capa web: scraping de páginas (alumno/profesor) y el proceso trabajador que lo aísla de la estación.
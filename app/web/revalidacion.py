@@ -0,0 +1,194 @@
+"""
+app/web/revalidacion.py
+-----------------------
+Trabajo por lotes que vuelve a consultar el portal de TODOS los usuarios guardados
+y actualiza su 'estado' (la inscripción cambia cada semestre; al registrarse solo
+se consulta una vez).
+
+Diseño:
+- Las URLs se leen de 'alumnos'/'profesores' por páginas (BaseDatos.iterar_urls) y se
+  encolan en una cola acotada: nunca se carga la tabla completa en memoria.
+- Descargas con asyncio: 'concurrencia' peticiones simultáneas como máximo y, además,
+  un límite de peticiones por segundo POR HOST (no saturar el portal del IPN).
+  obtener_html es bloqueante (requests), así que corre en un pool de hilos del tamaño
+  de la concurrencia.
+- El parseo (BeautifulSoup) corre en un pool de PROCESOS: es CPU y no debe competir
+  con el GIL de las descargas.
+- Las actualizaciones se escriben en transacciones por lote (BaseDatos.actualizar_estados).
+  Solo se escribe un estado leído de un marcador reconocido de la página (bloque de color del
+  alumno, alerta success/danger del profesor). Una página sin marcador (mantenimiento, cambio
+  de maquetación) cuenta como 'sin_estado' y deja el estado guardado como estaba.
+- El estado guardado se aplica en cada escaneo de un usuario registrado: con un estado no
+  válido para la política se niegan las ENTRADAS (las salidas siguen permitidas).
+- Checkpoint reanudable: tras cada lote escrito se guarda, por tabla, el mayor id tal que
+  todos los anteriores ya quedaron resueltos. Con --reanudar se continúa desde ahí.
+- Al final imprime un reporte de throughput.
+
+Uso:
+  python -m app.web.revalidacion [--tipo alumno|profesor|todos] [--concurrencia 8]
+                                 [--por-host 2] [--lote 100] [--reanudar]
+"""
+
+import argparse, asyncio, json, time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+from app.web.scraper import obtener_html, extraer_datos_alumno, extraer_datos_profesor
+
+
+def extraer_estado(html: str, tipo: str) -> str:
+    """Se ejecuta en el pool de procesos: solo devuelve el 'estado' (poco que serializar)."""
+    datos = extraer_datos_alumno(html) if tipo == "alumno" else extraer_datos_profesor(html)
+    return datos.get("estado", "")
+
+
+class LimitePorHost:
+    """Espaciado mínimo entre peticiones al mismo host (1 / peticiones_por_seg)."""
+
+    def __init__(self, peticiones_por_seg: float):
+        self.intervalo = 1.0 / peticiones_por_seg if peticiones_por_seg > 0 else 0.0
+        self._proximo = {}   # host -> instante (monotonic) en que puede salir la siguiente
+        self._locks = {}
+
+    async def esperar(self, host: str):
+        if not self.intervalo:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo.get(host, 0.0))
+            self._proximo[host] = turno + self.intervalo
+        if turno > ahora:
+            await asyncio.sleep(turno - ahora)
+
+
+class Revalidador:
+    def __init__(self, db, user_agent: str, concurrencia: int = 8, por_host: float = 2.0,
+                 lote_escritura: int = 100, archivo_checkpoint: str = "revalidacion.json",
+                 timeout: int = 30, procesos: int | None = None):
+        self.db = db
+        self.user_agent = user_agent
+        self.concurrencia = concurrencia
+        self.limite = LimitePorHost(por_host)
+        self.lote_escritura = lote_escritura
+        self.checkpoint = Path(archivo_checkpoint)
+        self.timeout = timeout
+        self.procesos = procesos
+        self.stats = Counter()
+        self.por_host = Counter()
+
+    # ---------- checkpoint ----------
+    def _leer_checkpoint(self) -> dict:
+        try:
+            return json.loads(self.checkpoint.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _guardar_checkpoint(self, datos: dict):
+        tmp = self.checkpoint.with_suffix(".tmp")
+        tmp.write_text(json.dumps(datos), encoding="utf-8")
+        tmp.replace(self.checkpoint)  # reemplazo atómico: nunca queda un checkpoint a medias
+
+    # ---------- una tabla ----------
+    async def _revalidar_tipo(self, tipo: str, desde_id: int, checkpoint: dict, hilos, procesos):
+        loop = asyncio.get_running_loop()
+        cola = asyncio.Queue(maxsize=self.concurrencia * 2)
+        en_vuelo = set()           # ids despachados sin resolver
+        pendientes = []            # [(url, estado)] resueltos aún no escritos
+        ultimo_despachado = desde_id
+
+        def escribir_lote():
+            if pendientes:
+                self.stats["cambiados"] += self.db.actualizar_estados(pendientes, tipo)
+                pendientes.clear()
+            # Todo lo < min(en_vuelo) ya está resuelto y escrito.
+            checkpoint[tipo] = (min(en_vuelo) - 1) if en_vuelo else ultimo_despachado
+            self._guardar_checkpoint(checkpoint)
+
+        async def productor():
+            nonlocal ultimo_despachado
+            for id_, url in self.db.iterar_urls(tipo, desde_id):
+                en_vuelo.add(id_)
+                ultimo_despachado = id_
+                await cola.put((id_, url))
+            for _ in range(self.concurrencia):
+                await cola.put(None)
+
+        async def trabajador():
+            while (item := await cola.get()) is not None:
+                id_, url = item
+                host = urlparse(url).netloc
+                await self.limite.esperar(host)
+                self.por_host[host] += 1
+                html = await loop.run_in_executor(hilos, obtener_html, url, self.user_agent, self.timeout)
+                estado = None
+                if html:
+                    try:
+                        estado = await loop.run_in_executor(procesos, extraer_estado, html, tipo)
+                    except Exception as e:
+                        print(f"Error al parsear {url}: {e}")
+                self.stats["consultados"] += 1
+                if estado:
+                    pendientes.append((url, estado))
+                    self.stats["ok"] += 1
+                elif estado is None:
+                    self.stats["errores"] += 1
+                else:
+                    self.stats["sin_estado"] += 1   # página sin marcador: no se toca lo guardado
+                en_vuelo.discard(id_)
+                if len(pendientes) >= self.lote_escritura:
+                    escribir_lote()
+
+        await asyncio.gather(productor(), *(trabajador() for _ in range(self.concurrencia)))
+        escribir_lote()
+
+    # ---------- API pública ----------
+    def ejecutar(self, tipos=("alumno", "profesor"), reanudar: bool = False) -> dict:
+        checkpoint = self._leer_checkpoint() if reanudar else {}
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as hilos, \
+                ProcessPoolExecutor(max_workers=self.procesos) as procesos:
+            for tipo in tipos:
+                desde = checkpoint.get(tipo, 0)
+                if desde:
+                    print(f"Reanudando {tipo} desde id > {desde}.")
+                asyncio.run(self._revalidar_tipo(tipo, desde, checkpoint, hilos, procesos))
+        self.stats["segundos"] = time.perf_counter() - inicio
+        self.reporte()
+        return dict(self.stats)
+
+    def reporte(self):
+        seg = self.stats["segundos"] or 1e-9
+        print(f"Revalidación: {self.stats['consultados']} consultados en {seg:.1f} s "
+              f"({self.stats['consultados'] / seg:.2f} URL/s)")
+        print(f"  OK: {self.stats['ok']} | Estado cambiado: {self.stats['cambiados']} | "
+              f"Sin estado reconocible: {self.stats['sin_estado']} | Sin respuesta: {self.stats['errores']}")
+        for host, n in self.por_host.most_common():
+            print(f"  {host}: {n} peticiones")
+
+
+def main():
+    from app.config import CONFIG, ESTACION
+    from app.data.db import BaseDatos
+
+    conf = CONFIG.get("revalidacion", {})
+    parser = argparse.ArgumentParser(description="Revalida el estado de los usuarios guardados.")
+    parser.add_argument("--tipo", choices=("alumno", "profesor", "todos"), default="todos")
+    parser.add_argument("--concurrencia", type=int, default=conf.get("concurrencia", 8))
+    parser.add_argument("--por-host", type=float, default=conf.get("peticiones_por_seg_host", 2.0),
+                        help="peticiones por segundo por host (0 = sin límite)")
+    parser.add_argument("--lote", type=int, default=conf.get("lote_escritura", 100))
+    parser.add_argument("--checkpoint", default=conf.get("checkpoint", "revalidacion.json"))
+    parser.add_argument("--reanudar", action="store_true", help="continuar desde el checkpoint")
+    args = parser.parse_args()
+
+    tipos = ("alumno", "profesor") if args.tipo == "todos" else (args.tipo,)
+    Revalidador(BaseDatos(CONFIG["database_file"], ESTACION),
+                CONFIG["user_agent"], args.concurrencia, args.por_host, args.lote, args.checkpoint
+                ).ejecutar(tipos, args.reanudar)
+
+
+if __name__ == "__main__":
+    main()
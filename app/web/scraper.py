@@ -2,49 +2,125 @@
 app/web/scraper.py
 ------------------
 Funciones para:
-- Normalizar la URL leída del QR (corrige caracteres alterados).
 - Descargar HTML con 'requests'.
 - Extraer datos de ALUMNO y PROFESOR desde el HTML con selectores flexibles.
 
 Notas:
 - verify=False por contexto del proyecto original (certificados a veces no válidos).
 - user-agent configurable desde config.json.
+- La estación no importa este módulo: corre en el proceso trabajador (app/web/trabajador.py).
+  normalizar_url vive en app/utils/qr.py y se re-exporta aquí por compatibilidad.
+- La descarga es en streaming: se aborta sin leer el cuerpo si el Content-Type no es HTML
+  o el Content-Length excede 'max_bytes', y a media descarga si el cuerpo rebasa el tope.
+- El parseo usa SoupStrainer: BeautifulSoup solo construye los elementos que leen los
+  extractores (menos memoria y tiempo en la Raspberry Pi).
 """
 
+import codecs
 from urllib.parse import urlparse
 import requests
-from bs4 import BeautifulSoup
+import urllib3
+from bs4 import BeautifulSoup, SoupStrainer
+from app.utils.qr import normalizar_url
 from app.utils.text import norm
 
-def normalizar_url(qr_data: str) -> str:
-    """
-    Corrige errores comunes en la cadena del QR:
-    - 'httpsñ--' o 'httpsÑ--' -> 'https://'
-    - '.mx-vcred-'             -> '.mx/vcred/'
-    - '_h¿'                    -> '?h='
-    """
-    if not qr_data:
-        return qr_data
-    return (qr_data.replace("httpsñ--", "https://")
-                  .replace("httpsÑ--", "https://")
-                  .replace(".mx-vcred-", ".mx/vcred/")
-                  .replace("_h¿", "?h="))
-
-def obtener_html(url: str, user_agent: str, timeout: int = 60) -> str | None:
+# Evita warnings por verify=False (antes en main.py; aplica a quien descargue: trabajador, revalidación)
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+MAX_BYTES_HTML = 1_000_000          # las páginas del portal pesan unos pocos KB
+TIPOS_HTML = ("text/html", "application/xhtml+xml")
+
+# Clases de los <div> que lee extraer_datos_alumno (además del bloque de estado con fondo).
+CLASES_ALUMNO = {"boleta", "curp", "nombre", "carrera", "escuela"}
+# Estructura y recursos que los extractores de profesor nunca leen. Al no construirlas,
+# BeautifulSoup evalúa sus hijos uno por uno (no se pierde contenido del <body>).
+ETIQUETAS_IGNORADAS = {"html", "head", "body", "meta", "link", "title", "base", "script",
+                       "style", "noscript", "template", "svg", "img", "iframe"}
+
+def obtener_html(url: str, user_agent: str, timeout: int = 60, max_bytes: int = MAX_BYTES_HTML) -> str | None:
     """
     Descarga HTML si la URL tiene esquema http/https. Maneja excepciones de red
     y devuelve None si falla, para que el flujo superior sepa abortar.
+    También devuelve None (sin descargar el resto) si la respuesta no es HTML o
+    pesa más de 'max_bytes'.
     """
     try:
         if urlparse(url).scheme not in ("http", "https"):
             return None
-        r = requests.get(url, headers={"User-Agent": user_agent}, timeout=timeout, verify=False)
-        r.raise_for_status()
-        return r.text
+        with requests.get(url, headers={"User-Agent": user_agent}, timeout=timeout,
+                          verify=False, stream=True) as r:
+            r.raise_for_status()
+            tipo = r.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if tipo and tipo not in TIPOS_HTML:
+                print(f"Respuesta de {url} no es HTML ({tipo}).")
+                return None
+            if _entero(r.headers.get("Content-Length")) > max_bytes:
+                print(f"Respuesta de {url} excede {max_bytes} bytes.")
+                return None
+            cuerpo = bytearray()
+            for bloque in r.iter_content(chunk_size=16384):
+                cuerpo += bloque
+                if len(cuerpo) > max_bytes:
+                    print(f"Respuesta de {url} excede {max_bytes} bytes; descarga abortada.")
+                    return None
+            # Charset del encabezado, como r.text; sin encabezado (o uno desconocido), utf-8
+            # en vez de adivinarlo (chardet).
+            return cuerpo.decode(_codificacion(r.encoding), errors="replace")
     except requests.RequestException as e:
         print(f"Error al obtener HTML de {url}: {e}")
         return None
 
+def _entero(valor) -> int:
+    """Content-Length como entero; 0 (sin revisar tamaño por encabezado) si falta o no es número."""
+    try:
+        return int(valor or 0)
+    except ValueError:
+        return 0
+
+def _codificacion(charset: str | None) -> str:
+    """Charset declarado si Python lo conoce; si no, utf-8 (el tope de bytes se sigue aplicando)."""
+    try:
+        return codecs.lookup(charset).name if charset else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+class _FiltroEtiquetas(SoupStrainer):
+    """
+    parse_only que decide con (nombre, atributos) de cada etiqueta de nivel superior si se
+    construye (con todo su contenido) o se descarta; el texto suelto se descarta.
+    SoupStrainer normal no puede expresar "clase X O estilo Y". bs4 >= 4.13 pregunta con
+    allow_tag_creation/allow_string_creation y versiones anteriores con search_tag/search.
+    """
+
+    def __init__(self, predicado):
+        super().__init__()
+        self.predicado = predicado
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        return self.predicado(name, attrs or {})
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        return markup_name if self.predicado(markup_name, markup_attrs or {}) else None
+
+    def search(self, markup):
+        return None
+
+def _es_bloque_alumno(nombre: str, attrs: dict) -> bool:
+    if nombre != "div":
+        return False
+    clases = attrs.get("class") or ""
+    clases = clases.split() if isinstance(clases, str) else clases
+    return bool(CLASES_ALUMNO.intersection(clases)) or "background-color" in (attrs.get("style") or "")
+
+def _es_bloque_profesor(nombre: str, attrs: dict) -> bool:
+    return nombre not in ETIQUETAS_IGNORADAS
+
+SOLO_ALUMNO = _FiltroEtiquetas(_es_bloque_alumno)
+SOLO_PROFESOR = _FiltroEtiquetas(_es_bloque_profesor)
+
 def _texto(o) -> str:
     """Helper: texto plano de un nodo (string), juntando con espacios y strip=True."""
     return o.get_text(" ", strip=True) if o else ""
@@ -53,7 +129,7 @@ def extraer_datos_alumno(html: str) -> dict:
     """
     Intenta extraer campos típicos del portal de alumno. Los selectores son flexibles.
     """
-    sopa = BeautifulSoup(html, "lxml")
+    sopa = BeautifulSoup(html, "lxml", parse_only=SOLO_ALUMNO)
     datos = {
         "boleta": _texto(sopa.select_one("div.boleta")),
         "curp": _texto(sopa.select_one("div.curp")),
@@ -77,15 +153,17 @@ def extraer_datos_profesor(html: str) -> dict:
     Extrae campos del portal de profesor. La página puede variar, así que:
     - Buscamos etiquetas comunes ('span.card', 'label', 'strong') como "Nombre", "Número de empleado", etc.
     - Para el ESTADO validamos por clase CSS 'alert-success' (válida) o 'alert-danger' (no válida).
+      Sin ninguno de los dos el estado queda "" (desconocido): una página de mantenimiento o un
+      cambio de maquetación no debe leerse como "No válida" (la revalidación lo escribiría en BD).
     - Normalizamos texto para comparar sin tildes.
     """
-    sopa = BeautifulSoup(html, "lxml")
+    sopa = BeautifulSoup(html, "lxml", parse_only=SOLO_PROFESOR)
     datos = {
         "numero_empleado": "",
         "nombre": "",
         "clave_presupuestal": "",
         "area_adscripcion": "",
-        "estado": "No válida"
+        "estado": ""
     }
 
     # Campos: heurística flexible
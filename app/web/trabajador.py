@@ -0,0 +1,284 @@
+"""
+app/web/trabajador.py
+---------------------
+Consulta al portal (descarga + extracción) FUERA del proceso de la estación.
+
+requests/bs4/lxml y los árboles de BeautifulSoup son lo que más memoria ocupa en la estación,
+y una página patológica podía congelar el bucle de escaneo. TrabajadorScraper lanza uno o
+varios procesos 'python -m app.web.trabajador' y les pasa las consultas por su stdin/stdout:
+
+  estación -> trabajador: [id, url, tipo]                    (una línea JSON por mensaje)
+  trabajador -> estación: [id, resultado, datos]             resultado: 'ok' | 'sin_html' | 'error'
+
+Supervisión (hilo en la estación):
+- Una consulta en curso por proceso; las demás esperan en cola.
+- Timeout por consulta ('timeout_seg'): se mata el proceso y la consulta resuelve None.
+  La descarga dentro del trabajador usa la mitad de ese tiempo como timeout de requests,
+  así un portal lento se reporta como 'sin_html' sin tener que matar al proceso.
+- Límite de memoria ('memoria_mb', RLIMIT_DATA: heap y mapeos privados, no el código de las
+  bibliotecas compartidas): si se agota, el trabajador reporta el error y termina. Medido en
+  x86_64 con requests/bs4/lxml cargados: ~23 MB de datos (VmData) al arrancar y tras 40
+  consultas, ~25 MB con una página de 900 KB; el espacio de direcciones (VmSize) ronda los
+  45-50 MB. Por debajo de ~20 MB el trabajador no alcanza a importar bs4. Con RLIMIT_AS el
+  tope dependería del tamaño de las bibliotecas y de las reservas de malloc de cada plataforma.
+- Reciclado: tras 'max_trabajos' consultas el proceso se cierra y se lanza otro.
+- Si un proceso muere (o se mata), se lanza otro automáticamente; si muere al arrancar
+  (p. ej. falta bs4) se relanza como mucho cada 'pausa_reinicio_seg'.
+
+enviar() devuelve un concurrent.futures.Future que SIEMPRE resuelve: dict con los datos
+extraídos o None (sin HTML, error o timeout). ScraperLocal ofrece la misma interfaz en este
+proceso (herramientas, o config.json -> "scraper.procesos": 0).
+"""
+
+import argparse, json, os, signal, subprocess, sys, threading, time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def consultar_portal(url: str, tipo: str, user_agent: str, timeout: float, obtener_html=None) -> dict | None:
+    """Descarga y extrae los datos del usuario; None si no hubo HTML."""
+    from app.web import scraper
+    html = (obtener_html or scraper.obtener_html)(url, user_agent=user_agent, timeout=timeout)
+    if not html:
+        return None
+    return scraper.extraer_datos_alumno(html) if tipo == "alumno" else scraper.extraer_datos_profesor(html)
+
+
+def _resolver(futuro: Future, valor):
+    if not futuro.done():
+        futuro.set_result(valor)
+
+
+class ScraperLocal:
+    """Misma interfaz que TrabajadorScraper, en hilos de este proceso (sin aislamiento)."""
+
+    def __init__(self, user_agent: str, timeout_seg: float = 60, hilos: int = 1, obtener_html=None):
+        self.user_agent = user_agent
+        self.timeout_seg = timeout_seg
+        self.obtener_html = obtener_html
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="scraper")
+
+    def _consultar(self, url: str, tipo: str) -> dict | None:
+        try:
+            return consultar_portal(url, tipo, self.user_agent, self.timeout_seg, self.obtener_html)
+        except Exception as e:
+            print(f"Error al consultar el portal ({url}): {e!r}")
+            return None
+
+    def enviar(self, url: str, tipo: str) -> Future:
+        return self._pool.submit(self._consultar, url, tipo)
+
+    def consultar(self, url: str, tipo: str) -> dict | None:
+        return self.enviar(url, tipo).result()
+
+    def detener(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Proceso:
+    def __init__(self, comando: list):
+        self.popen = subprocess.Popen(comando, cwd=RAIZ, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      text=True, encoding="utf-8", bufsize=1)
+        self.trabajo = None   # (id, futuro, instante límite)
+        self.hechos = 0
+        self.vivo = True
+        self.inicio = time.monotonic()
+
+
+class TrabajadorScraper:
+    def __init__(self, user_agent: str, procesos: int = 1, timeout_seg: float = 20.0,
+                 max_trabajos: int = 200, memoria_mb: int = 256, pausa_reinicio_seg: float = 2.0):
+        self.comando = [sys.executable, "-m", "app.web.trabajador", "--user-agent", user_agent,
+                        "--timeout", str(timeout_seg / 2), "--memoria-mb", str(memoria_mb)]
+        self.n_procesos = max(1, procesos)
+        self.timeout_seg = timeout_seg
+        self.max_trabajos = max_trabajos
+        self.pausa_reinicio_seg = pausa_reinicio_seg
+        self.reinicios = 0
+        self._cond = threading.Condition()
+        self._cola = deque()
+        self._procesos = []
+        self._ultimo_id = 0
+        self._detenido = False
+        self._supervisor = None
+
+    def iniciar(self):
+        with self._cond:
+            self._procesos = [self._lanzar() for _ in range(self.n_procesos)]
+        self._supervisor = threading.Thread(target=self._supervisar, name="trabajador-scraper", daemon=True)
+        self._supervisor.start()
+        print(f"Consultas al portal en {self.n_procesos} proceso(s) aparte.")
+        return self
+
+    # ---------- procesos ----------
+    def _lanzar(self) -> _Proceso:
+        p = _Proceso(self.comando)
+        threading.Thread(target=self._leer, args=(p,), name=f"trabajador-{p.popen.pid}", daemon=True).start()
+        return p
+
+    def _leer(self, p: _Proceso):
+        """Hilo lector de un proceso: resuelve el futuro de cada respuesta."""
+        for linea in p.popen.stdout:
+            try:
+                id_, resultado, datos = json.loads(linea)
+            except ValueError:
+                continue
+            with self._cond:
+                futuro = None
+                if p.trabajo and p.trabajo[0] == id_:
+                    futuro, p.trabajo = p.trabajo[1], None
+                    p.hechos += 1
+                    self._cond.notify_all()
+            if futuro:
+                if resultado == "error":
+                    print(f"Trabajador del portal: {datos}")
+                _resolver(futuro, datos if resultado == "ok" else None)
+        # EOF: el proceso terminó (reciclado, memoria agotada o muerto).
+        with self._cond:
+            p.vivo = False
+            trabajo, p.trabajo = p.trabajo, None
+            self._cond.notify_all()
+        p.popen.wait()
+        if trabajo:
+            print(f"Trabajador del portal terminó (código {p.popen.returncode}) con una consulta en curso.")
+            _resolver(trabajo[1], None)
+
+    def _despachar(self, p: _Proceso):
+        """Manda a 'p' (libre) la siguiente consulta no cancelada. Llamar con el lock tomado."""
+        while self._cola:
+            id_, url, tipo, futuro = self._cola.popleft()
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            p.trabajo = (id_, futuro, time.monotonic() + self.timeout_seg)
+            try:
+                p.popen.stdin.write(json.dumps([id_, url, tipo], separators=(",", ":")) + "\n")
+                p.popen.stdin.flush()
+            except (OSError, ValueError):
+                p.popen.kill()   # el lector ve EOF y resuelve la consulta con None
+            return
+
+    def _revisar(self) -> list:
+        """Timeouts, reinicios, reciclado y despacho. Devuelve los futuros vencidos."""
+        vencidos = []
+        ahora = time.monotonic()
+        for i, p in enumerate(self._procesos):
+            if p.trabajo and ahora >= p.trabajo[2]:
+                vencidos.append(p.trabajo[1])
+                p.trabajo = None
+                p.vivo = False
+                p.popen.kill()
+            if not p.vivo:
+                if ahora < p.inicio + self.pausa_reinicio_seg:
+                    continue
+                self._procesos[i] = p = self._lanzar()
+                self.reinicios += 1
+            elif p.trabajo is None and p.hechos >= self.max_trabajos:
+                p.popen.stdin.close()   # el trabajador termina al leer EOF
+                self._procesos[i] = p = self._lanzar()
+            if p.trabajo is None:
+                self._despachar(p)
+        return vencidos
+
+    def _supervisar(self):
+        while True:
+            with self._cond:
+                if self._detenido:
+                    return
+                vencidos = self._revisar()
+                if not vencidos:
+                    limites = [p.trabajo[2] for p in self._procesos if p.trabajo] + \
+                              [p.inicio + self.pausa_reinicio_seg for p in self._procesos if not p.vivo]
+                    self._cond.wait(max(min(limites) - time.monotonic(), 0.01) if limites else None)
+            for futuro in vencidos:
+                print(f"Consulta al portal excedió {self.timeout_seg:.0f} s; se reinicia el trabajador.")
+                _resolver(futuro, None)
+
+    # ---------- interfaz ----------
+    def enviar(self, url: str, tipo: str) -> Future:
+        futuro = Future()
+        with self._cond:
+            if self._detenido:
+                _resolver(futuro, None)
+                return futuro
+            self._ultimo_id += 1
+            self._cola.append((self._ultimo_id, url, tipo, futuro))
+            libre = next((p for p in self._procesos if p.vivo and p.trabajo is None
+                          and p.hechos < self.max_trabajos), None)
+            if libre:
+                self._despachar(libre)
+            self._cond.notify_all()
+        return futuro
+
+    def consultar(self, url: str, tipo: str) -> dict | None:
+        return self.enviar(url, tipo).result()
+
+    def detener(self):
+        with self._cond:
+            self._detenido = True
+            pendientes = [t[3] for t in self._cola]
+            self._cola.clear()
+            procesos = list(self._procesos)
+            self._cond.notify_all()
+        for futuro in pendientes:
+            if futuro.set_running_or_notify_cancel():
+                _resolver(futuro, None)
+        for p in procesos:
+            try:
+                p.popen.stdin.close()
+                p.popen.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                p.popen.kill()
+
+
+# ---------- proceso trabajador ----------
+def _limitar_memoria(memoria_mb: int):
+    try:
+        import resource
+    except ImportError:   # Windows: sin límite
+        return
+    _, maximo = resource.getrlimit(resource.RLIMIT_DATA)
+    limite = memoria_mb * 1024 * 1024
+    if maximo != resource.RLIM_INFINITY:
+        limite = min(limite, maximo)
+    resource.setrlimit(resource.RLIMIT_DATA, (limite, maximo))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proceso trabajador de consultas al portal (lo lanza la estación).")
+    parser.add_argument("--user-agent", required=True)
+    parser.add_argument("--timeout", type=float, default=10.0, help="timeout de requests (s)")
+    parser.add_argument("--memoria-mb", type=int, default=256)
+    args = parser.parse_args()
+
+    # Ctrl+C en la terminal llega a todo el grupo: la estación decide cuándo termina el trabajador.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # stdout es el canal de respuestas: los print del scraper van a stderr.
+    canal = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    _limitar_memoria(args.memoria_mb)
+    from app.web import scraper  # noqa: F401  (carga requests/bs4/lxml antes de la primera consulta)
+
+    for linea in sys.stdin:
+        fin = False
+        try:
+            id_, url, tipo = json.loads(linea)
+        except ValueError:
+            continue
+        try:
+            datos = consultar_portal(url, tipo, args.user_agent, args.timeout)
+            respuesta = [id_, "ok" if datos else "sin_html", datos]
+        except MemoryError:
+            respuesta = [id_, "error", f"memoria agotada (límite {args.memoria_mb} MB)"]
+            fin = True
+        except Exception as e:
+            respuesta = [id_, "error", f"{url}: {e!r}"]
+        canal.write(json.dumps(respuesta, separators=(",", ":")) + "\n")
+        if fin:
+            break
+
+
+if __name__ == "__main__":
+    main()
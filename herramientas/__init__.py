@@ -0,0 +1,2 @@
+# Herramientas de desarrollo (carga, simulación, reproducción). No se usan en la estación.
+# Ejecutar desde la raíz del proyecto: python -m herramientas.<modulo>
@@ -0,0 +1,105 @@
+"""
+herramientas/bench_identificadores.py
+-------------------------------------
+Compara los dos formatos de identificadores cifrados de BaseDatos (TEXT vs BLOB empacado,
+config.json -> "identificadores_binarios") sobre una BD temporal con N alumnos:
+- Tamaño de la tabla y del índice idx_alumnos_boleta (dbstat, tras VACUUM).
+- Búsquedas por identificador: la consulta sola (una conexión abierta) y el camino completo
+  de BaseDatos.obtener_estado_bici / validar_pin (abre conexión por llamada, como la estación).
+- Tiempo de la migración en línea (BaseDatos.migrar_identificadores, por lotes) y que las
+  búsquedas den lo mismo antes y después.
+
+Uso:
+  python -m herramientas.bench_identificadores --usuarios 20000 --busquedas 5000
+"""
+
+import argparse, contextlib, os, random, shutil, sqlite3, tempfile, time
+
+from app.data.db import BaseDatos, _claves
+from app.utils.crypto import encriptar
+
+
+def _poblar(archivo: str, usuarios: int):
+    """Alumnos sintéticos en una sola transacción (el camino de inserción no es lo que se mide)."""
+    with sqlite3.connect(archivo) as conn:
+        conn.executemany(
+            "INSERT INTO alumnos (boleta, curp, nombre, estado, url, pin, tiene_bici_guardada) "
+            "VALUES (?, ?, ?, 'Inscrito', ?, ?, ?)",
+            [(encriptar(f"2020{i:06d}"), encriptar(f"GOMA{i:06d}HDFRRN09"), f"Alumno {i}",
+              f"https://servicios.dae.ipn.mx/vcred/?h={i}", f"{i % 10000:04d}", i % 2)
+             for i in range(usuarios)])
+
+
+def _tamanos(archivo: str) -> tuple[int, int]:
+    """(bytes de la tabla alumnos, bytes del índice por boleta) tras VACUUM."""
+    with contextlib.closing(sqlite3.connect(archivo, isolation_level=None)) as conn:
+        conn.execute("VACUUM")
+        tam = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat "
+                                "WHERE name IN ('alumnos', 'idx_alumnos_boleta') GROUP BY name"))
+    return tam.get("alumnos", 0), tam.get("idx_alumnos_boleta", 0)
+
+
+def _medir(db: BaseDatos, muestra: list) -> tuple[float, float, list]:
+    """(µs por consulta sola, µs por llamada de BaseDatos, resultados) sobre la muestra."""
+    with contextlib.closing(sqlite3.connect(db.archivo)) as conn:
+        t0 = time.perf_counter()
+        for cif in muestra:
+            conn.execute("SELECT tiene_bici_guardada FROM alumnos WHERE boleta IN (?, ?)", _claves(cif)).fetchone()
+        consulta = (time.perf_counter() - t0) / len(muestra) * 1e6
+    t0 = time.perf_counter()
+    resultados = [db.obtener_estado_bici(cif, "alumno") for cif in muestra]
+    llamada = (time.perf_counter() - t0) / len(muestra) * 1e6
+    return consulta, llamada, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[3])
+    parser.add_argument("--usuarios", type=int, default=20000)
+    parser.add_argument("--busquedas", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=200, help="filas por paso de migración")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_identificadores_")
+    archivo = os.path.join(tmp, "bench.db")
+    try:
+        db = BaseDatos(archivo, "bench")
+        _poblar(archivo, args.usuarios)
+        rnd = random.Random(1)
+        muestra = [encriptar(f"2020{rnd.randrange(args.usuarios):06d}") for _ in range(args.busquedas)]
+
+        tabla_txt, indice_txt = _tamanos(archivo)
+        consulta_txt, llamada_txt, res_txt = _medir(db, muestra)
+        pins_txt = sum(db.validar_pin(f"2020{i:06d}", f"{i % 10000:04d}", "alumno") for i in range(0, args.usuarios, 97))
+
+        db = BaseDatos(archivo, "bench", identificadores_binarios=True)
+        t0 = time.perf_counter()
+        pasos, maximo = 0, 0.0
+        while True:
+            p0 = time.perf_counter()
+            if not db.migrar_identificadores(args.lote):
+                break
+            pasos += 1
+            maximo = max(maximo, time.perf_counter() - p0)
+        migracion = time.perf_counter() - t0
+
+        tabla_bin, indice_bin = _tamanos(archivo)
+        consulta_bin, llamada_bin, res_bin = _medir(db, muestra)
+        pins_bin = sum(db.validar_pin(f"2020{i:06d}", f"{i % 10000:04d}", "alumno") for i in range(0, args.usuarios, 97))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{args.usuarios} alumnos, {args.busquedas} búsquedas por identificador")
+    print(f"{'':26}{'TEXT':>12}{'BLOB':>12}")
+    print(f"{'tabla alumnos (KB)':26}{tabla_txt / 1024:12.0f}{tabla_bin / 1024:12.0f}")
+    print(f"{'índice boleta (KB)':26}{indice_txt / 1024:12.0f}{indice_bin / 1024:12.0f}")
+    print(f"{'consulta (µs)':26}{consulta_txt:12.1f}{consulta_bin:12.1f}")
+    print(f"{'obtener_estado_bici (µs)':26}{llamada_txt:12.1f}{llamada_bin:12.1f}")
+    print(f"Migración: {migracion:.2f} s en {pasos} pasos de {args.lote} filas (paso más largo {maximo * 1000:.1f} ms)")
+    iguales = res_txt == res_bin and pins_txt == pins_bin
+    print(f"Resultados idénticos antes y después: {'sí' if iguales else 'NO'}")
+    if not iguales:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
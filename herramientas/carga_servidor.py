@@ -0,0 +1,99 @@
+"""
+herramientas/carga_servidor.py
+------------------------------
+Prueba de carga del servidor central en una sola máquina.
+
+Levanta ServidorAcceso sobre una BD temporal y lanza N estaciones simuladas (hilos),
+cada una con su propio BaseDatosRemota. Cada estación repite el ciclo de un escaneo:
+  existe_url -> [insertar] + obtener_usuario + decidir_acceso [+ decidir_acceso con PIN]
+             + actualizar_accion + confirmar_acceso (la confirmación del actuador)
+sobre un conjunto compartido de usuarios, así varias estaciones tocan los mismos registros
+(las que coinciden con una decisión en curso del mismo usuario reciben 'ocupado').
+Las peticiones llevan token, como en producción.
+
+Uso:
+  python -m herramientas.carga_servidor --clientes 50 --escaneos 200 --usuarios 500
+"""
+
+import argparse, os, random, secrets, tempfile, threading, time
+from collections import Counter
+
+from app.data.db import BaseDatos
+from app.data.servidor import ServidorAcceso
+from app.data.remota import BaseDatosRemota, ErrorServidor
+from app.models.alumno import Alumno
+from app.utils.crypto import encriptar
+from app.utils.estadistica import percentil
+
+
+def _alumno(i: int, url: str) -> Alumno:
+    boleta = f"2020{i:06d}"
+    return Alumno(boleta=boleta, curp=f"CURP{i:06d}HDFXXX00", nombre=f"Alumno {i}", carrera="ISC",
+                  escuela="ESCOM", estado="Inscrito", turno="Matutino", fecha="", url=url, accion="entrada")
+
+
+def _estacion(db, usuarios: int, escaneos: int, latencias: list, errores: list, decisiones: Counter,
+              semilla: int):
+    rnd = random.Random(semilla)
+    for _ in range(escaneos):
+        i = rnd.randrange(usuarios)
+        url = f"https://servicios.dae.ipn.mx/vcred/?h={i}"
+        t0 = time.perf_counter()
+        try:
+            if not db.existe_url(url, "alumno"):
+                db.insertar_alumno(_alumno(i, url), tiene_bici_guardada=False)
+            boleta = db.obtener_usuario(url, "alumno").boleta
+            cif = encriptar(boleta)
+            decision = db.decidir_acceso(cif, "alumno")
+            if decision == "pin_requerido":
+                decision = db.decidir_acceso(cif, "alumno", boleta[-4:])   # PIN por defecto
+            decisiones[decision] += 1
+            if decision in ("entrada", "salida"):
+                db.actualizar_accion(url, decision, "alumno")
+                db.confirmar_acceso(cif, "alumno", decision == "entrada", True)
+        except ErrorServidor as e:
+            errores.append(str(e))
+            continue
+        latencias.append(time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[3])
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--escaneos", type=int, default=200, help="escaneos por cliente")
+    parser.add_argument("--usuarios", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        token = secrets.token_hex(16)
+        servidor = ServidorAcceso(BaseDatos(os.path.join(tmp, "carga.db")), "127.0.0.1", 0, token)
+        threading.Thread(target=servidor.httpd.serve_forever, daemon=True).start()
+
+        latencias, errores, decisiones = [], [], Counter()
+        hilos = [
+            threading.Thread(target=_estacion, args=(
+                BaseDatosRemota(servidor.direccion, timeout=args.timeout, cache_seg=30, token=token),
+                args.usuarios, args.escaneos, latencias, errores, decisiones, n))
+            for n in range(args.clientes)
+        ]
+        t0 = time.perf_counter()
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        total = time.perf_counter() - t0
+        servidor.detener()
+
+    latencias.sort()
+    print(f"Clientes: {args.clientes} | Escaneos: {len(latencias)} ok, {len(errores)} con error")
+    print(f"Tiempo total: {total:.2f} s | Throughput: {len(latencias) / total:.1f} escaneos/s")
+    print(f"Latencia por escaneo: p50 {percentil(latencias, 0.50) * 1000:.1f} ms | "
+          f"p99 {percentil(latencias, 0.99) * 1000:.1f} ms | máx {latencias[-1] * 1000 if latencias else 0:.1f} ms")
+    print("Decisiones: " + ", ".join(f"{d}={c}" for d, c in decisiones.most_common()))
+    if errores:
+        print(f"Primer error: {errores[0]}")
+
+
+if __name__ == "__main__":
+    main()
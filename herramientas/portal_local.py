@@ -0,0 +1,244 @@
+"""
+herramientas/portal_local.py
+----------------------------
+Portal IPN de imitación para probar obtener_html + extractores SIN red.
+
+Sirve las páginas grabadas de herramientas/fixtures/portal/ (plantillas con $campos):
+  /dae/vcred/?h=<token>        -> página de ALUMNO   (clasificar_url -> 'alumno')
+  /dsapp/vcred/?h=<token>      -> página de PROFESOR (clasificar_url -> 'profesor')
+Los datos (boleta, nombre, ...) se derivan del token, así la misma URL siempre
+devuelve la misma persona y miles de URLs distintas sirven para pruebas de carga.
+
+Fallas inyectables (globales por CLI o por petición con parámetros de query):
+  latencia=<ms>  jitter=<ms>          retardo antes de responder
+  fixture=<nombre>                    fuerza una página (p. ej. alumno_no_inscrito)
+  fallo=error                         HTTP 500
+  fallo=truncado                      corta la conexión a la mitad del cuerpo
+  fallo=grande&bytes=<n>              rellena el HTML hasta n bytes
+  fallo=no_html                       responde application/pdf
+Tasas globales: --tasa-error, --tasa-truncado, --tasa-grande, --tasa-no-valido, --tasa-variante.
+
+Uso:
+  python -m herramientas.portal_local --puerto 8081 --latencia 150 --tasa-error 0.02
+  python -m herramientas.portal_local --verificar     # regresión de extractores contra el corpus
+"""
+
+import argparse, hashlib, json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from string import Template
+from urllib.parse import urlparse, parse_qs
+
+DIR_FIXTURES = Path(__file__).parent / "fixtures" / "portal"
+
+NOMBRES = ("JUAN", "MARÍA", "JOSÉ", "ANA", "LUIS", "SOFÍA", "CARLOS", "FERNANDA")
+APELLIDOS = ("PÉREZ", "LÓPEZ", "GARCÍA", "HERNÁNDEZ", "MARTÍNEZ", "RAMÍREZ", "SÁNCHEZ")
+CARRERAS = ("INGENIERÍA EN SISTEMAS COMPUTACIONALES", "INGENIERÍA EN INTELIGENCIA ARTIFICIAL",
+            "LICENCIATURA EN CIENCIA DE DATOS")
+ESCUELAS = ("ESCUELA SUPERIOR DE CÓMPUTO", "ESCUELA SUPERIOR DE INGENIERÍA MECÁNICA Y ELÉCTRICA")
+
+
+def cargar_plantillas() -> dict:
+    return {p.stem: Template(p.read_text(encoding="utf-8")) for p in sorted(DIR_FIXTURES.glob("*.html"))}
+
+
+def datos_para(token: str) -> dict:
+    """Persona determinista a partir del token de la URL."""
+    h = int(hashlib.sha1(token.encode("utf-8")).hexdigest(), 16)
+    rnd = random.Random(h)
+    return {
+        "token": token,
+        "boleta": f"20{h % 10**8:08d}",
+        "curp": "".join(rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(4)) + f"{h % 10**6:06d}HDFRRN0{h % 10}",
+        "nombre": f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+        "carrera": rnd.choice(CARRERAS),
+        "escuela": rnd.choice(ESCUELAS),
+        "turno": rnd.choice(("Matutino", "Vespertino")),
+        "numero_empleado": f"{h % 10**8:08d}",
+        "clave_presupuestal": f"E{h % 10**15:015d}",
+        "area_adscripcion": rnd.choice(ESCUELAS),
+    }
+
+
+def url_para(base: str, tipo: str, token) -> str:
+    """URL del portal local que clasificar_url reconoce como 'alumno' o 'profesor'."""
+    ruta = "dae" if tipo == "alumno" else "dsapp"
+    return f"{base.rstrip('/')}/{ruta}/vcred/?h={token}"
+
+
+class PortalLocal:
+    def __init__(self, host: str = "127.0.0.1", puerto: int = 0, latencia_ms: float = 0, jitter_ms: float = 0,
+                 tasa_error: float = 0, tasa_truncado: float = 0, tasa_grande: float = 0,
+                 bytes_grande: int = 2_000_000, tasa_no_valido: float = 0.1, tasa_variante: float = 0.2,
+                 datos_fijos: dict | None = None):
+        self.plantillas = cargar_plantillas()
+        self.datos_fijos = datos_fijos  # si se da, todas las páginas usan estos datos (regresión)
+        self.latencia_ms, self.jitter_ms = latencia_ms, jitter_ms
+        self.tasa_error, self.tasa_truncado, self.tasa_grande = tasa_error, tasa_truncado, tasa_grande
+        self.bytes_grande = bytes_grande
+        self.tasa_no_valido, self.tasa_variante = tasa_no_valido, tasa_variante
+        self.peticiones = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, puerto), self._crear_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base(self) -> str:
+        host, puerto = self.httpd.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def _elegir_fixture(self, tipo: str, token: str) -> str:
+        # Decisión estable por token: la misma URL siempre cae en la misma página.
+        r = int(hashlib.md5(token.encode("utf-8")).hexdigest(), 16) / 16**32
+        if tipo == "alumno":
+            if r < self.tasa_no_valido:
+                return "alumno_no_inscrito"
+            return "alumno_variante" if r < self.tasa_no_valido + self.tasa_variante else "alumno_inscrito"
+        if r < self.tasa_no_valido:
+            return "profesor_no_valida"
+        return "profesor_variante" if r < self.tasa_no_valido + self.tasa_variante else "profesor_valida"
+
+    def renderizar(self, fixture: str, token: str) -> bytes:
+        return self.plantillas[fixture].safe_substitute(self.datos_fijos or datos_para(token)).encode("utf-8")
+
+    def _crear_handler(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with portal._lock:
+                    portal.peticiones += 1
+                p = urlparse(self.path)
+                q = {k: v[-1] for k, v in parse_qs(p.query).items()}
+                partes = p.path.strip("/").split("/")
+                tipo = {"dae": "alumno", "dsapp": "profesor"}.get(partes[0] if partes else "")
+                if tipo is None:
+                    return self._enviar(404, b"<html><body>No encontrado</body></html>")
+
+                latencia = float(q.get("latencia", portal.latencia_ms)) + random.uniform(0, float(q.get("jitter", portal.jitter_ms)))
+                if latencia:
+                    time.sleep(latencia / 1000)
+
+                fallo = q.get("fallo") or self._fallo_aleatorio()
+                if fallo == "error":
+                    return self._enviar(500, b"<html><body>Error interno</body></html>")
+
+                token = q.get("h", "")
+                fixture = q.get("fixture") or portal._elegir_fixture(tipo, token)
+                if fixture not in portal.plantillas:
+                    return self._enviar(404, b"<html><body>Fixture desconocido</body></html>")
+                cuerpo = portal.renderizar(fixture, token)
+
+                if fallo == "no_html":
+                    return self._enviar(200, b"%PDF-1.4\n" + cuerpo, "application/pdf")
+                if fallo == "grande":
+                    total = int(q.get("bytes", portal.bytes_grande))
+                    relleno = b"<!-- " + b"x" * max(0, total - len(cuerpo) - 9) + b" -->"
+                    cuerpo = cuerpo.replace(b"</body>", relleno + b"</body>", 1)
+                if fallo == "truncado":
+                    return self._enviar(200, cuerpo, truncar=True)
+                self._enviar(200, cuerpo)
+
+            def _fallo_aleatorio(self):
+                r = random.random()
+                for nombre, tasa in (("error", portal.tasa_error), ("truncado", portal.tasa_truncado),
+                                     ("grande", portal.tasa_grande)):
+                    if r < tasa:
+                        return nombre
+                    r -= tasa
+                return None
+
+            def _enviar(self, codigo, cuerpo: bytes, tipo="text/html; charset=utf-8", truncar=False):
+                self.send_response(codigo)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                if truncar:
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                if truncar:
+                    self.wfile.write(cuerpo[: len(cuerpo) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def iniciar_en_hilo(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def verificar(por_http: bool = False) -> bool:
+    """
+    Regresión: corre los extractores sobre cada fixture con los datos de muestra de
+    esperado.json y compara campo por campo. Con por_http=True además pasa por
+    obtener_html contra un portal local (prueba la descarga completa).
+    """
+    from app.web.scraper import obtener_html, extraer_datos_alumno, extraer_datos_profesor
+
+    esperado = json.loads((DIR_FIXTURES / "esperado.json").read_text(encoding="utf-8"))
+    muestra = esperado.pop("_muestra")
+    plantillas = cargar_plantillas()
+    portal = PortalLocal(datos_fijos=muestra).iniciar_en_hilo() if por_http else None
+    fallas = 0
+    try:
+        for fixture, campos in esperado.items():
+            tipo = "alumno" if fixture.startswith("alumno") else "profesor"
+            if portal:
+                html = obtener_html(url_para(portal.base, tipo, "muestra") + f"&fixture={fixture}", user_agent="portal-local")
+            else:
+                html = plantillas[fixture].safe_substitute(muestra)
+            datos = (extraer_datos_alumno if tipo == "alumno" else extraer_datos_profesor)(html or "")
+            difs = {k: (v, datos.get(k)) for k, v in campos.items() if datos.get(k) != v}
+            print(f"{'OK   ' if not difs else 'FALLA'} {fixture}")
+            for k, (v, obtenido) in difs.items():
+                print(f"      {k}: esperado {v!r}, obtenido {obtenido!r}")
+            fallas += bool(difs)
+    finally:
+        if portal:
+            portal.detener()
+    print(f"{len(esperado) - fallas}/{len(esperado)} fixtures correctos.")
+    return fallas == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portal IPN local para pruebas sin red.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8081)
+    parser.add_argument("--latencia", type=float, default=0, help="ms por respuesta")
+    parser.add_argument("--jitter", type=float, default=0, help="ms aleatorios extra")
+    parser.add_argument("--tasa-error", type=float, default=0)
+    parser.add_argument("--tasa-truncado", type=float, default=0)
+    parser.add_argument("--tasa-grande", type=float, default=0)
+    parser.add_argument("--bytes-grande", type=int, default=2_000_000)
+    parser.add_argument("--tasa-no-valido", type=float, default=0.1)
+    parser.add_argument("--tasa-variante", type=float, default=0.2)
+    parser.add_argument("--verificar", action="store_true", help="regresión de extractores y salir")
+    parser.add_argument("--http", action="store_true", help="con --verificar: pasar también por obtener_html")
+    args = parser.parse_args()
+
+    if args.verificar:
+        raise SystemExit(0 if verificar(args.http) else 1)
+
+    portal = PortalLocal(args.host, args.puerto, args.latencia, args.jitter, args.tasa_error,
+                         args.tasa_truncado, args.tasa_grande, args.bytes_grande,
+                         args.tasa_no_valido, args.tasa_variante)
+    print(f"Portal local en {portal.base}  (ej. {url_para(portal.base, 'alumno', 123)})")
+    try:
+        portal.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nSaliendo...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+herramientas/reproducir_traza.py
+--------------------------------
+Reproduce una traza grabada por la estación (main.py --traza, ver app/core/traza.py)
+a través del flujo COMPLETO de EscanerQR, sin red ni hardware:
+- BD temporal (vacía o copia de --db, p. ej. un respaldo de la estación).
+- Cerraduras en simulación (nunca se mueve un actuador real, aunque corra en la RPi).
+- Bloqueados: una copia del archivo de la estación (config.json -> json_files.bloqueados), así
+  la política se evalúa con la misma lista y los bloqueos por 'limite_intentos' no la tocan.
+- Las descargas del portal van al portal local (herramientas/portal_local.py) con la misma
+  ruta y token, así que la misma URL siempre devuelve la misma persona.
+
+Los escaneos se inyectan respetando los tiempos de la traza a 1x o Nx (--velocidad 0 = sin
+esperas). El anti-rebote usa el tiempo de la traza, así las decisiones no dependen de la velocidad.
+
+Reporte:
+- throughput y latencia p50/p99 (desde el instante programado: incluye la cola que se forma
+  si la estación no da abasto) y tiempo de servicio por escaneo.
+- diferencias de decisión contra la traza original o contra otra corrida (--comparar).
+  Sin --db los usuarios que ya existían al grabar se ven como nuevos: comparar corridas
+  de dos versiones con la misma entrada, o partir de una copia de la BD.
+
+--politica prueba un politica.json nuevo (app/core/politica.py) sin aplicarlo en la estación:
+las diferencias muestran qué escaneos cambiarían de decisión. El horario se evalúa con la
+hora de pared de la grabación (inicio de la traza + t), no con la hora actual.
+
+Uso:
+  python -m herramientas.reproducir_traza hora_pico.jsonl --velocidad 10 --salida v2.jsonl
+  python -m herramientas.reproducir_traza hora_pico.jsonl --velocidad 0 --comparar v1.jsonl
+  python -m herramientas.reproducir_traza hora_pico.jsonl --velocidad 0 --politica nueva.json
+"""
+
+import argparse, contextlib, datetime, io, os, shutil, tempfile, time
+from collections import Counter
+
+import app.core.acceso as acceso_mod
+import app.core.escaner as escaner_mod
+from app.config import CONFIG
+from app.core.politica import GestorPolitica
+from app.core.traza import GrabadorTraza, leer_traza
+from app.data.db import BaseDatos
+from app.data.json_store import GestorJSON
+from app.utils.estadistica import percentil
+from app.web.trabajador import ScraperLocal
+from herramientas.portal_local import PortalLocal
+
+
+def _redirigir(base: str):
+    """obtener_html que manda al portal local la misma ruta y query que pidió la estación."""
+    from urllib.parse import urlparse
+    from app.utils.classify import clasificar_url
+    from app.web.scraper import obtener_html
+
+    def obtener_local(url, *args, **kwargs):
+        p = urlparse(url)
+        ruta = p.path if p.path.startswith(("/dae/", "/dsapp/")) else \
+            ("/dae" if clasificar_url(url) == "alumno" else "/dsapp") + p.path
+        return obtener_html(f"{base}{ruta}?{p.query}", *args, **kwargs)
+    return obtener_local
+
+
+def reproducir(eventos: list, velocidad: float = 1.0, db_origen: str | None = None,
+               portal: PortalLocal | None = None, detalle: bool = False,
+               politica: str | None = None, inicio_traza: float | None = None,
+               prefetch: bool = True) -> tuple[list, float]:
+    """
+    Devuelve ([[t, raw, decision, latencia, servicio], ...], segundos totales).
+    politica    : politica.json a probar (por defecto la configurada en config.json).
+    inicio_traza: epoch de la grabación (cabecera), para evaluar el horario con la hora de entonces.
+    """
+    tmp = tempfile.mkdtemp(prefix="reproduccion_")
+    db_archivo = os.path.join(tmp, "reproduccion.db")
+    if db_origen:
+        shutil.copyfile(db_origen, db_archivo)
+    db = BaseDatos(db_archivo, "reproduccion")
+    bloqueados = os.path.join(tmp, "bloqueados.json")
+    if os.path.exists(CONFIG["json_files"].get("bloqueados") or ""):
+        shutil.copyfile(CONFIG["json_files"]["bloqueados"], bloqueados)
+    json_store = GestorJSON(os.path.join(tmp, "alumnos.json"), os.path.join(tmp, "profesores.json"), bloqueados)
+
+    acceso_mod.GPIO_OK = False   # hardware simulado: solo se alterna el estado en BD
+    # Misma lista de bloqueados que ControlAcceso usa cuando no se le pasa política.
+    gestor = GestorPolitica(politica, json_store.archivo_bloqueados,
+                            limite_intentos=CONFIG.get("limite_intentos", 3)) if politica else None
+    acceso = acceso_mod.ControlAcceso(db, json_store, gestor)
+    # Portal en este proceso: las decisiones no dependen de cómo se aísle el scraper.
+    scraper = ScraperLocal(CONFIG["user_agent"], obtener_html=_redirigir(portal.base) if portal else None)
+    escaner = escaner_mod.EscanerQR(acceso, db, scraper=scraper, prefetch=prefetch)
+    t_traza = 0.0
+    escaner.reloj = lambda: t_traza
+    if inicio_traza is not None:
+        acceso.politica.reloj = lambda: datetime.datetime.fromtimestamp(inicio_traza + t_traza)
+
+    resultados = []
+    salida = contextlib.nullcontext() if detalle else contextlib.redirect_stdout(io.StringIO())
+    inicio = time.perf_counter()
+    try:
+        with salida:
+            for t, raw, *_ in eventos:
+                programado = inicio + t / velocidad if velocidad else time.perf_counter()
+                espera = programado - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                t_traza = t
+                t0 = time.perf_counter()
+                decision = escaner.procesar_linea(raw)
+                fin = time.perf_counter()
+                resultados.append([t, raw, decision, fin - programado, fin - t0])
+        if prefetch:
+            print(f"Prefetch: {escaner.prefetch['usadas']} descargas adelantadas, "
+                  f"{escaner.prefetch['descartadas']} descartadas (usuario ya en BD).")
+    finally:
+        escaner.scraper.detener()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return resultados, time.perf_counter() - inicio
+
+
+def diferencias(esperadas: list, obtenidas: list) -> list:
+    """[(índice, raw, decisión esperada, decisión obtenida)] evento por evento."""
+    return [(i, a[1], a[2], b[2]) for i, (a, b) in enumerate(zip(esperadas, obtenidas)) if a[2] != b[2]]
+
+
+def reporte(resultados: list, total: float, difs: list, referencia: str):
+    latencias = sorted(r[3] for r in resultados)
+    servicio = sorted(r[4] for r in resultados)
+    n = len(resultados)
+    print(f"Escaneos: {n} en {total:.2f} s | Throughput: {n / (total or 1e-9):.1f} escaneos/s")
+    print(f"Latencia (desde el instante programado): p50 {percentil(latencias, 0.50) * 1000:.1f} ms | "
+          f"p99 {percentil(latencias, 0.99) * 1000:.1f} ms | máx {latencias[-1] * 1000 if latencias else 0:.1f} ms")
+    print(f"Servicio por escaneo: p50 {percentil(servicio, 0.50) * 1000:.1f} ms | "
+          f"p99 {percentil(servicio, 0.99) * 1000:.1f} ms")
+    print("Decisiones: " + ", ".join(f"{d}={c}" for d, c in Counter(r[2] for r in resultados).most_common()))
+    print(f"Diferencias contra {referencia}: {len(difs)}")
+    for (esperada, obtenida), c in Counter((d[2], d[3]) for d in difs).most_common():
+        print(f"  {esperada} -> {obtenida}: {c}")
+    for i, raw, esperada, obtenida in difs[:10]:
+        print(f"  #{i}: {esperada} -> {obtenida}  {raw}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduce una traza de escaneos sin red ni hardware.")
+    parser.add_argument("traza")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="1 = tiempo real, N = N veces, 0 = sin esperas")
+    parser.add_argument("--db", help="partir de una copia de esta BD (no se modifica)")
+    parser.add_argument("--comparar", help="traza/corrida contra la cual comparar decisiones (por defecto la propia traza)")
+    parser.add_argument("--salida", help="guardar las decisiones de esta corrida como traza")
+    parser.add_argument("--latencia", type=float, default=0, help="ms del portal local por respuesta")
+    parser.add_argument("--detalle", action="store_true", help="mostrar la salida de la estación")
+    parser.add_argument("--politica", help="politica.json a probar en lugar de la configurada")
+    parser.add_argument("--sin-prefetch", action="store_true", help="no adelantar la descarga de URLs desconocidas")
+    args = parser.parse_args()
+
+    cabecera, eventos = leer_traza(args.traza)
+    print(f"Traza {args.traza}: {len(eventos)} escaneos, {eventos[-1][0] if eventos else 0:.1f} s "
+          f"grabados en '{cabecera.get('estacion', '?')}'.")
+    if args.politica:
+        print(f"Política a probar: "
+              f"{GestorPolitica(args.politica, CONFIG['json_files'].get('bloqueados')).actual().resumen()}")
+    portal = PortalLocal(latencia_ms=args.latencia).iniciar_en_hilo()
+    try:
+        resultados, total = reproducir(eventos, args.velocidad, args.db, portal, args.detalle,
+                                       args.politica, cabecera.get("inicio"), not args.sin_prefetch)
+    finally:
+        portal.detener()
+
+    referencia = leer_traza(args.comparar)[1] if args.comparar else eventos
+    reporte(resultados, total, diferencias(referencia, resultados), args.comparar or "la traza original")
+
+    if args.salida:
+        grabador = GrabadorTraza(args.salida, "reproduccion")
+        for t, raw, decision, _, servicio in resultados:
+            grabador.escribir(t, raw, decision, servicio)
+        grabador.cerrar()
+
+
+if __name__ == "__main__":
+    main()
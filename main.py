@@ -4,31 +4,123 @@ main.py
 Punto de entrada de la aplicación.
 
 Responsabilidades:
-- Apagar advertencias SSL (porque requests se hace con verify=False por la fuente original).
-- Construir las dependencias (BD, JSON store, ControlAcceso, EscanerQR).
+- Construir las dependencias (BD, JSON store, ControlAcceso, EscanerQR y el trabajador que
+  consulta el portal en un proceso aparte: requests/bs4 no se cargan en este proceso).
 - Iniciar el bucle de escaneo HID (input por consola).
 - Al salir, limpiar GPIO si aplica.
 
+Modos:
+- python main.py             -> estación. Usa la BD local, o la del servidor central si
+                                config.json -> "servidor_central.url" tiene valor.
+- python main.py --servidor  -> servidor central: una sola BD compartida por las estaciones.
+                                También funciona como hub de réplica.
+- python main.py --traza t.jsonl -> además graba cada escaneo (ver herramientas/reproducir_traza.py).
+                                También con config.json -> "traza.archivo".
+- "replicacion.activa"       -> la estación usa su BD local y sincroniza la bitácora de
+                                cambios con los pares (sigue operando si se cae la red).
+                                "replicacion.token" autentica el canal de réplica del hub
+                                (distinto del token de las estaciones; vacío = canal cerrado).
+- "respaldo.activo"          -> respaldo comprimido y verificado de la BD local cada
+                                "intervalo_seg" en segundo plano (ver app/data/respaldo.py).
+
 IMPORTANTE: Ejecutar SIEMPRE desde el directorio del proyecto para que Python
 encuentre tus módulos Cifrado.py / Descifrado.py / Clasificador.py en el sys.path.
 """
 
-import urllib3
+import argparse
 
 # Config y componentes del proyecto
-from app.config import CONFIG
+from app.config import CONFIG, ESTACION
 from app.data.db import BaseDatos
 from app.data.json_store import GestorJSON
 from app.core.acceso import ControlAcceso
 from app.core.escaner import EscanerQR
 from app.hardware.gpio_ctrl import cleanup  # Limpia pines al terminar
 
-# Evita warnings por verify=False en requests
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+def crear_db():
+    """BD local (por defecto) o cliente del servidor central si hay URL configurada."""
+    central = CONFIG.get("servidor_central", {})
+    if central.get("url"):
+        from app.data.remota import BaseDatosRemota
+        if CONFIG.get("ranuras") and not ESTACION:
+            # El servidor guarda los racks de todas las estaciones: cada una necesita su propio id.
+            raise SystemExit("Modo cliente con 'ranuras': configure un 'replicacion.estacion_id' "
+                             "único para esta estación.")
+        print(f"Estación en modo cliente del servidor central {central['url']}.")
+        return BaseDatosRemota(central["url"], timeout=central.get("timeout_seg", 2.0),
+                               cache_seg=central.get("cache_seg", 30), token=central.get("token"))
+    return BaseDatos(CONFIG['database_file'], ESTACION, CONFIG.get("identificadores_binarios", False))
+
+def iniciar_replicacion(db):
+    """Si está activa, sincroniza la BD local con los pares en segundo plano."""
+    conf = CONFIG.get("replicacion", {})
+    if not conf.get("activa") or not isinstance(db, BaseDatos):
+        return None
+    from app.data.remota import ParReplica
+    from app.data.replicacion import Replicador
+    pares = [ParReplica(url, timeout=conf.get("timeout_seg", 5.0), token=conf.get("token")) for url in conf.get("pares", [])]
+    replicador = Replicador(db, pares, lote=conf.get("lote", 500), max_lotes=conf.get("max_lotes", 20))
+    replicador.iniciar(conf.get("intervalo_seg", 10))
+    print(f"Réplica activa como '{db.estacion}' con {len(pares)} par(es).")
+    return replicador
+
+def crear_mantenimiento(db, lock=None):
+    """
+    Mantenimiento de la BD local (config.json -> "mantenimiento"); None si no aplica.
+    También compacta la bitácora: cada escritura deja una foto en 'cambios' aunque la réplica
+    esté apagada, y sin Replicador nadie más la recorta.
+    """
+    conf = CONFIG.get("mantenimiento", {})
+    if not conf.get("activo", True) or not isinstance(db, BaseDatos):
+        return None
+    from app.data.mantenimiento import Mantenimiento
+    return Mantenimiento(db.archivo, intervalo_seg=conf.get("intervalo_seg", 21600),
+                         reposo_seg=conf.get("reposo_seg", 2.0), presupuesto_ms=conf.get("presupuesto_ms", 50),
+                         paginas_por_paso=conf.get("paginas_por_paso", 128), lock=lock,
+                         compactar=db.compactar_cambios_lote, migrar=db.migrar_identificadores)
 
-def main():
+def crear_scraper():
+    """Consultas al portal (config.json -> "scraper"); "procesos": 0 = en este mismo proceso."""
+    from app.web.trabajador import ScraperLocal, TrabajadorScraper
+    conf = CONFIG.get("scraper", {})
+    if not conf.get("procesos", 1):
+        return ScraperLocal(CONFIG['user_agent'])
+    return TrabajadorScraper(CONFIG['user_agent'], procesos=conf.get("procesos", 1),
+                             timeout_seg=conf.get("timeout_seg", 20.0), max_trabajos=conf.get("max_trabajos", 200),
+                             memoria_mb=conf.get("memoria_mb", 256)).iniciar()
+
+def iniciar_respaldo(db):
+    """Respaldos en caliente de la BD local (config.json -> "respaldo"); None si no aplica."""
+    conf = CONFIG.get("respaldo", {})
+    if not conf.get("activo", True) or not isinstance(db, BaseDatos):
+        return None
+    from app.data.respaldo import crear_respaldo
+    return crear_respaldo(db.archivo, conf).iniciar_en_hilo()
+
+def servidor():
+    from app.data.servidor import ServidorAcceso
+    central = CONFIG.get("servidor_central", {})
+    db = BaseDatos(CONFIG['database_file'], ESTACION, CONFIG.get("identificadores_binarios", False))
+    try:
+        srv = ServidorAcceso(db, central.get("host", "127.0.0.1"), central.get("puerto", 8765), central.get("token"),
+                             CONFIG.get("replicacion", {}).get("token"))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    mantenimiento = crear_mantenimiento(db, srv.lock_escritura)
+    if mantenimiento:
+        mantenimiento.iniciar_en_hilo()
+    respaldo = iniciar_respaldo(db)
+    try:
+        srv.iniciar()
+    finally:
+        if mantenimiento:
+            mantenimiento.detener()
+        if respaldo:
+            respaldo.detener()
+
+def main(archivo_traza: str | None = None):
     # 1) Inicializa capa de datos
-    db = BaseDatos(CONFIG['database_file'])
+    db = crear_db()
     json_store = GestorJSON(
     CONFIG['json_files']['alumnos_no_inscritos'],
     CONFIG['json_files']['profesores_no_validos'],
@@ -36,19 +128,43 @@ def main():
 )
 
 
+    replicador = iniciar_replicacion(db)
+    respaldo = iniciar_respaldo(db)
+
     # 2) Lógica de negocio (control de acceso)
     acceso = ControlAcceso(db, json_store)
+    print(f"Política de acceso: {acceso.politica.actual().resumen()}")
 
     # 3) Escáner que orquesta el flujo de URL -> verificación BD/scrapeo -> accion
-    escaner = EscanerQR(acceso, db)
+    archivo_traza = archivo_traza or CONFIG.get("traza", {}).get("archivo")
+    traza = None
+    if archivo_traza:
+        from app.core.traza import GrabadorTraza
+        traza = GrabadorTraza(archivo_traza, acceso.estacion)
+        print(f"Grabando traza de escaneos en {archivo_traza}.")
+    scraper = crear_scraper()
+    escaner = EscanerQR(acceso, db, traza, crear_mantenimiento(db), scraper,
+                        prefetch=CONFIG.get("scraper", {}).get("prefetch", True))
 
     try:
         # 4) Inicia bucle de lectura por consola (simulación de lector HID)
         escaner.iniciar()
     finally:
-        # 5) Siempre limpia GPIO si estás en Linux/RPi y hubo setup correcto
+        # 5) Termina movimientos pendientes y limpia GPIO si estás en Linux/RPi
+        acceso.detener()
+        scraper.detener()
         cleanup()
+        if replicador:
+            replicador.detener()
+        if respaldo:
+            respaldo.detener()
 
 if __name__ == "__main__":
-    main()
-
+    parser = argparse.ArgumentParser(description="Sistema de acceso a biciestacionamiento")
+    parser.add_argument("--servidor", action="store_true", help="ejecutar como servidor central de BD")
+    parser.add_argument("--traza", metavar="ARCHIVO", help="grabar los escaneos en una traza (.jsonl o .jsonl.gz)")
+    args = parser.parse_args()
+    if args.servidor:
+        servidor()
+    else:
+        main(args.traza)
@@ -0,0 +1,390 @@
+"""
+tests/test_acceso.py
+--------------------
+ControlAcceso y EscanerQR (app/core/acceso.py, app/core/escaner.py) sobre una BD temporal,
+con el camino de GPIO real y un actuador de prueba que no mueve nada: la prueba decide
+cuándo se confirma o falla cada movimiento.
+
+Uso:  python -m pytest tests   (o python -m unittest discover tests), desde la raíz del proyecto.
+"""
+
+import datetime, json, os, tempfile, unittest
+from concurrent.futures import Future
+from unittest import mock
+
+import app.core.acceso as acceso_mod
+from app.core.acceso import ControlAcceso
+from app.core.escaner import EscanerQR
+from app.core.politica import GestorPolitica
+from app.data.db import BaseDatos
+from app.data.json_store import GestorJSON
+from app.utils.crypto import encriptar
+
+URL = "https://servicios.dae.ipn.mx/vcred/?h=1"
+BOLETA = "2020630001"
+
+
+def _datos() -> dict:
+    return {"boleta": BOLETA, "curp": "CURP01", "nombre": "Alumno 1", "carrera": "ISC",
+            "escuela": "ESCOM", "estado": "Inscrito", "turno": "M"}
+
+
+class ActuadorManual:
+    """Guarda los movimientos encolados; terminar() los confirma o los hace fallar en orden."""
+
+    def __init__(self):
+        self.pendientes = []
+        self.ranuras = []   # ranura de cada movimiento encolado (None = actuador de 'gpio_pins')
+
+    def enviar(self, objetivo, al_terminar=None, descripcion="", ranura=None) -> bool:
+        self.pendientes.append(al_terminar)
+        self.ranuras.append(ranura)
+        return True
+
+    def terminar(self, ok: bool = True):
+        self.pendientes.pop(0)(ok)
+
+
+class ScraperFijo:
+    """Consulta al portal que siempre devuelve la misma persona."""
+
+    def __init__(self, datos: dict):
+        self.datos = datos
+
+    def consultar(self, url, tipo):
+        return dict(self.datos)
+
+
+class ScraperEspeculativo(ScraperFijo):
+    """Como ScraperFijo, con enviar() en segundo plano (Future) y el orden de llamadas anotado.
+    Con responder=False la consulta enviada queda pendiente, como una descarga todavía en curso."""
+
+    def __init__(self, datos: dict, llamadas: list):
+        super().__init__(datos)
+        self.llamadas = llamadas
+        self.futuros = []
+        self.responder = False
+
+    def enviar(self, url, tipo) -> Future:
+        self.llamadas.append("enviar")
+        futuro = Future()
+        if self.responder:
+            futuro.set_result(dict(self.datos))
+        self.futuros.append(futuro)
+        return futuro
+
+    def consultar(self, url, tipo):
+        self.llamadas.append("consultar")
+        return super().consultar(url, tipo)
+
+
+class BaseAcceso(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        ruta = lambda nombre: os.path.join(self.dir.name, nombre)
+        self.db = BaseDatos(ruta("estacion.db"))
+        self.json = GestorJSON(ruta("alumnos.json"), ruta("profesores.json"), ruta("bloqueados.json"))
+        with mock.patch.object(acceso_mod, "GPIO_OK", False):
+            self.acceso = ControlAcceso(self.db, self.json, GestorPolitica(None, self.json.archivo_bloqueados))
+        self.actuador = self.acceso.actuador = ActuadorManual()
+        gpio = mock.patch.object(acceso_mod, "GPIO_OK", True)
+        gpio.start()
+        self.addCleanup(gpio.stop)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def bici(self) -> bool:
+        return self.db.obtener_estado_bici(encriptar(BOLETA), "alumno")
+
+    def registrar(self):
+        datos = _datos()
+        datos["url"] = URL
+        self.assertTrue(self.acceso.procesar_nuevo_usuario(datos, "alumno"))
+
+
+class TestFlagBici(BaseAcceso):
+    def test_nuevo_usuario_se_inserta_sin_bici(self):
+        self.registrar()
+        self.assertTrue(self.db.existe_url(URL, "alumno"))
+        self.assertFalse(self.bici())
+
+    def test_actualizar_accion_no_toca_el_flag(self):
+        self.registrar()
+        self.db.actualizar_accion(URL, "entrada", "alumno")
+        self.assertFalse(self.bici())
+        self.assertEqual(self.db.obtener_usuario(URL, "alumno").accion, "entrada")
+
+    def test_el_flag_cambia_al_confirmar(self):
+        self.registrar()
+        self.assertEqual(self.acceso.abrir_cerradura(BOLETA, "alumno"), "entrada")
+        self.assertFalse(self.bici())           # encolado, aún sin confirmar
+        self.actuador.terminar(True)
+        self.assertTrue(self.bici())
+
+    def test_falla_no_escribe(self):
+        self.registrar()
+        self.acceso.abrir_cerradura(BOLETA, "alumno")
+        # Mientras el motor se mueve, la réplica trae un cambio de otra estación.
+        self.db.actualizar_estado_bici(encriptar(BOLETA), True, "alumno")
+        cambios = len(self.db.cambios_desde(0))
+        self.actuador.terminar(False)
+        self.assertTrue(self.bici())            # antes se "revertía" a False encima del cambio ajeno
+        self.assertEqual(len(self.db.cambios_desde(0)), cambios)
+
+
+class TestBloqueados(BaseAcceso):
+    def setUp(self):
+        super().setUp()
+        self.escaner = EscanerQR(self.acceso, self.db, scraper=ScraperFijo(_datos()))
+        self.escaner.procesar_url(URL, "alumno")
+        self.actuador.terminar(True)
+        self.escaner.vistos.clear()
+
+    def bloquear(self, tipo: str, valor: str):
+        self.json.agregar_bloqueado(tipo, valor, "prueba")
+        self.acceso.politica.recargar()
+
+    def test_registrado_bloqueado_por_boleta(self):
+        # Antes solo se revisaba la boleta al registrar; un usuario ya en BD pasaba.
+        self.bloquear("boleta", BOLETA)
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "bloqueado")
+        self.assertEqual(self.actuador.pendientes, [])
+
+    def test_registrado_bloqueado_por_url(self):
+        self.bloquear("url", URL)
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "bloqueado")
+
+    def test_otra_boleta_no_afecta(self):
+        self.bloquear("boleta", "2020000000")
+        with mock.patch("getpass.getpass", return_value=BOLETA[-4:]):   # PIN por defecto
+            self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "salida")
+
+
+class TestPausaNoValidos(BaseAcceso):
+    def setUp(self):
+        super().setUp()
+        self.escaner = EscanerQR(self.acceso, self.db, scraper=ScraperFijo({**_datos(), "estado": "Baja"}))
+
+    def escanear(self) -> str:
+        self.escaner.vistos.clear()
+        return self.escaner.procesar_url(URL, "alumno")
+
+    def test_la_pausa_vence(self):
+        limite = self.acceso.politica.actual().limite_intentos
+        for _ in range(limite):
+            self.assertEqual(self.escanear(), "no_valido")
+        self.assertEqual(self.escanear(), "bloqueado")
+        self.assertEqual(self.json.lista_bloqueados()[0]["tipo"], "url")
+        self.assertIn("hasta", self.json.lista_bloqueados()[0])
+        # Se inscribió después: pasada la pausa se vuelve a consultar el portal (antes: bloqueada para siempre).
+        self.escaner.scraper = ScraperFijo(_datos())
+        despues = datetime.datetime.now() + datetime.timedelta(seconds=self.acceso.politica.actual().enfriamiento_seg + 60)
+        self.acceso.politica.reloj = lambda: despues
+        self.assertEqual(self.escanear(), "entrada")
+
+    def test_bloqueo_sin_fecha_es_permanente(self):
+        self.json.agregar_bloqueado("url", URL, "a mano")
+        self.acceso.politica.recargar()
+        self.acceso.politica.reloj = lambda: datetime.datetime(2100, 1, 1)
+        self.assertEqual(self.escanear(), "bloqueado")
+
+
+class TestEstadoGuardado(BaseAcceso):
+    """El estado en BD (revalidado) se aplica a los usuarios registrados."""
+
+    def setUp(self):
+        super().setUp()
+        self.escaner = EscanerQR(self.acceso, self.db, scraper=ScraperFijo(_datos()))
+        self.registrar()
+
+    def revalidar(self, estado: str):
+        self.db.actualizar_estados([(URL, estado)], "alumno")
+        self.escaner.vistos.clear()
+
+    def test_estado_no_valido_niega_la_entrada(self):
+        self.revalidar("Sin reinscripción en el periodo actual")
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "denegado")
+        self.assertEqual(self.actuador.pendientes, [])
+
+    def test_estado_no_valido_permite_sacar_la_bici(self):
+        self.escaner.procesar_url(URL, "alumno")
+        self.actuador.terminar(True)
+        self.revalidar("Baja")
+        with mock.patch("getpass.getpass", return_value=BOLETA[-4:]):
+            self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "salida")
+        self.actuador.terminar(True)
+        self.assertFalse(self.bici())
+
+    def test_estado_valido_entra(self):
+        self.revalidar("Inscrito")
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "entrada")
+
+
+PINES = {"pin_a": 6, "pin_b": 13, "sensor_abierto": 23, "sensor_cerrado": 24}
+RANURAS = {1: {"id": 1, **PINES}, 2: {"id": 2, "pin_a": 5, "pin_b": 12, "sensor_abierto": 16, "sensor_cerrado": 20}}
+
+
+class TestRanuras(BaseAcceso):
+    """Rack de dos ranuras; la 1 es la cerradura vieja de 'gpio_pins'."""
+
+    def setUp(self):
+        super().setUp()
+        for parche in (mock.patch.dict(acceso_mod.CONFIG, {"ranuras": list(RANURAS.values())}),
+                       mock.patch.object(acceso_mod, "RANURAS", RANURAS),
+                       mock.patch.object(acceso_mod, "PINS", PINES)):
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.registrar()
+
+    def estacion(self, nombre: str) -> ControlAcceso:
+        with mock.patch.object(acceso_mod, "ESTACION", nombre):
+            acceso = ControlAcceso(self.db, self.json, self.acceso.politica)
+        acceso.actuador = self.actuador
+        return acceso
+
+    def salir(self, acceso, identificador=BOLETA) -> str:
+        with mock.patch("getpass.getpass", return_value=identificador[-4:]):
+            return acceso.abrir_cerradura(identificador, "alumno")
+
+    def test_salida_en_otra_estacion(self):
+        a, b = self.estacion("A"), self.estacion("B")
+        a.abrir_cerradura(BOLETA, "alumno")
+        self.actuador.terminar(True)
+        ranura_a = self.db.ranuras_ocupadas("A")
+        # Antes B la tomaba por bici sin ranura: abría 'gpio_pins' y la ranura de A quedaba ocupada.
+        self.assertEqual(self.salir(b), "denegado")
+        self.assertEqual(self.actuador.pendientes, [])
+        self.assertTrue(self.bici())
+        self.assertEqual(self.db.ranuras_ocupadas("A"), ranura_a)
+        self.assertEqual(self.salir(a), "salida")
+        self.actuador.terminar(True)
+        self.assertEqual(self.db.ranuras_ocupadas("A"), [])
+        self.assertEqual(self.actuador.ranuras, [ranura_a[0][0]] * 2)
+
+    def test_ranura_de_gpio_pins_reservada_con_bicis_sin_ranura(self):
+        # Bici guardada antes de configurar el rack: en la cerradura vieja (ranura 1), sin fila en 'ranuras'.
+        self.db.actualizar_estado_bici(encriptar(BOLETA), True, "alumno")
+        otro = "2020630002"
+        datos = {**_datos(), "boleta": otro, "url": URL + "2"}
+        acceso = self.estacion("A")
+        self.assertTrue(acceso.procesar_nuevo_usuario(datos, "alumno"))
+        self.assertEqual(acceso.ranura_legado, 1)
+        self.assertEqual(acceso.abrir_cerradura(otro, "alumno"), "entrada")
+        self.actuador.terminar(True)
+        self.assertEqual(self.actuador.ranuras, [2])   # no la 1, que está ocupada
+        self.assertEqual(self.salir(acceso), "salida")
+        self.actuador.terminar(True)
+        self.assertEqual(self.actuador.ranuras[-1], None)   # sale por 'gpio_pins'
+        self.assertIsNone(acceso.ranura_legado)
+        self.assertEqual(acceso.ranuras.libres(), 1)
+
+
+class TestCupo(BaseAcceso):
+    """Dos estaciones sobre la misma BD (como con el servidor central) y cupo de 1 alumno."""
+
+    def setUp(self):
+        super().setUp()
+        archivo = os.path.join(self.dir.name, "politica.json")
+        with open(archivo, "w", encoding="utf-8") as f:
+            json.dump({"cupo": {"alumno": 1}}, f)
+        self.a = self.acceso
+        self.a.politica = GestorPolitica(archivo)
+        with mock.patch.object(acceso_mod, "GPIO_OK", False):
+            self.b = ControlAcceso(self.db, self.json, GestorPolitica(archivo))
+        self.b.actuador = self.actuador
+        self.registrar()
+        self.otro = "2020630002"
+        self.assertTrue(self.b.procesar_nuevo_usuario({**_datos(), "boleta": self.otro, "url": URL + "2"}, "alumno"))
+
+    def test_la_otra_estacion_ve_la_entrada(self):
+        self.assertEqual(self.a.abrir_cerradura(BOLETA, "alumno"), "entrada")
+        self.assertEqual(self.b.abrir_cerradura(self.otro, "alumno"), "denegado")   # entrada de A en curso
+        self.actuador.terminar(True)
+        self.assertEqual(self.b.abrir_cerradura(self.otro, "alumno"), "denegado")
+        self.assertEqual(self.actuador.pendientes, [])
+
+    def test_la_otra_estacion_ve_la_salida(self):
+        self.a.abrir_cerradura(BOLETA, "alumno")
+        self.actuador.terminar(True)
+        with mock.patch("getpass.getpass", return_value=BOLETA[-4:]):
+            self.assertEqual(self.a.abrir_cerradura(BOLETA, "alumno"), "salida")
+        self.actuador.terminar(True)
+        self.assertEqual(self.b.abrir_cerradura(self.otro, "alumno"), "entrada")
+
+
+class TestEscanerNuevo(BaseAcceso):
+    def setUp(self):
+        super().setUp()
+        self.escaner = EscanerQR(self.acceso, self.db, scraper=ScraperFijo(_datos()))
+
+    def test_entrada_confirmada(self):
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "entrada")
+        self.assertFalse(self.bici())
+        self.actuador.terminar(True)
+        self.assertTrue(self.bici())
+        self.assertEqual(self.db.obtener_usuario(URL, "alumno").accion, "entrada")
+
+    def test_entrada_fallida_queda_registrado_sin_bici(self):
+        # Antes el usuario se insertaba con bici DESPUÉS de encolar: la falla no se reflejaba.
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "entrada")
+        self.actuador.terminar(False)
+        self.assertTrue(self.db.existe_url(URL, "alumno"))
+        self.assertFalse(self.bici())
+
+    def test_confirmacion_rapida(self):
+        # El actuador confirma antes de que el escáner registre la acción.
+        self.actuador.enviar = lambda objetivo, al_terminar=None, **kw: al_terminar(True) or True
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "entrada")
+        self.assertTrue(self.bici())
+
+    def test_estado_no_valido_no_mueve_ni_registra(self):
+        escaner = EscanerQR(self.acceso, self.db, scraper=ScraperFijo({**_datos(), "estado": "Baja"}))
+        self.assertEqual(escaner.procesar_url(URL, "alumno"), "no_valido")
+        self.assertFalse(self.db.existe_url(URL, "alumno"))
+        self.assertEqual(self.actuador.pendientes, [])
+
+
+class TestPrefetch(BaseAcceso):
+    def setUp(self):
+        super().setUp()
+        self.llamadas = []
+        existe_url = self.db.existe_url
+        self.db.existe_url = lambda url, tipo: self.llamadas.append("bd") or existe_url(url, tipo)
+        self.scraper = ScraperEspeculativo(_datos(), self.llamadas)
+        with mock.patch("builtins.print"):
+            self.escaner = EscanerQR(self.acceso, self.db, scraper=self.scraper, prefetch=True)
+
+    def test_url_desconocida_descarga_antes_de_la_bd(self):
+        self.scraper.responder = True
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "entrada")
+        self.assertEqual(self.llamadas, ["enviar", "bd"])
+        self.assertEqual(self.escaner.prefetch, {"usadas": 1})
+        self.assertIn(hash(URL), self.escaner.conocidas)
+
+    def test_registrado_por_otra_estacion_descarta_la_descarga(self):
+        self.registrar()   # llegó por réplica después de cargar las huellas
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "entrada")
+        self.assertEqual(self.llamadas, ["enviar", "bd"])
+        self.assertTrue(self.scraper.futuros[0].cancelled())
+        self.assertEqual(self.escaner.prefetch, {"descartadas": 1})
+        self.assertIn(hash(URL), self.escaner.conocidas)   # el siguiente escaneo ya no adelanta
+
+    def test_url_conocida_no_adelanta(self):
+        self.registrar()
+        with mock.patch("builtins.print"):
+            escaner = EscanerQR(self.acceso, self.db, scraper=self.scraper, prefetch=True)
+        self.assertEqual(escaner.procesar_url(URL, "alumno"), "entrada")
+        self.assertEqual(self.llamadas, ["bd"])
+        self.assertEqual(escaner.prefetch, {})
+
+    def test_huella_repetida_no_cambia_la_decision(self):
+        # Otra URL con la misma huella: no se adelanta, pero la BD decide y se consulta al portal.
+        self.escaner.conocidas.add(hash(URL))
+        self.assertEqual(self.escaner.procesar_url(URL, "alumno"), "entrada")
+        self.assertEqual(self.llamadas, ["bd", "consultar"])
+        self.assertTrue(self.db.existe_url(URL, "alumno"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+tests/test_gpio.py
+------------------
+Configuración de pines de app/hardware/gpio_ctrl.py sin Raspberry Pi: RPi.GPIO se sustituye
+por un módulo de prueba que anota cada setup() y el módulo se vuelve a importar con él.
+
+Uso:  python -m pytest tests   (o python -m unittest discover tests), desde la raíz del proyecto.
+"""
+
+import importlib, sys, types, unittest
+from unittest import mock
+
+from app.hardware import gpio_ctrl
+
+PINS = {"pin_a": 17, "pin_b": 27, "sensor_abierto": 22, "sensor_cerrado": 23}
+RANURA = {"id": 1, "pin_a": 5, "pin_b": 6, "sensor_abierto": 13, "sensor_cerrado": 19}
+
+
+class GPIOFalso(types.ModuleType):
+    BCM, OUT, IN, PUD_DOWN = "BCM", "OUT", "IN", "PUD_DOWN"
+
+    def __init__(self):
+        super().__init__("RPi.GPIO")
+        self.configurados = []
+
+    def setmode(self, modo):
+        pass
+
+    def setwarnings(self, activo):
+        pass
+
+    def setup(self, pin, modo, pull_up_down=None):
+        self.configurados.append(pin)
+
+
+class TestConfiguracion(unittest.TestCase):
+    def cargar(self, ranuras: dict) -> GPIOFalso:
+        gpio = GPIOFalso()
+        rpi = types.ModuleType("RPi")
+        rpi.GPIO = gpio
+        with mock.patch.dict(sys.modules, {"RPi": rpi, "RPi.GPIO": gpio}), \
+             mock.patch("app.config.SO", "Linux"), mock.patch("app.config.PINS", PINS), \
+             mock.patch("app.config.RANURAS", ranuras):
+            importlib.reload(gpio_ctrl)
+        self.addCleanup(importlib.reload, gpio_ctrl)   # de vuelta al módulo real (simulación aquí)
+        self.assertTrue(gpio_ctrl.GPIO_OK)
+        return gpio
+
+    def test_ranuras_y_actuador_sin_ranura(self):
+        # Una bici guardada antes del rack no tiene ranura: su salida usa 'gpio_pins'.
+        gpio = self.cargar({1: RANURA})
+        self.assertEqual(sorted(gpio.configurados),
+                         sorted([5, 6, 13, 19] + list(PINS.values())))
+        self.assertEqual(gpio_ctrl._pines(None), PINS)
+
+    def test_sin_ranuras_una_sola_vez(self):
+        gpio = self.cargar({1: PINS})
+        self.assertEqual(sorted(gpio.configurados), sorted(PINS.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+"""
+tests/test_lector.py
+--------------------
+Fuentes de entrada del lector QR (app/hardware/lector.py) sin hardware: la consola se
+sustituye por una tubería, el dispositivo evdev por una FIFO en la que se escriben
+struct input_event, y los sockets/FIFO son reales en un directorio temporal.
+
+Uso:  python -m pytest tests   (o python -m unittest discover tests), desde la raíz del proyecto.
+"""
+
+import os, sys, socket, tempfile, time, unittest
+from unittest import mock
+
+from app.hardware import lector
+from app.hardware.lector import FuenteEntrada, FuenteStdin, FuenteFIFO, FuenteSocket, FuenteEvdev, crear_fuente
+
+POSIX = os.name != "nt"
+ESPERA = 2.0  # timeout máximo de cada leer_linea en las pruebas
+
+
+class FuenteMemoria(FuenteEntrada):
+    """Fuente mínima para probar el ensamblado de líneas de la base."""
+    descripcion = "memoria"
+
+    def _conectar(self):
+        pass
+
+    def _desconectar(self):
+        pass
+
+    def _atender(self, clave):
+        pass
+
+
+def _leer_todas(fuente, n: int) -> list:
+    return [fuente.leer_linea(ESPERA) for _ in range(n)]
+
+
+class TestEnsamblado(unittest.TestCase):
+    def test_lineas_partidas_y_fines_mixtos(self):
+        f = FuenteMemoria()
+        buf = f._buffer
+        for trozo in (b"https://a/?h=1", b"23\r", b"\nhttps://b", b"/?h=9\n\n\r", b"resto"):
+            f._alimentar(trozo)
+        self.assertEqual(list(f._lineas), ["https://a/?h=123", "https://b/?h=9"])
+        self.assertIs(f._buffer, buf)  # se recorta en su lugar, no se reemplaza
+        self.assertEqual(bytes(f._buffer), b"resto")
+
+    def test_utf8_partido_entre_lecturas(self):
+        f = FuenteMemoria()
+        datos = "MARÍA\n".encode("utf-8")
+        f._alimentar(datos[:4])
+        f._alimentar(datos[4:])
+        self.assertEqual(list(f._lineas), ["MARÍA"])
+
+    def test_base_abstracta(self):
+        with self.assertRaises(TypeError):
+            FuenteEntrada()
+
+
+@unittest.skipUnless(POSIX, "selectors sobre descriptores de consola/FIFO solo en POSIX")
+class TestStdin(unittest.TestCase):
+    def test_lineas_y_eof(self):
+        r, w = os.pipe()
+        with os.fdopen(r, "r") as entrada, mock.patch.object(sys, "stdin", entrada):
+            fuente = FuenteStdin(reintento_seg=0.01)
+            os.write(w, b"uno\ndos")
+            self.assertEqual(fuente.leer_linea(ESPERA), "uno")
+            os.close(w)
+            self.assertEqual(fuente.leer_linea(ESPERA), "dos")  # lo pendiente se entrega al EOF
+            with self.assertRaises(EOFError):
+                fuente.leer_linea(ESPERA)
+            fuente.cerrar()
+
+
+@unittest.skipUnless(POSIX, "mkfifo solo en POSIX")
+class TestFIFO(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.dir.name, "lector.fifo")
+        self.fuente = FuenteFIFO(self.ruta, reintento_seg=0.05)
+
+    def tearDown(self):
+        self.fuente.cerrar()
+        self.dir.cleanup()
+
+    def _escribir(self, datos: bytes):
+        fd = os.open(self.ruta, os.O_WRONLY | os.O_NONBLOCK)
+        os.write(fd, datos)
+        os.close(fd)
+
+    def _esperar_reconexion(self):
+        """Lee (sin datos) hasta que la fuente vuelve a abrir la ruta."""
+        with mock.patch.object(self.fuente, "_conectar", wraps=self.fuente._conectar) as conectar:
+            limite = time.monotonic() + ESPERA
+            while time.monotonic() < limite:
+                self.assertIsNone(self.fuente.leer_linea(0.1))
+                if conectar.called and self.fuente.conectada:
+                    return
+        self.fail("la fuente no se reconectó a la FIFO nueva")
+
+    def test_varios_productores(self):
+        self.assertIsNone(self.fuente.leer_linea(0.05))  # crea la FIFO y conecta
+        self._escribir(b"primero\n")
+        self._escribir(b"segundo\n")  # el primer productor ya cerró: no hay EOF en bucle
+        self.assertEqual(_leer_todas(self.fuente, 2), ["primero", "segundo"])
+
+    def test_fifo_borrada(self):
+        self.fuente.leer_linea(0.05)
+        os.unlink(self.ruta)
+        self._esperar_reconexion()  # la vuelve a crear
+        self._escribir(b"tras borrar\n")
+        self.assertEqual(self.fuente.leer_linea(ESPERA), "tras borrar")
+
+    def test_fifo_reemplazada(self):
+        self.fuente.leer_linea(0.05)
+        os.unlink(self.ruta)
+        os.mkfifo(self.ruta)  # otro proceso la recrea antes de que la fuente lo note
+        self._esperar_reconexion()
+        self._escribir(b"tras recrear\n")
+        self.assertEqual(self.fuente.leer_linea(ESPERA), "tras recrear")
+
+    def test_ruta_que_no_es_fifo(self):
+        with open(self.ruta, "w"):
+            pass
+        self.assertIsNone(self.fuente.leer_linea(0.05))
+        self.assertFalse(self.fuente.conectada)
+
+
+class TestSocket(unittest.TestCase):
+    def _conectar(self, fuente, familia, direccion):
+        fuente.leer_linea(0.05)  # levanta el servidor
+        cli = socket.socket(familia, socket.SOCK_STREAM)
+        cli.connect(direccion)
+        return cli
+
+    def _probar_clientes(self, fuente, familia, direccion):
+        a = self._conectar(fuente, familia, direccion)
+        b = self._conectar(fuente, familia, direccion)
+        a.sendall(b"https://a/")
+        b.sendall(b"https://b/?h=2\n")
+        self.assertEqual(fuente.leer_linea(ESPERA), "https://b/?h=2")
+        a.sendall(b"?h=1\n")
+        self.assertEqual(fuente.leer_linea(ESPERA), "https://a/?h=1")  # buffers por cliente
+        b.sendall(b"sin fin de linea")
+        b.close()  # el productor se va: se entrega lo pendiente
+        self.assertEqual(fuente.leer_linea(ESPERA), "sin fin de linea")
+        a.close()
+        fuente.cerrar()
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "sin sockets UNIX")
+    def test_unix(self):
+        with tempfile.TemporaryDirectory() as d:
+            ruta = os.path.join(d, "lector.sock")
+            self._probar_clientes(FuenteSocket(f"unix:{ruta}", 0.05), socket.AF_UNIX, ruta)
+
+    def test_tcp(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            puerto = s.getsockname()[1]
+        self._probar_clientes(FuenteSocket(f"tcp:127.0.0.1:{puerto}", 0.05), socket.AF_INET,
+                              ("127.0.0.1", puerto))
+
+    def test_direccion_invalida(self):
+        fuente = FuenteSocket("udp:1.2.3.4:5", 0.05)
+        self.assertIsNone(fuente.leer_linea(0.05))
+        self.assertFalse(fuente.conectada)
+        fuente.cerrar()
+
+
+@unittest.skipUnless(POSIX, "evdev solo en Linux; la prueba lo imita con una FIFO")
+class TestEvdev(unittest.TestCase):
+    IZQ, DER, ENTER, A, UNO = 42, 54, 28, 30, 2
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.dir.name, "event0")
+        os.mkfifo(self.ruta)
+        self.fuente = FuenteEvdev(self.ruta, grab=False, reintento_seg=0.05)
+        self.fuente.leer_linea(0.05)
+        self.fd = os.open(self.ruta, os.O_WRONLY | os.O_NONBLOCK)
+
+    def tearDown(self):
+        os.close(self.fd)
+        self.fuente.cerrar()
+        self.dir.cleanup()
+
+    def _teclas(self, *eventos):
+        os.write(self.fd, b"".join(lector._EVENTO.pack(0, 0, lector._EV_KEY, codigo, valor)
+                                   for codigo, valor in eventos))
+
+    def test_traduce_teclas(self):
+        self._teclas((self.A, 1), (self.A, 0), (self.UNO, 1), (self.UNO, 0), (self.ENTER, 1))
+        self.assertEqual(self.fuente.leer_linea(ESPERA), "a1")
+
+    def test_shift_izquierdo_y_derecho_por_separado(self):
+        self._teclas((self.IZQ, 1), (self.DER, 1), (self.A, 1),
+                     (self.IZQ, 0), (self.A, 1),     # el derecho sigue presionado
+                     (self.DER, 0), (self.A, 1), (self.ENTER, 1))
+        self.assertEqual(self.fuente.leer_linea(ESPERA), "AAa")
+
+
+class TestFabrica(unittest.TestCase):
+    def test_tipos(self):
+        self.assertIsInstance(crear_fuente(None), FuenteStdin)
+        self.assertIsInstance(crear_fuente({"tipo": "fifo", "ruta": "/tmp/x"}), FuenteFIFO)
+        self.assertIsInstance(crear_fuente({"tipo": "socket", "direccion": "tcp::7000"}), FuenteSocket)
+        fuente = crear_fuente({"tipo": "evdev", "ruta": "/dev/input/event0", "grab": False})
+        self.assertIsInstance(fuente, FuenteEvdev)
+        self.assertFalse(fuente.grab)
+        with self.assertRaises(ValueError):
+            crear_fuente({"tipo": "bluetooth"})
+
+
+if __name__ == "__main__":
+    unittest.main()
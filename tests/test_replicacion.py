@@ -0,0 +1,302 @@
+"""
+tests/test_replicacion.py
+-------------------------
+Bitácora de cambios y réplica entre estaciones (app/data/db.py, app/data/replicacion.py)
+con varios archivos SQLite en un mismo proceso: cada BaseDatos es una estación y los pares
+del Replicador son otras BaseDatos locales (misma interfaz que BaseDatosRemota). También los
+respaldos en caliente y su restauración (app/data/respaldo.py) y el formato BLOB de los
+identificadores cifrados (identificadores_binarios, migrar_identificadores).
+
+Uso:  python -m pytest tests   (o python -m unittest discover tests), desde la raíz del proyecto.
+"""
+
+import datetime, gzip, os, sqlite3, tempfile, threading, unittest
+from unittest import mock
+
+from app.data.db import BaseDatos, MODELOS
+from app.data.replicacion import Replicador, EstacionDuplicada
+from app.data.respaldo import Respaldo, restaurar
+from app.models.alumno import Alumno
+from app.utils.crypto import encriptar
+
+
+def _alumno(i: int) -> Alumno:
+    return Alumno(f"20206300{i:02d}", f"CURP{i:02d}", f"Alumno {i}", "ISC", "ESCOM", "Inscrito", "M",
+                  "2024-01-01", f"https://servicios.dae.ipn.mx/vcred/?h={i}", "entrada")
+
+
+class BaseReplica(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def ruta(self, nombre: str) -> str:
+        return os.path.join(self.dir.name, f"{nombre}.db")
+
+    def bici(self, db: BaseDatos, i: int) -> bool:
+        return db.obtener_estado_bici(encriptar(_alumno(i).boleta), "alumno")
+
+
+class TestIdEstacion(BaseReplica):
+    def test_id_generado_unico_y_persistente(self):
+        a, b = BaseDatos(self.ruta("a")), BaseDatos(self.ruta("b"))
+        self.assertNotEqual(a.estacion, b.estacion)
+        self.assertEqual(BaseDatos(self.ruta("a")).estacion, a.estacion)  # se conserva al reabrir
+
+    def test_id_configurado_tiene_prioridad(self):
+        self.assertEqual(BaseDatos(self.ruta("a"), "estacion-norte").estacion, "estacion-norte")
+
+    def test_mismo_archivo_mismo_id(self):
+        # La estación y la revalidación abren el mismo archivo: son la misma estación.
+        self.assertEqual(BaseDatos(self.ruta("a")).estacion, BaseDatos(self.ruta("a")).estacion)
+
+
+class TestReplica(BaseReplica):
+    def test_sin_id_configurado_los_cambios_llegan(self):
+        # Antes el id por defecto era el nombre de host: dos Raspberry Pi 'raspberrypi' se ignoraban.
+        a, b = BaseDatos(self.ruta("a")), BaseDatos(self.ruta("b"))
+        a.insertar_alumno(_alumno(1), True)
+        self.assertEqual(b.aplicar_cambios(a.cambios_desde(0), a.estacion), 1)
+        self.assertTrue(b.existe_url(_alumno(1).url, "alumno"))
+        self.assertTrue(self.bici(b, 1))
+
+    def test_mismo_id_no_se_sincroniza_en_silencio(self):
+        a, b = BaseDatos(self.ruta("a"), "raspberrypi"), BaseDatos(self.ruta("b"), "raspberrypi")
+        a.insertar_alumno(_alumno(1), True)
+        replicador = Replicador(a, [b])
+        with self.assertRaises(EstacionDuplicada):
+            replicador.sincronizar(b)
+        self.assertEqual(replicador.ronda(), [])   # la ronda lo reporta y sigue
+        self.assertEqual(b.marca_par("raspberrypi"), 0)
+
+    def test_estrella_converge(self):
+        hub, e1, e2 = (BaseDatos(self.ruta(n)) for n in ("hub", "e1", "e2"))
+        r1, r2 = Replicador(e1, [hub], lote=2), Replicador(e2, [hub], lote=2)
+        for i in range(5):
+            e1.insertar_alumno(_alumno(i), False)
+        e2.insertar_alumno(_alumno(10), True)
+        for _ in range(3):
+            r1.ronda()
+            r2.ronda()
+        for db in (hub, e1, e2):
+            self.assertEqual(sorted(u for _, u in db.iterar_urls("alumno")),
+                             sorted(_alumno(i).url for i in (0, 1, 2, 3, 4, 10)))
+            self.assertTrue(self.bici(db, 10))
+
+    def test_conflicto_gana_la_version_mayor_en_todas(self):
+        a, b = BaseDatos(self.ruta("a")), BaseDatos(self.ruta("b"))
+        a.insertar_alumno(_alumno(1), False)
+        Replicador(a, [b]).ronda()
+        # Ambas estaciones cambian al mismo usuario sin verse.
+        a.actualizar_estado_bici(encriptar(_alumno(1).boleta), True, "alumno")
+        b.actualizar_estado_bici(encriptar(_alumno(1).boleta), False, "alumno")
+        b.actualizar_estado_bici(encriptar(_alumno(1).boleta), False, "alumno")
+        Replicador(a, [b]).ronda()
+        self.assertEqual(self.bici(a, 1), self.bici(b, 1))
+        self.assertFalse(self.bici(a, 1))   # b escribió con un reloj mayor
+
+    def test_marcas_por_par(self):
+        a, b = BaseDatos(self.ruta("a")), BaseDatos(self.ruta("b"))
+        a.insertar_alumno(_alumno(1), False)
+        Replicador(a, [b]).ronda()
+        self.assertEqual(b.marca_par(a.estacion), a.cambios_desde(0)[-1]["seq"])
+        self.assertEqual(b.aplicar_cambios(a.cambios_desde(b.marca_par(a.estacion)), a.estacion), 0)
+
+
+class TestBitacoraEstacion(BaseReplica):
+    def test_el_mantenimiento_de_la_estacion_compacta(self):
+        # Sin réplica activa nadie compactaba: la bitácora crecía con cada escaneo.
+        import main
+        db = BaseDatos(self.ruta("a"))
+        db.insertar_alumno(_alumno(1), False)
+        for i in range(10):
+            db.actualizar_accion(_alumno(1).url, "entrada" if i % 2 else "salida", "alumno")
+        mantenimiento = main.crear_mantenimiento(db)
+        mantenimiento.reposo_seg, mantenimiento.presupuesto = 0, float("inf")
+        with mock.patch("builtins.print"):
+            mantenimiento.en_reposo()
+        self.assertIsNone(mantenimiento._ciclo)
+        self.assertEqual(len(db.cambios_desde(0)), 1)
+
+    def test_compactar_por_lotes(self):
+        # En el hub cada lote es un paso bajo el candado de escritura (antes: un DELETE de toda la tabla).
+        db = BaseDatos(self.ruta("a"))
+        for i in range(4):
+            db.insertar_alumno(_alumno(i), False)
+            for _ in range(3):
+                db.actualizar_accion(_alumno(i).url, "entrada", "alumno")
+        pasos = []
+        while True:
+            revisados, borrados = db.compactar_cambios_lote(5)
+            if not revisados:
+                break
+            self.assertLessEqual(revisados, 5)
+            pasos.append(borrados)
+        self.assertEqual(len(pasos), 4)            # 16 cambios en lotes de 5
+        self.assertEqual(sum(pasos), 12)
+        self.assertEqual(sorted(c["url"] for c in db.cambios_desde(0)), sorted(_alumno(i).url for i in range(4)))
+
+
+class TestReloj(BaseReplica):
+    def _versiones(self, archivo: str) -> list:
+        with sqlite3.connect(archivo) as conn:
+            return conn.execute("SELECT reloj, origen FROM cambios ORDER BY seq").fetchall()
+
+    def test_dos_instancias_sobre_el_mismo_archivo(self):
+        # Estación y revalidación: dos BaseDatos (antes con relojes en memoria separados).
+        archivo = self.ruta("a")
+        estacion, revalidacion = BaseDatos(archivo), BaseDatos(archivo)
+        estacion.insertar_alumno(_alumno(1), False)
+        revalidacion.actualizar_estados([(_alumno(1).url, "Baja")], "alumno")
+        estacion.actualizar_estado_bici(encriptar(_alumno(1).boleta), True, "alumno")
+        versiones = self._versiones(archivo)
+        self.assertEqual(len(set(versiones)), len(versiones))
+        self.assertEqual([r for r, _ in versiones], sorted(r for r, _ in versiones))
+
+    def test_escrituras_concurrentes_sin_versiones_repetidas(self):
+        archivo = self.ruta("a")
+        instancias = [BaseDatos(archivo) for _ in range(4)]
+        for i in range(4):
+            instancias[0].insertar_alumno(_alumno(i), False)
+
+        def escribir(db, i):
+            for k in range(15):
+                db.actualizar_estado_bici(encriptar(_alumno(i).boleta), k % 2 == 0, "alumno")
+        hilos = [threading.Thread(target=escribir, args=(db, i)) for i, db in enumerate(instancias)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        relojes = [r for r, _ in self._versiones(archivo)]
+        self.assertEqual(len(relojes), 4 + 4 * 15)
+        self.assertEqual(len(set(relojes)), len(relojes))
+
+    def test_reloj_persiste_y_avanza_con_lo_recibido(self):
+        a, b = BaseDatos(self.ruta("a")), BaseDatos(self.ruta("b"))
+        for i in range(5):
+            a.insertar_alumno(_alumno(i), False)
+        b.aplicar_cambios(a.cambios_desde(0), a.estacion)
+        b = BaseDatos(self.ruta("b"))   # reabrir no reinicia el reloj
+        b.insertar_alumno(_alumno(20), False)
+        self.assertGreater(self._versiones(self.ruta("b"))[-1][0], max(r for r, _ in self._versiones(self.ruta("a"))))
+
+    def test_bd_anterior_arranca_desde_la_mayor_version(self):
+        archivo = self.ruta("a")
+        db = BaseDatos(archivo)
+        for i in range(3):
+            db.insertar_alumno(_alumno(i), False)
+        with sqlite3.connect(archivo) as conn:
+            conn.execute("DROP TABLE meta")   # BD creada antes de la tabla 'meta'
+        db = BaseDatos(archivo)
+        db.insertar_alumno(_alumno(9), False)
+        relojes = [r for r, _ in self._versiones(archivo)]
+        self.assertEqual(relojes[-1], max(relojes[:-1]) + 1)
+
+
+class TestIdentificadoresBinarios(BaseReplica):
+    TABLA = MODELOS["alumno"].TABLA
+
+    def _formatos(self, archivo: str) -> set:
+        with sqlite3.connect(archivo) as conn:
+            return {t for (t,) in conn.execute(f"SELECT typeof(boleta) FROM {self.TABLA}")} | \
+                   {t for (t,) in conn.execute("SELECT typeof(identificador) FROM ranuras")}
+
+    def _filas(self, archivo: str) -> list:
+        with sqlite3.connect(archivo) as conn:
+            return conn.execute(f"SELECT * FROM {self.TABLA} ORDER BY url").fetchall()
+
+    def _migrar(self, db: BaseDatos) -> int:
+        pasos = 0
+        while db.migrar_identificadores(lote=2):
+            pasos += 1
+        return pasos
+
+    def test_ida_y_vuelta(self):
+        archivo = self.ruta("a")
+        texto = BaseDatos(archivo)
+        for i in range(5):
+            texto.insertar_alumno(_alumno(i), i % 2 == 0)
+        texto.asignar_ranura(texto.estacion, 0, "alumno", encriptar(_alumno(0).boleta))
+        originales, bitacora = self._filas(archivo), texto.cambios_desde(0)
+
+        binaria = BaseDatos(archivo, identificadores_binarios=True)
+        self.assertGreater(self._migrar(binaria), 1)          # por lotes, no todo de una vez
+        self.assertEqual(self._formatos(archivo), {"blob"})
+        self.assertEqual(binaria.obtener_usuario(_alumno(3).url, "alumno").boleta, _alumno(3).boleta)
+        self.assertEqual(binaria.ranuras_ocupadas(binaria.estacion), [[0, "alumno", encriptar(_alumno(0).boleta)]])
+
+        texto = BaseDatos(archivo)                           # revertir: la opción en False
+        self._migrar(texto)
+        self.assertEqual(self._formatos(archivo), {"text"})
+        self.assertEqual(self._filas(archivo), originales)
+        self.assertEqual(texto.cambios_desde(0), bitacora)   # la migración no toca la bitácora
+
+    def test_busqueda_con_formatos_mezclados(self):
+        # A media migración conviven filas TEXT y BLOB: las dos instancias encuentran ambas.
+        archivo = self.ruta("a")
+        texto, binaria = BaseDatos(archivo), BaseDatos(archivo, identificadores_binarios=True)
+        texto.insertar_alumno(_alumno(1), True)
+        binaria.insertar_alumno(_alumno(2), True)
+        texto.asignar_ranura("norte", 1, "alumno", encriptar(_alumno(1).boleta))
+        binaria.asignar_ranura("norte", 2, "alumno", encriptar(_alumno(2).boleta))
+        self.assertEqual(self._formatos(archivo), {"text", "blob"})
+        for db in (texto, binaria):
+            for i in (1, 2):
+                cif = encriptar(_alumno(i).boleta)
+                self.assertTrue(db.obtener_estado_bici(cif, "alumno"))
+                self.assertEqual(db.ranura_de_usuario("alumno", cif), ["norte", i])
+                self.assertEqual(db.decidir_acceso(cif, "alumno"), "pin_requerido")
+            self.assertEqual(db.bicis_sin_ranura(), 0)
+        binaria.actualizar_estado_bici(encriptar(_alumno(1).boleta), False, "alumno")   # fila TEXT
+        self.assertEqual(texto.decidir_acceso(encriptar(_alumno(1).boleta), "alumno"), "entrada")
+
+
+class TestRespaldo(BaseReplica):
+    def setUp(self):
+        super().setUp()
+        self.archivo = self.ruta("a")
+        self.respaldo = Respaldo(self.archivo, directorio=os.path.join(self.dir.name, "respaldos"),
+                                 pausa_seg=0)
+        imprimir = mock.patch("builtins.print")
+        imprimir.start()
+        self.addCleanup(imprimir.stop)
+
+    def test_restaurar_vuelve_al_respaldo(self):
+        db = BaseDatos(self.archivo)
+        db.insertar_alumno(_alumno(1), True)
+        gz = self.respaldo.respaldar()
+        db.insertar_alumno(_alumno(2), False)          # escrito después del respaldo
+        db.actualizar_estado_bici(encriptar(_alumno(1).boleta), False, "alumno")
+        restaurar(gz, self.archivo)
+        db = BaseDatos(self.archivo)
+        self.assertTrue(self.bici(db, 1))
+        self.assertFalse(db.existe_url(_alumno(2).url, "alumno"))
+        anterior = BaseDatos(self.archivo + ".antes_de_restaurar")   # la BD reemplazada se conserva
+        self.assertTrue(anterior.existe_url(_alumno(2).url, "alumno"))
+
+    def test_respaldo_corrupto_no_se_restaura(self):
+        db = BaseDatos(self.archivo)
+        db.insertar_alumno(_alumno(1), True)
+        gz = os.path.join(self.dir.name, "corrupto.db.gz")
+        with gzip.open(gz, "wb") as f:
+            f.write(b"esto no es una base de datos SQLite" * 100)
+        with self.assertRaises(ValueError):
+            restaurar(gz, self.archivo)
+        self.assertTrue(BaseDatos(self.archivo).existe_url(_alumno(1).url, "alumno"))
+        self.assertFalse(os.path.exists(self.archivo + ".antes_de_restaurar"))
+
+    def test_rotacion_conserva_los_mas_recientes(self):
+        BaseDatos(self.archivo)
+        self.respaldo.conservar = 2
+        for i in range(3):
+            with mock.patch("app.data.respaldo.datetime") as reloj:
+                reloj.datetime.now.return_value = datetime.datetime(2024, 1, 1, 0, 0, i)
+                self.respaldo.respaldar()
+        self.assertEqual([os.path.basename(r) for r in self.respaldo.existentes()],
+                         ["a-20240101-000001.db.gz", "a-20240101-000002.db.gz"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+tests/test_revalidacion.py
+--------------------------
+Revalidación por lotes (app/web/revalidacion.py) contra el portal local
+(herramientas/portal_local.py): cada URL guardada fuerza su página con '&fixture=' y se
+comprueba qué estado queda en BD. Requiere requests, bs4 y lxml (las de la estación).
+
+Uso:  python -m pytest tests   (o python -m unittest discover tests), desde la raíz del proyecto.
+"""
+
+import os, tempfile, unittest
+from unittest import mock
+
+try:
+    from app.web.revalidacion import Revalidador
+    from herramientas.portal_local import PortalLocal, url_para
+except ImportError:   # sin requests/bs4/lxml
+    Revalidador = None
+
+from app.data.db import BaseDatos
+from app.models.alumno import Alumno
+from app.models.profesor import Profesor
+
+# fixture -> estado que debe quedar en BD (todos se guardan primero como válidos)
+ALUMNOS = {"alumno_inscrito": "Inscrito",
+           "alumno_no_inscrito": "Sin reinscripción en el periodo actual",
+           "alumno_sin_estado": "Inscrito"}
+PROFESORES = {"profesor_valida": "Válida",
+              "profesor_no_valida": "No válida",
+              "profesor_variante": "Válida",
+              "profesor_sin_estado": "Válida"}
+
+
+@unittest.skipIf(Revalidador is None, "faltan dependencias del scraper")
+class TestRevalidacion(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.portal = PortalLocal(tasa_no_valido=0, tasa_variante=0).iniciar_en_hilo()
+        self.db = BaseDatos(os.path.join(self.dir.name, "estacion.db"))
+        self.urls = {}
+        for i, fixture in enumerate(ALUMNOS):
+            url = self.urls[fixture] = url_para(self.portal.base, "alumno", i) + f"&fixture={fixture}"
+            self.db.insertar_alumno(Alumno(f"20206300{i:02d}", f"CURP{i:02d}", "A", "ISC", "ESCOM",
+                                           "Inscrito", "M", "", url, ""), False)
+        for i, fixture in enumerate(PROFESORES):
+            url = self.urls[fixture] = url_para(self.portal.base, "profesor", i) + f"&fixture={fixture}"
+            self.db.insertar_profesor(Profesor(f"000000{i:02d}", "P", f"E{i:03d}", "ESCOM",
+                                               "Válida", "", url, ""), False)
+        # Una URL cuyo portal responde 500: sin respuesta, tampoco se toca.
+        self.url_error = url_para(self.portal.base, "profesor", 99) + "&fallo=error"
+        self.db.insertar_profesor(Profesor("00000099", "P", "E099", "ESCOM", "Válida", "", self.url_error, ""), False)
+
+    def tearDown(self):
+        self.portal.detener()
+        self.dir.cleanup()
+
+    def ejecutar(self) -> dict:
+        revalidador = Revalidador(self.db, "portal-local", concurrencia=3, por_host=0, lote_escritura=2,
+                                  archivo_checkpoint=os.path.join(self.dir.name, "revalidacion.json"),
+                                  timeout=5, procesos=1)
+        with mock.patch("builtins.print"):
+            return revalidador.ejecutar()
+
+    def estado(self, url: str, tipo: str) -> str:
+        return self.db.obtener_usuario(url, tipo).estado
+
+    def test_solo_se_escribe_un_estado_reconocido(self):
+        stats = self.ejecutar()
+        for fixture, esperado in ALUMNOS.items():
+            self.assertEqual(self.estado(self.urls[fixture], "alumno"), esperado, fixture)
+        for fixture, esperado in PROFESORES.items():
+            self.assertEqual(self.estado(self.urls[fixture], "profesor"), esperado, fixture)
+        self.assertEqual(self.estado(self.url_error, "profesor"), "Válida")
+        self.assertEqual(stats["consultados"], len(ALUMNOS) + len(PROFESORES) + 1)
+        self.assertEqual(stats["sin_estado"], 2)
+        self.assertEqual(stats["errores"], 1)
+        self.assertEqual(stats["cambiados"], 2)
+
+    def test_segunda_pasada_no_cambia_nada(self):
+        self.ejecutar()
+        cambios = len(self.db.cambios_desde(0))
+        self.assertEqual(self.ejecutar()["cambiados"], 0)
+        self.assertEqual(len(self.db.cambios_desde(0)), cambios)
+
+
+if __name__ == "__main__":
+    unittest.main()
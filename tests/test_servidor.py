@@ -0,0 +1,203 @@
+"""
+tests/test_servidor.py
+----------------------
+Servidor central (app/data/servidor.py) y su cliente (app/data/remota.py) en un mismo proceso:
+token, métodos expuestos, canal de réplica y la decisión atómica decidir_acceso / confirmar_acceso.
+
+Uso:  python -m pytest tests   (o python -m unittest discover tests), desde la raíz del proyecto.
+"""
+
+import json, os, tempfile, threading, unittest
+from unittest import mock
+
+import app.core.acceso as acceso_mod
+from app.core.acceso import ControlAcceso
+from app.core.politica import GestorPolitica
+from app.data.db import BaseDatos
+from app.data.json_store import GestorJSON
+from app.data.remota import BaseDatosRemota, ErrorServidor, ParReplica
+from app.data.replicacion import Replicador
+from app.data.servidor import ServidorAcceso
+from app.models.alumno import Alumno
+from app.utils.crypto import encriptar
+
+TOKEN = "secreto-de-prueba"
+TOKEN_REPLICA = "secreto-de-replica"
+URL = "https://servicios.dae.ipn.mx/vcred/?h=1"
+BOLETA = "2020630001"
+CIF = encriptar(BOLETA)
+
+
+class BaseServidor(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = BaseDatos(os.path.join(self.dir.name, "central.db"))
+        self.db.insertar_alumno(Alumno(BOLETA, "CURP01", "Alumno 1", "ISC", "ESCOM", "Inscrito", "M",
+                                       "", URL, ""), False)
+        self.servidor = ServidorAcceso(self.db, "127.0.0.1", 0, TOKEN, TOKEN_REPLICA)
+        threading.Thread(target=self.servidor.httpd.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.servidor.detener()
+        self.dir.cleanup()
+
+    def cliente(self, token=TOKEN) -> BaseDatosRemota:
+        return BaseDatosRemota(self.servidor.direccion, timeout=5, token=token)
+
+    def par(self, token=TOKEN_REPLICA) -> ParReplica:
+        return ParReplica(self.servidor.direccion, timeout=5, token=token)
+
+    def guardar_bici(self):
+        self.assertEqual(self.db.decidir_acceso(CIF, "alumno"), "entrada")
+        self.db.confirmar_acceso(CIF, "alumno", True, True)
+
+
+class TestSeguridad(BaseServidor):
+    def test_sin_token_o_con_otro_se_rechaza(self):
+        for token in (None, "otro"):
+            with self.assertRaisesRegex(ErrorServidor, "token"):
+                self.cliente(token).existe_url(URL, "alumno")
+        self.assertTrue(self.cliente().existe_url(URL, "alumno"))
+
+    def test_no_escucha_en_la_red_sin_token(self):
+        with self.assertRaises(ValueError):
+            ServidorAcceso(self.db, "0.0.0.0", 0)
+
+    def test_metodos_sueltos_no_expuestos(self):
+        cliente = self.cliente()
+        for metodo, args in (("validar_pin", [BOLETA, "0001", "alumno"]),
+                             ("obtener_estado_bici", [CIF, "alumno"]),
+                             ("actualizar_estado_bici", [CIF, True, "alumno"]),
+                             ("obtener_identificador_por_url", [URL, "alumno"]),
+                             # Réplica: la bitácora lleva identificadores y aplicar_cambios escribe filas enteras.
+                             ("cambios_desde", [0, 500]),
+                             ("marca_par", ["otra"]),
+                             ("aplicar_cambios", [[{"seq": 1, "origen": "otra", "reloj": 10**6, "tabla": "alumnos",
+                                                    "url": URL, "datos": json.dumps({"url": URL, "pin": "9999",
+                                                                                     "tiene_bici_guardada": 1})}],
+                                                  "otra"])):
+            with self.assertRaisesRegex(ErrorServidor, "no permitido"):
+                cliente._llamar(metodo, *args)
+        self.assertFalse(self.db.obtener_estado_bici(CIF, "alumno"))
+        self.assertEqual(self.db.marca_par("otra"), 0)
+
+    def test_usuario_sin_pin_ni_curp(self):
+        usuario = self.cliente().obtener_usuario(URL, "alumno")
+        self.assertEqual(usuario.boleta, BOLETA)
+        self.assertIsNone(usuario.pin)
+        self.assertIsNone(usuario.curp)
+
+    def test_salida_remota_siempre_pide_pin(self):
+        self.guardar_bici()
+        cliente = self.cliente()
+        self.assertEqual(cliente._llamar("decidir_acceso", CIF, "alumno", None, None, False), "pin_requerido")
+        self.assertEqual(cliente.decidir_acceso(CIF, "alumno", exigir_pin=False), "pin_requerido")
+
+    def test_limite_de_pin_incorrectos(self):
+        self.guardar_bici()
+        cliente = self.cliente()
+        for _ in range(BaseDatos.INTENTOS_PIN):
+            self.assertEqual(cliente.decidir_acceso(CIF, "alumno", "9999"), "pin_incorrecto")
+        self.assertEqual(cliente.decidir_acceso(CIF, "alumno", BOLETA[-4:]), "pin_bloqueado")
+
+
+class TestCanalReplica(BaseServidor):
+    def test_token_propio(self):
+        for token in (None, TOKEN):   # el de las estaciones no abre el canal de réplica
+            with self.assertRaisesRegex(ErrorServidor, "token"):
+                self.par(token).cambios_desde(0)
+        self.assertEqual(len(self.par().cambios_desde(0)), 1)
+
+    def test_cerrado_sin_token_configurado(self):
+        servidor = ServidorAcceso(self.db, "127.0.0.1", 0, TOKEN)
+        threading.Thread(target=servidor.httpd.serve_forever, daemon=True).start()
+        try:
+            with self.assertRaisesRegex(ErrorServidor, "cerrado"):
+                ParReplica(servidor.direccion, timeout=5, token=TOKEN).cambios_desde(0)
+        finally:
+            servidor.detener()
+
+    def test_fotos_sin_pin_ni_curp(self):
+        datos = json.loads(self.par().cambios_desde(0)[0]["datos"])
+        self.assertNotIn("pin", datos)
+        self.assertNotIn("curp", datos)
+        self.assertEqual(datos["boleta"], CIF)
+
+    def test_estacion_replica_por_el_canal(self):
+        estacion = BaseDatos(os.path.join(self.dir.name, "estacion.db"))
+        Replicador(estacion, [self.par()]).ronda()
+        usuario = estacion.obtener_usuario(URL, "alumno")
+        self.assertEqual(usuario.boleta, BOLETA)
+        self.assertIsNone(usuario.curp)
+        self.assertEqual(usuario.pin, BOLETA[-4:])   # PIN por defecto del identificador
+
+
+class TestDecision(BaseServidor):
+    def test_una_sola_decision_a_la_vez(self):
+        a, b = self.cliente(), self.cliente()
+        self.assertEqual(a.decidir_acceso(CIF, "alumno"), "entrada")
+        self.assertEqual(b.decidir_acceso(CIF, "alumno"), "ocupado")   # antes: las dos 'entrada'
+        a.confirmar_acceso(CIF, "alumno", True, True)
+        self.assertEqual(b.decidir_acceso(CIF, "alumno"), "pin_requerido")
+        self.assertEqual(b.decidir_acceso(CIF, "alumno", BOLETA[-4:]), "salida")
+
+    def test_concurrentes(self):
+        decisiones = []
+        clientes = [self.cliente() for _ in range(8)]
+        hilos = [threading.Thread(target=lambda c=c: decisiones.append(c.decidir_acceso(CIF, "alumno")))
+                 for c in clientes]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        self.assertEqual(sorted(decisiones), ["entrada"] + ["ocupado"] * 7)
+
+    def test_falla_libera_sin_escribir(self):
+        cliente = self.cliente()
+        self.assertEqual(cliente.decidir_acceso(CIF, "alumno"), "entrada")
+        cliente.confirmar_acceso(CIF, "alumno", True, False)
+        self.assertFalse(self.db.obtener_estado_bici(CIF, "alumno"))
+        self.assertEqual(cliente.decidir_acceso(CIF, "alumno"), "entrada")
+
+    def test_cupo_compartido(self):
+        # Antes cada estación llevaba su propio contador: la otra no veía esta entrada.
+        otro = encriptar("2020630002")
+        self.db.insertar_alumno(Alumno("2020630002", "CURP02", "Alumno 2", "ISC", "ESCOM", "Inscrito", "M",
+                                       "", URL + "2", ""), False)
+        a, b = self.cliente(), self.cliente()
+        self.assertEqual(a.decidir_acceso(CIF, "alumno", cupo=1), "entrada")
+        self.assertEqual(b.decidir_acceso(otro, "alumno", cupo=1), "cupo_lleno")   # entrada en curso
+        a.confirmar_acceso(CIF, "alumno", True, True)
+        self.assertEqual(b.decidir_acceso(otro, "alumno", cupo=1), "cupo_lleno")
+        self.assertEqual(b.decidir_acceso(otro, "alumno", cupo=2), "entrada")
+
+    def test_la_reserva_vence(self):
+        self.db.RESERVA_SEG = 0
+        self.assertEqual(self.db.decidir_acceso(CIF, "alumno"), "entrada")
+        self.assertEqual(self.db.decidir_acceso(CIF, "alumno"), "entrada")   # estación caída: no queda bloqueado
+
+
+class TestEstacionRemota(BaseServidor):
+    """ControlAcceso en simulación contra el servidor: la salida pide PIN (la BD no es local)."""
+
+    def setUp(self):
+        super().setUp()
+        json_store = GestorJSON(*(os.path.join(self.dir.name, n) for n in ("a.json", "p.json", "b.json")))
+        with mock.patch.object(acceso_mod, "GPIO_OK", False):
+            self.acceso = ControlAcceso(self.cliente(), json_store, GestorPolitica(None))
+        gpio = mock.patch.object(acceso_mod, "GPIO_OK", False)
+        gpio.start()
+        self.addCleanup(gpio.stop)
+
+    def test_entrada_y_salida_con_pin(self):
+        self.assertEqual(self.acceso.abrir_cerradura(BOLETA, "alumno"), "entrada")
+        self.assertTrue(self.db.obtener_estado_bici(CIF, "alumno"))
+        with mock.patch("getpass.getpass", return_value="9999"):
+            self.assertEqual(self.acceso.abrir_cerradura(BOLETA, "alumno"), "denegado")
+        with mock.patch("getpass.getpass", return_value=BOLETA[-4:]):
+            self.assertEqual(self.acceso.abrir_cerradura(BOLETA, "alumno"), "salida")
+        self.assertFalse(self.db.obtener_estado_bici(CIF, "alumno"))
+
+
+if __name__ == "__main__":
+    unittest.main()